@@ -3,13 +3,18 @@ import datetime
 import sys
 
 from spirecomm.communication.coordinator import Coordinator
+from spirecomm.communication.log_writer import LogWriter
 from spirecomm.ai.agent import SimpleAgent
 from spirecomm.spire.character import PlayerClass
 
 
 if __name__ == "__main__":
-    agent = SimpleAgent()
+    # Written out by a background thread, so neither the agent nor the coordinator waits on the disk
+    logfile = LogWriter("ai.log", max_bytes=50 * 1024 * 1024)
+    # No GUI is attached, so the agent never sleeps and the coordinator sends actions as soon as it can
+    agent = SimpleAgent(logfile, headless=True)
     coordinator = Coordinator()
+    agent.latency = coordinator.latency
     coordinator.signal_ready()
     coordinator.register_command_error_callback(agent.handle_error)
     coordinator.register_state_change_callback(agent.get_next_action_in_game)
@@ -19,3 +24,9 @@ if __name__ == "__main__":
     for chosen_class in itertools.cycle(PlayerClass):
         agent.change_class(chosen_class)
         result = coordinator.play_one_game(chosen_class)
+        seconds, actions, victory = coordinator.game_reports[-1]
+        print("{} game as {} took {:.1f} s for {} actions".format("Won" if victory else "Lost", chosen_class.name, seconds, actions),
+              file=logfile, flush=True)
+        # Every so often, log how long each step of handling a message has been taking
+        if len(coordinator.game_reports) % 10 == 0:
+            coordinator.dump_stats(logfile)
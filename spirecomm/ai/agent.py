@@ -12,31 +12,45 @@ from spirecomm.spire.screen import RestOption
 from spirecomm.communication.action import *
 from spirecomm.ai.behaviours import *
 from spirecomm.ai.priorities import *
+from spirecomm.ai.compiler import compile_tree
+from spirecomm.ai.planner import TurnPlanner
+from spirecomm.ai.rollout import score as rollout_score
+from spirecomm.ai.map_analysis import MapAnalysis, RouteRisk
 
 import py_trees
 
 
+# The GUI only shows the latest messages, so older ones are dropped rather than kept forever
+DEBUG_QUEUE_SIZE = 1000
+
 
 class SimpleAgent:
 
-	def __init__(self, logfile, chosen_class=PlayerClass.IRONCLAD):
+	def __init__(self, logfile, chosen_class=PlayerClass.IRONCLAD, headless=False):
 		self.chosen_class = chosen_class
 		self.change_class(chosen_class)
-		self.action_delay = 2.0 # seconds delay per action, useful for actually seeing what's going on.
-		# high delay will steal mouse focus??
+		# Without a GUI there is nobody to watch or pause, so never sleep when deciding.
+		# Pacing for a GUI is done by Coordinator.action_delay.
+		self.headless = headless
 		self.ascension = 0
-		self.debug_queue = ["AI Initialized.", "Delay timer set to " + str(self.action_delay)]
+		self.debug_queue = collections.deque(["AI Initialized."], maxlen=DEBUG_QUEUE_SIZE)
 		self.cmd_queue = []
 		self.logfile = logfile
 		self.skipping_card = False
 		self.paused = False
 		self.step = False
+		self.logfile_level = 7
 		self.debug_level = 6
 		self.root = SelectorBehaviour("Root Context Selector")
 		self.init_behaviour_tree(self.root) # Warning: uses British spelling
 		self.behaviour_tree = py_trees.trees.BehaviourTree(self.root)
 		self.blackboard = py_trees.blackboard.Blackboard()
 		self.blackboard.game = Game()
+		# The compiled tree makes the same decisions as behaviour_tree.tick(), much faster, but
+		# without the leaves' trace logging, so it is only used by default without a GUI
+		self.use_compiled_tree = headless
+		self.compiled_tree = compile_tree(self.root)
+		self.latency = None # set to the coordinator's latency stats to time compute_smart_state and tick too
 		# call behaviour_tree.tick() for one tick
 		# can use behaviour.tick_once() to tick a specific behaviour
 		
@@ -45,7 +59,18 @@ class SimpleAgent:
 		self.choose_good_card = False
 		self.map_route = []
 		self.upcoming_rooms = []
-		self.priorities = Priority()
+		# Choose map nodes by their expected value at the current HP and gold, see RouteRisk,
+		# rather than only by the MAP_NODE_PRIORITIES scores
+		self.use_risk_routes = True
+		self.route_damage_scale = 1.0
+		# Plans the whole turn's card plays; the greedy rules in get_play_card_action are used
+		# when it is off or the hand has cards it can't model
+		self.use_planner = True
+		self.planner = TurnPlanner()
+		# Set to a RolloutEngine to choose potions and card rewards by playing fights out
+		self.rollouts = None
+		self.potion_threshold = 15 # how much a potion must improve the rollout score to be used outside boss fights
+		self.potions_checked = None
 		
 	def pause(self):
 		self.paused = True
@@ -72,13 +97,17 @@ class SimpleAgent:
 		f.close()
 		
 		self.root = SelectorBehaviour.fromDict(jsonTree,self)
-		self.log(filename + " loaded successfully:")
-		self.log(py_trees.display.ascii_tree(self.root))
+		self.behaviour_tree = py_trees.trees.BehaviourTree(self.root)
+		self.compiled_tree = compile_tree(self.root)
+		self.log("%s loaded successfully:", filename)
+		self.print_tree()
 		
 	def print_tree(self):
-		self.log(py_trees.display.ascii_tree(self.root))
+		if self.log_enabled(4):
+			self.log(py_trees.display.ascii_tree(self.root))
 		
 	# only show to screen if self.debug_level >= debug
+	# only save to logfile if self.logfile_level >= debug
 	"""
 	DEBUG LEVELS
 	-1 Don't even save to logfile
@@ -91,10 +120,41 @@ class SimpleAgent:
 	6 Trace
 	7 All
 	"""
-	def log(self, msg, debug=4):
-		if self.debug_level >= 0 and debug >= 0:
+	@property
+	def debug_level(self):
+		return self._debug_level
+
+	@debug_level.setter
+	def debug_level(self, level):
+		self._debug_level = level
+		self.update_log_threshold()
+
+	@property
+	def logfile_level(self):
+		return self._logfile_level
+
+	@logfile_level.setter
+	def logfile_level(self, level):
+		self._logfile_level = level
+		self.update_log_threshold()
+
+	def update_log_threshold(self):
+		# The highest level which goes anywhere, so log() can drop anything above it straight away
+		level = getattr(self, "_debug_level", -1)
+		self.log_threshold = max(level, self._logfile_level) if level >= 0 else level
+
+	def log_enabled(self, debug):
+		return debug <= self.log_threshold
+
+	# msg is only formatted with args, like msg % args, if the message is going to be used
+	def log(self, msg, *args, debug=4):
+		if debug > self.log_threshold:
+			return
+		if args:
+			msg = msg % args
+		if self._debug_level >= 0 and 0 <= debug <= self._logfile_level:
 			print(str(time.time()) + ": " + msg, file=self.logfile, flush=True)
-		if self.debug_level >= debug:
+		if self._debug_level >= debug:
 			self.debug_queue.append(msg)
 		
 	def init_behaviour_tree(self, root):
@@ -185,7 +245,8 @@ class SimpleAgent:
 		
 		root.add_children([choiceContext, proceedContext, combatContext, cancelContext])
 		self.log("Behaviour Tree initialized.")
-		self.log(py_trees.display.ascii_tree(root))
+		if self.log_enabled(4):
+			self.log(py_trees.display.ascii_tree(root))
 		#py_trees.display.render_dot_tree(root) # FIXME can't render dot tree: FileNotFoundError: [WinError 2] "dot" not found in path.
 		
 	# For this to get plugged in, need to set pre_tick_handler = this func at some point
@@ -210,7 +271,7 @@ class SimpleAgent:
 			return Action()
 			
 	def decide(self, action):
-		self.log(str(action), debug=5)
+		self.log("%s", action, debug=5)
 		return action
 		
 	def change_class(self, new_class):
@@ -224,6 +285,11 @@ class SimpleAgent:
 		else:
 			self.priorities = random.choice(list(PlayerClass))  # Simple FIXME
 
+	# back off before retrying, unless there is no GUI to wait for
+	def wait(self, seconds):
+		if not self.headless:
+			time.sleep(seconds)
+
 	# This error handler is called whenever CommMod throws an error
 	# For example, if we open pause menu, the last action we send will be Invalid
 	# Coordinator still needs an action input, so this function needs to return a valid action
@@ -237,13 +303,13 @@ class SimpleAgent:
 				print(traceback.format_exc(), file=self.logfile, flush=True)
 			# Assume this just means we're paused
 			self.log("Invalid command error", debug=3)
-			time.sleep(1)
+			self.wait(1)
 			return Action()
 		elif "Selected card requires an enemy target" in str(error):
 			# FIXME I think this is related to unpausing from in-game pause menu, we accidentally input an un-initialized play
 			# For now, just try again
 			self.log("Selected card requires target error", debug=3)
-			time.sleep(1)
+			self.wait(1)
 			return Action()
 		else:
 			raise Exception(error)
@@ -259,20 +325,35 @@ class SimpleAgent:
 		if self.blackboard.game.cancel_available:
 			return self.decide(CancelAction())
 		self.log("Error: no choices available. Game paused?", debug=2)
-		time.sleep(1)
+		self.wait(1)
 		return Action()
 
+	def tick_behaviour_tree(self):
+		if self.use_compiled_tree:
+			self.compiled_tree()
+		else:
+			self.behaviour_tree.tick()
+
 	def get_next_action_in_game(self, game_state):
-		time.sleep(self.action_delay)
 		while (self.paused):
 			time.sleep(1)
 			self.think('z')
 		self.blackboard.game = game_state
 		
 		try:
+			latency = self.latency
+			if latency is not None:
+				start = time.perf_counter()
 			self.compute_smart_state()
-			self.log(str(self.blackboard.game), debug=5)
-			self.behaviour_tree.tick() # should add an action to the self.cmd_queue
+			if latency is not None:
+				ticked = time.perf_counter()
+				latency.add("compute_smart_state", ticked - start)
+			self.log("%s", self.blackboard.game, debug=5)
+			if latency is not None:
+				ticked = time.perf_counter()
+			self.tick_behaviour_tree() # should add an action to the self.cmd_queue
+			if latency is not None:
+				latency.add("tick", time.perf_counter() - ticked)
 		except Exception as e:
 			self.log("Agent encountered error", debug=2)
 			self.log(str(e), debug=2)
@@ -284,7 +365,7 @@ class SimpleAgent:
 			self.step = False
 		
 		cmd = self.get_next_cmd()
-		self.log("> " + str(cmd), debug=5)
+		self.log("> %s", cmd, debug=5)
 		return cmd
 		
 
@@ -298,6 +379,9 @@ class SimpleAgent:
 		#hp_percent = (g.current_hp * 100.0) / g.max_hp
 		#self.think("I'm at {0:.0f}% HP".format(hp_percent))
 		
+		# Only notes for the debug display are made here, so skip building them if nothing is shown
+		if not self.log_enabled(5):
+			return
 		for monster in self.blackboard.game.monsters:
 			if monster.half_dead:
 				self.think("{} ({}) is half-dead!".format(monster.name, monster.monster_index))
@@ -323,7 +407,12 @@ class SimpleAgent:
 # ---------------------------------------------
 
 	def handle_combat(self):
-		if self.blackboard.game.room_type == "MonsterRoomBoss" and len(self.blackboard.game.get_real_potions()) > 0:
+		if self.rollouts is not None:
+			if self.blackboard.game.potion_available:
+				potion_action = self.choose_potion_by_rollouts()
+				if potion_action is not None:
+					return self.decide(potion_action)
+		elif self.blackboard.game.room_type == "MonsterRoomBoss" and len(self.blackboard.game.get_real_potions()) > 0:
 			potion_action = self.use_next_potion()
 			if potion_action is not None:
 				return self.decide(potion_action)
@@ -362,6 +451,13 @@ class SimpleAgent:
 		return len(available_monsters) > 1
 
 	def get_play_card_action(self):
+		if self.use_planner:
+			action = self.planner.get_action(self.blackboard.game)
+			if action is not None:
+				return action
+		return self.get_greedy_play_card_action()
+
+	def get_greedy_play_card_action(self):
 		playable_cards = [card for card in self.blackboard.game.hand if card.is_playable]
 		zero_cost_cards = [card for card in playable_cards if card.cost == 0]
 		zero_cost_attacks = [card for card in zero_cost_cards if card.type == spirecomm.spire.card.CardType.ATTACK]
@@ -407,6 +503,33 @@ class SimpleAgent:
 				else:
 					return PotionAction(True, potion=potion)
 
+	def choose_potion_by_rollouts(self):
+		game = self.blackboard.game
+		# Potions are considered once per turn, since each check plays the fight out many times
+		turn = (game.floor, game.turn)
+		if self.potions_checked == turn:
+			return None
+		self.potions_checked = turn
+		baseline, results = self.rollouts.score_potions(game)
+		if len(results) == 0:
+			return None
+		if baseline.rollouts == 0:
+			# The budget ran out before any rollout finished, e.g. while worker processes start
+			self.log("No potion rollouts finished, using the static rules", debug=4)
+			if game.room_type == "MonsterRoomBoss":
+				return self.use_next_potion()
+			return None
+		potion, result = max(results, key=lambda item: rollout_score(item[1]))
+		self.log("Potion rollouts: %s without, %s with %s", baseline, result, potion.potion_id, debug=5)
+		threshold = 0 if game.room_type == "MonsterRoomBoss" else self.potion_threshold
+		if rollout_score(result) - rollout_score(baseline) <= threshold:
+			return None
+		# Another potion may help too, so look again next message
+		self.potions_checked = None
+		if potion.requires_target:
+			return PotionAction(True, potion=potion, target_monster=self.get_low_hp_target())
+		return PotionAction(True, potion=potion)
+
 	# TODO
 	def handle_event(self):
 		#if self.blackboard.game.screen.event_id in ["Vampires", "Masked Bandits", "Knowing Skull", "Ghosts", "Liars Game", "Golden Idol", "Drug Dealer", "The Library"]:
@@ -542,7 +665,20 @@ class SimpleAgent:
 		else:
 			pickable_cards = reward_cards
 		if len(pickable_cards) > 0:
-			potential_pick = self.priorities.get_best_card(pickable_cards)
+			if self.rollouts is not None:
+				skip, results = self.rollouts.score_card_rewards(self.blackboard.game, pickable_cards)
+				if skip.rollouts == 0:
+					# The budget ran out before any rollout finished, e.g. while worker processes start
+					self.log("No card reward rollouts finished, using the priority list", debug=4)
+					potential_pick = self.priorities.get_best_card(pickable_cards)
+				else:
+					potential_pick, result = max(results, key=lambda item: rollout_score(item[1]))
+					if self.blackboard.game.screen.can_skip and not self.blackboard.game.in_combat and rollout_score(skip) >= rollout_score(result):
+						self.log("Card reward rollouts: skipping at %s beats %s at %s", skip, potential_pick.name, result, debug=5)
+						self.skipping_card = True
+						return CancelAction()
+			else:
+				potential_pick = self.priorities.get_best_card(pickable_cards)
 			return CardRewardAction(potential_pick)
 		elif self.blackboard.game.screen.can_bowl:
 			return CardRewardAction(bowl=True)
@@ -550,47 +686,60 @@ class SimpleAgent:
 			self.skipping_card = True
 			return CancelAction()
 			
-	# TODO generate_map_route, then get the actual symbols in order that we'll encounter them
+	def get_map_analysis(self):
+		node_rewards = self.priorities.MAP_NODE_PRIORITIES.get(self.blackboard.game.act)
+		# The map is shared for the whole act, so it only needs analysing once per reward table
+		key = ("analysis", tuple(sorted(node_rewards.items())))
+		analysis = self.blackboard.game.map.routes.get(key)
+		if analysis is None:
+			analysis = MapAnalysis(self.blackboard.game.map, node_rewards)
+			self.blackboard.game.map.routes[key] = analysis
+		return analysis
+
+	def get_route_risk(self):
+		node_rewards = self.priorities.MAP_NODE_PRIORITIES.get(self.blackboard.game.act)
+		# Kept for the whole act, so the values already computed are reused as current_node advances
+		key = ("risk", tuple(sorted(node_rewards.items())), self.route_damage_scale)
+		route_risk = self.blackboard.game.map.routes.get(key)
+		if route_risk is None:
+			route_risk = RouteRisk(self.get_map_analysis(), self.route_damage_scale)
+			self.blackboard.game.map.routes[key] = route_risk
+		return route_risk
+
 	def get_informative_path(self):
-		pass
+		"""The symbols of the rooms on the best route from here, in the order we'll enter them"""
+		current_node = self.blackboard.game.screen.current_node if self.blackboard.game.screen_type == ScreenType.MAP else None
+		analysis = self.get_map_analysis()
+		if current_node is not None and (current_node.x, current_node.y) in analysis.numbers:
+			return [node.symbol for node in analysis.best_route(current_node)[1:]]
+		return [node.symbol for node in analysis.best_route()]
 
-	# TODO How many possible paths are there? Should I just iterate through all possibilities and pick the one that best fits a set of heuristics?
 	def generate_map_route(self):
-		node_rewards = self.priorities.MAP_NODE_PRIORITIES.get(self.blackboard.game.act)
-		best_rewards = {0: {node.x: node_rewards[node.symbol] for node in self.blackboard.game.map.nodes[0].values()}}
-		best_parents = {0: {node.x: 0 for node in self.blackboard.game.map.nodes[0].values()}}
-		min_reward = min(node_rewards.values())
-		map_height = max(self.blackboard.game.map.nodes.keys())
-		for y in range(0, map_height):
-			best_rewards[y+1] = {node.x: min_reward * 20 for node in self.blackboard.game.map.nodes[y+1].values()}
-			best_parents[y+1] = {node.x: -1 for node in self.blackboard.game.map.nodes[y+1].values()}
-			for x in best_rewards[y]:
-				node = self.blackboard.game.map.get_node(x, y)
-				best_node_reward = best_rewards[y][x]
-				for child in node.children:
-					test_child_reward = best_node_reward + node_rewards[child.symbol]
-					if test_child_reward > best_rewards[y+1][child.x]:
-						best_rewards[y+1][child.x] = test_child_reward
-						best_parents[y+1][child.x] = node.x
-		best_path = [0] * (map_height + 1)
-		best_rooms = [0] * (map_height + 1)
-		best_path[map_height] = max(best_rewards[map_height].keys(), key=lambda x: best_rewards[map_height][x])
-		for y in range(map_height, 0, -1):
-			best_path[y - 1] = best_parents[y][best_path[y]]
-			#best_rooms[y - 1] =  # TODO get symbol of best_path[y-1]
+		analysis = self.get_map_analysis()
+		best_path = [0] * (max(self.blackboard.game.map.nodes.keys()) + 1)
+		best_rooms = [0] * len(best_path)
+		for node in analysis.best_route():
+			best_path[node.y] = node.x
+			best_rooms[node.y] = node.symbol
 		self.map_route = best_path
 		self.upcoming_rooms = best_rooms
+		if self.log_enabled(5):
+			self.think("{} routes this act, taking {}".format(analysis.path_count(), "".join(best_rooms)))
 
 	def make_map_choice(self):
 		if len(self.blackboard.game.screen.next_nodes) > 0 and self.blackboard.game.screen.next_nodes[0].y == 0:
 			self.generate_map_route()
-			self.blackboard.game.screen.current_node.y = -1
 		if self.blackboard.game.screen.boss_available:
 			return ChooseMapBossAction()
-		chosen_x = self.map_route[self.blackboard.game.screen.current_node.y + 1]
-		for choice in self.blackboard.game.screen.next_nodes:
-			if choice.x == chosen_x:
-				return ChooseMapNodeAction(choice)
+		# Follow the best route still open from here: by default the one worth most at our HP and
+		# gold, else the highest scoring one, which is the chosen route unless we left it
+		analysis = self.get_map_analysis()
+		choices = [choice for choice in self.blackboard.game.screen.next_nodes if (choice.x, choice.y) in analysis.numbers]
+		if len(choices) > 0 and self.use_risk_routes:
+			game = self.blackboard.game
+			return ChooseMapNodeAction(self.get_route_risk().choose(choices, game.current_hp, game.max_hp, game.gold))
+		elif len(choices) > 0:
+			return ChooseMapNodeAction(max(choices, key=analysis.best_score))
 		# This should never happen
 		return ChooseAction(0)
 
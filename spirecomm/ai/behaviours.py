@@ -19,7 +19,12 @@ class DefaultBehaviour(py_trees.behaviour.Behaviour):
 		super(DefaultBehaviour, self).__init__(name)
 		self.agent = agent
 		
-	def log(self, msg, debug=4):
+	# msg is only formatted with args, like msg % args, if the agent's debug levels let it through
+	def log(self, msg, *args, debug=4):
+		if debug > self.agent.log_threshold:
+			return
+		if args:
+			msg = msg % args
 		self.agent.log(str(self.name) + " [" + str(self.__class__.__name__) + "]: " + msg, debug=debug)
 
 	def setup(self):
@@ -185,8 +190,7 @@ class BoolCheckBehaviour(DefaultBehaviour):
 	def update(self):
 		value = getattr(self.agent.blackboard.game, self.boolean)
 		ret = value if self.success else not value # invert bool if that's what we want to check
-		retStr = "SUCCESS" if ret else "FAILURE"
-		self.log(str(self.boolean) + " is " + str(value) + ": " + retStr, debug=6)
+		self.log("%s is %s: %s", self.boolean, value, "SUCCESS" if ret else "FAILURE", debug=6)
 		return py_trees.common.Status.SUCCESS if ret else py_trees.common.Status.FAILURE
 
 	def to_json(self):
@@ -218,14 +222,7 @@ class EqualityCheckBehaviour(BoolCheckBehaviour):
 	def update(self):
 		value = True if self.first == self.second else False
 		ret = value if self.success else not value # invert bool if that's what we want to check
-		retStr = "SUCCESS" if ret else "FAILURE"
-		logStr = str(self.first) + " "
-		if value:
-			logStr += "== "
-		else:
-			logStr += "!= "
-		logStr += str(self.second) + ": " + retStr
-		self.log(logStr, debug=6)
+		self.log("%s %s %s: %s", self.first, "==" if value else "!=", self.second, "SUCCESS" if ret else "FAILURE", debug=6)
 		return py_trees.common.Status.SUCCESS if ret else py_trees.common.Status.FAILURE
 
 	def to_json(self):
@@ -314,6 +311,7 @@ class ActionBehaviour(DefaultBehaviour):
 classMap = {"SequenceBehaviour":SequenceBehaviour, \
 			"SelectorBehaviour":SelectorBehaviour, \
 			"TestBehaviour":TestBehaviour,\
+			"CustomBehaviour":CustomBehaviour, \
 			"BoolCheckBehaviour":BoolCheckBehaviour, \
 			"EqualityCheckBehaviour":EqualityCheckBehaviour, \
 			"EqualityCheckBehaviour":EqualityCheckBehaviour, \
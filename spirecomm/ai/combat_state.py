@@ -0,0 +1,446 @@
+import array
+
+from spirecomm.spire.character import MONSTER_DEFINITIONS
+from spirecomm.spire.card import CardType
+from spirecomm.communication.action import PlayCardAction
+from spirecomm.ai.planner import card_effects, power_amount, WEAK_POWERS
+from spirecomm.spire.encounters import MONSTERS, monster_tables, weighted_choice
+
+# A compact, cheaply copied model of a fight, for searches and rollouts which need to try plays
+# out without touching the Game.
+#
+# Everything which changes during a fight is a flat array of ints:
+#   hand, draw_pile, discard_pile, exhaust_pile: card numbers, indexes into cards. The hand is in
+#       the game's order, so a position in it is the card_index of a PlayCardAction.
+#   player: PLAYER_HP, PLAYER_BLOCK, ... below
+#   monsters: MONSTER_WIDTH ints per monster which can be fought, MONSTER_HP, MONSTER_BLOCK, ...
+# Everything which doesn't is shared between copies: cards has (cost, effects, has_target,
+# is_power, exhausts) of each distinct card, with the planner's effects, and names has each
+# monster's name, which looks up its MonsterKind. Copying a state copies six small arrays.
+
+PLAYER_HP, PLAYER_BLOCK, PLAYER_ENERGY, PLAYER_STRENGTH, PLAYER_DEXTERITY, PLAYER_WEAK, PLAYER_FRAIL, PLAYER_VULNERABLE = range(8)
+
+# MONSTER_DAMAGE and MONSTER_HITS are the intent's. MONSTER_MOVE and MONSTER_STATE are indexes into
+# the monster's MonsterKind, or -1 if not known. MONSTER_INDEX is the monster's index in the game.
+MONSTER_HP, MONSTER_BLOCK, MONSTER_VULNERABLE, MONSTER_WEAK, MONSTER_STRENGTH, MONSTER_RITUAL, MONSTER_DAMAGE, MONSTER_HITS, \
+	MONSTER_MOVE, MONSTER_STATE, MONSTER_INDEX = range(11)
+MONSTER_WIDTH = 11
+
+MAX_HAND_SIZE = 10
+
+# Cards the model can't play: they cost more energy than the player can have
+UNPLAYABLE_CARD = (99, (), False, False, False)
+
+
+class MonsterKind:
+	"""A monster's states/moves tables with states and moves numbered, so they fit in the arrays
+
+	moves is a tuple of each move's effects. states is a tuple of (moveset, transition) for each
+	state, with moves and states as numbers, and the first state is state "1".
+	"""
+
+	__slots__ = ("name", "moves", "states")
+
+	def __init__(self, name, states, moves):
+		self.name = name
+		move_names = list(moves)
+		state_names = ["1"] + [state for state in states if state != "1"]
+		self.moves = tuple(tuple(tuple(effect) for effect in moves[move]) for move in move_names)
+		self.states = tuple((tuple((move_names.index(move), probability) for move, probability in states[state]["moveset"]),
+							 tuple((state_names.index(next_state), probability) for next_state, probability in states[state]["transition"]))
+							for state in state_names)
+
+	def roll(self, state, rng):
+		"""Pick a move from a state's moveset, and the state to move to"""
+		moveset, transition = self.states[state]
+		return weighted_choice(rng, moveset), weighted_choice(rng, transition)
+
+
+MONSTER_KINDS = {}
+
+
+def monster_kind(name):
+	"""The MonsterKind of a monster, from monsters/ or the simulator, or None if neither has it"""
+	kind = MONSTER_KINDS.get(name, False)
+	if kind is False:
+		kind = None
+		if len(MONSTER_DEFINITIONS.get(name).states) > 0 or name in MONSTERS:
+			kind = MonsterKind(name, *monster_tables(name))
+		MONSTER_KINDS[name] = kind
+	return kind
+
+
+def card_tuple(card):
+	effects = card_effects(card)
+	if effects is None or card.cost < 0:
+		return UNPLAYABLE_CARD
+	return card.cost, effects, card.has_target, card.type == CardType.POWER, card.exhausts
+
+
+class CombatState:
+	"""A fight, as arrays, which can be copied, played and advanced in microseconds"""
+
+	__slots__ = ("cards", "card_keys", "names", "hand", "draw_pile", "discard_pile", "exhaust_pile", "player", "monsters",
+				 "turn", "max_energy", "hand_size", "pending_draws")
+
+	def __init__(self, max_energy=3, hand_size=5):
+		self.cards = []
+		self.card_keys = {}
+		self.names = []
+		self.hand = array.array("h")
+		self.draw_pile = array.array("h")
+		self.discard_pile = array.array("h")
+		self.exhaust_pile = array.array("h")
+		self.player = array.array("i", [0] * 8)
+		self.monsters = array.array("i")
+		self.turn = 0
+		self.max_energy = max_energy
+		self.hand_size = hand_size
+		# Cards to draw before anything else is played, left to the rollout to draw with its own RNG
+		self.pending_draws = 0
+
+	@classmethod
+	def from_game(cls, game, max_energy=3, hand_size=5):
+		"""Model the fight in progress in a Game
+
+		:param game: a state in combat
+		:type game: Game
+		:param max_energy: the energy at the start of each turn
+		:type max_energy: int
+		:param hand_size: the cards drawn at the start of each turn
+		:type hand_size: int
+		:rtype: CombatState
+		"""
+		state = cls(max_energy, hand_size)
+		state.hand = state.card_numbers(game.hand)
+		state.draw_pile = state.card_numbers(game.draw_pile)
+		state.discard_pile = state.card_numbers(game.discard_pile)
+		state.exhaust_pile = state.card_numbers(game.exhaust_pile)
+		player = game.player
+		state.player = array.array("i", [player.current_hp, player.block, player.energy, power_amount(player, ("Strength",)),
+										 power_amount(player, ("Dexterity",)), power_amount(player, WEAK_POWERS),
+										 power_amount(player, ("Frail",)), power_amount(player, ("Vulnerable",))])
+		for monster in game.monsters:
+			if monster.current_hp <= 0 or monster.half_dead or monster.is_gone:
+				continue
+			if monster.intent.is_attack() and monster.move_adjusted_damage is not None and monster.move_adjusted_damage >= 0:
+				damage, hits = monster.move_adjusted_damage, max(monster.move_hits, 1)
+			elif monster.intent.is_attack():
+				damage, hits = 5 * max(game.act, 1), 1
+			else:
+				damage, hits = 0, 0
+			state.names.append(monster.name)
+			state.monsters.extend([monster.current_hp, monster.block, power_amount(monster, ("Vulnerable",)),
+								   power_amount(monster, WEAK_POWERS), power_amount(monster, ("Strength",)),
+								   power_amount(monster, ("Ritual",)), damage, hits, -1, -1, monster.monster_index])
+		state.turn = max(game.turn, 1)
+		state.freeze()
+		return state
+
+	@classmethod
+	def from_deck(cls, deck, current_hp, encounter, rng, max_energy=3, hand_size=5):
+		"""Model a new fight of a deck against monsters the simulator knows, before the first draw
+
+		:param deck: the cards of the deck
+		:type deck: list
+		:param encounter: the names of the monsters, which must be in MONSTERS
+		:type encounter: list
+		:param rng: rolls the monsters' HP
+		:type rng: random.Random
+		:rtype: CombatState
+		"""
+		state = cls(max_energy, hand_size)
+		state.draw_pile = state.card_numbers(deck)
+		state.player = array.array("i", [current_hp, 0, max_energy, 0, 0, 0, 0, 0])
+		for i, name in enumerate(encounter):
+			state.names.append(name)
+			state.monsters.extend([rng.randint(*MONSTERS[name]["hp"]), 0, 0, 0, 0, 0, 0, 0, -1, -1, i])
+		state.freeze()
+		return state
+
+	def card_numbers(self, game_cards):
+		numbers = array.array("h")
+		for card in game_cards:
+			key = (card.card_id, card.upgrades, card.cost, card.has_target, card.exhausts)
+			number = self.card_keys.get(key)
+			if number is None:
+				number = len(self.cards)
+				self.card_keys[key] = number
+				self.cards.append(card_tuple(card))
+			numbers.append(number)
+		return numbers
+
+	def freeze(self):
+		# The shared parts never change once the state is built
+		self.cards = tuple(self.cards)
+		self.names = tuple(self.names)
+
+	def clone(self):
+		"""
+		:return: a copy, sharing only the parts which never change
+		:rtype: CombatState
+		"""
+		state = CombatState.__new__(CombatState)
+		state.cards = self.cards
+		state.card_keys = self.card_keys
+		state.names = self.names
+		state.hand = self.hand[:]
+		state.draw_pile = self.draw_pile[:]
+		state.discard_pile = self.discard_pile[:]
+		state.exhaust_pile = self.exhaust_pile[:]
+		state.player = self.player[:]
+		state.monsters = self.monsters[:]
+		state.turn = self.turn
+		state.max_energy = self.max_energy
+		state.hand_size = self.hand_size
+		state.pending_draws = self.pending_draws
+		return state
+
+	# Queries
+
+	@property
+	def monster_count(self):
+		return len(self.names)
+
+	def monster_value(self, monster, field):
+		return self.monsters[monster * MONSTER_WIDTH + field]
+
+	def alive_monsters(self):
+		monsters = self.monsters
+		return [i for i in range(len(self.names)) if monsters[i * MONSTER_WIDTH + MONSTER_HP] > 0]
+
+	def is_won(self):
+		return len(self.alive_monsters()) == 0
+
+	def is_lost(self):
+		return self.player[PLAYER_HP] <= 0
+
+	def can_play(self, position):
+		return self.cards[self.hand[position]][0] <= self.player[PLAYER_ENERGY]
+
+	def incoming_damage(self):
+		monsters = self.monsters
+		total = 0
+		for base in range(0, len(monsters), MONSTER_WIDTH):
+			if monsters[base + MONSTER_HP] > 0:
+				total += monsters[base + MONSTER_DAMAGE] * monsters[base + MONSTER_HITS]
+		return total
+
+	def to_action(self, position, target=None):
+		"""The action playing a card of this state in the game it was built from
+
+		Only valid while the game's hand is in step with this state's, which it is for states
+		built with from_game and advanced only by apply_play.
+
+		:param position: the card's position in hand
+		:type position: int
+		:param target: the monster, as a number in this state
+		:type target: int
+		:rtype: PlayCardAction
+		"""
+		if target is None or not self.cards[self.hand[position]][2]:
+			return PlayCardAction(card_index=position)
+		return PlayCardAction(card_index=position, target_index=self.monsters[target * MONSTER_WIDTH + MONSTER_INDEX])
+
+	# Changes
+
+	def apply_play(self, position, target=None, rng=None):
+		"""Play a card from hand
+
+		:param position: the card's position in hand
+		:type position: int
+		:param target: the monster to target, as a number in this state, for cards with a target
+		:type target: int
+		:param rng: shuffles the discard pile if a draw needs it; without one, cards aren't drawn
+		:type rng: random.Random
+		:return: the number of cards the play drew, or would have drawn without an rng
+		:rtype: int
+		"""
+		number = self.hand.pop(position)
+		cost, effects, has_target, is_power, exhausts = self.cards[number]
+		self.player[PLAYER_ENERGY] -= cost
+		draws = self.apply_effects(effects, target if has_target else None)
+		if exhausts:
+			self.exhaust_pile.append(number)
+		elif not is_power:
+			self.discard_pile.append(number)
+		if draws > 0 and rng is not None:
+			self.draw(draws, rng)
+		return draws
+
+	def apply_effects(self, effects, target=None):
+		"""Apply card or potion effects in the planner's format
+
+		:return: the number of cards to draw
+		:rtype: int
+		"""
+		player = self.player
+		monsters = self.monsters
+		targets = [target] if target is not None else range(len(self.names))
+		draws = 0
+		for effect, value in effects:
+			if effect in ("Damage", "DamageStrength", "DamageBlock", "DamageAll"):
+				if effect == "DamageStrength":
+					value += 2 * player[PLAYER_STRENGTH]
+				elif effect == "DamageBlock":
+					value = player[PLAYER_BLOCK]
+				for monster in (range(len(self.names)) if effect == "DamageAll" else [target] if target is not None else []):
+					base = monster * MONSTER_WIDTH
+					if monsters[base + MONSTER_HP] > 0:
+						damage = value + player[PLAYER_STRENGTH]
+						if player[PLAYER_WEAK] > 0:
+							damage = int(damage * 0.75)
+						if monsters[base + MONSTER_VULNERABLE] > 0:
+							damage = int(damage * 1.5)
+						hit(monsters, base + MONSTER_HP, base + MONSTER_BLOCK, max(damage, 0))
+			elif effect == "Block":
+				gained = value + player[PLAYER_DEXTERITY]
+				if player[PLAYER_FRAIL] > 0:
+					gained = int(gained * 0.75)
+				player[PLAYER_BLOCK] += max(gained, 0)
+			elif effect == "Vulnerable" or effect == "Weak":
+				field = MONSTER_VULNERABLE if effect == "Vulnerable" else MONSTER_WEAK
+				for monster in targets:
+					base = monster * MONSTER_WIDTH
+					if monsters[base + MONSTER_HP] > 0:
+						monsters[base + field] += value
+			elif effect == "Strength":
+				player[PLAYER_STRENGTH] += value
+			elif effect == "Dexterity":
+				player[PLAYER_DEXTERITY] += value
+			elif effect == "Energy":
+				player[PLAYER_ENERGY] += value
+			elif effect == "LoseHP":
+				player[PLAYER_HP] = max(player[PLAYER_HP] - value, 0)
+			elif effect == "Draw":
+				draws += value
+		return draws
+
+	def draw(self, count, rng):
+		hand = self.hand
+		for _ in range(count):
+			if len(hand) >= MAX_HAND_SIZE:
+				return
+			if len(self.draw_pile) == 0:
+				if len(self.discard_pile) == 0:
+					return
+				pile = list(self.discard_pile)
+				rng.shuffle(pile)
+				self.draw_pile = array.array("h", pile)
+				self.discard_pile = array.array("h")
+			hand.append(self.draw_pile.pop())
+
+	def shuffle_draw_pile(self, rng):
+		pile = list(self.draw_pile)
+		rng.shuffle(pile)
+		self.draw_pile = array.array("h", pile)
+
+	def start_turn(self, rng):
+		"""Reset block and energy and draw a new hand"""
+		self.player[PLAYER_BLOCK] = 0
+		self.player[PLAYER_ENERGY] = self.max_energy
+		self.draw(self.hand_size, rng)
+
+	def end_turn(self, rng):
+		"""Discard the hand, let the monsters act and pick their next moves, then start the next turn
+
+		Monsters with a MonsterKind follow its state machine; the others keep repeating the
+		damage of their current intent.
+		"""
+		self.discard_pile.extend(self.hand)
+		self.hand = array.array("h")
+		player = self.player
+		for debuff in (PLAYER_WEAK, PLAYER_FRAIL, PLAYER_VULNERABLE):
+			if player[debuff] > 0:
+				player[debuff] -= 1
+		for monster in range(len(self.names)):
+			if self.monsters[monster * MONSTER_WIDTH + MONSTER_HP] > 0:
+				self.monster_turn(monster, rng)
+				if player[PLAYER_HP] <= 0:
+					return
+		self.turn += 1
+		self.start_turn(rng)
+
+	def roll_unknown_moves(self, rng):
+		"""Guess where each monster is in its state machine, which a Game doesn't show
+
+		The machine is walked from state "1" for the turns the fight has lasted. Monsters in a
+		new fight (turn 0) also get their first move.
+		"""
+		monsters = self.monsters
+		new_fight = self.turn == 0
+		for monster, name in enumerate(self.names):
+			kind = monster_kind(name)
+			base = monster * MONSTER_WIDTH
+			if kind is None or monsters[base + MONSTER_STATE] != -1:
+				continue
+			state = 0
+			for _ in range(self.turn):
+				move, state = kind.roll(state, rng)
+			monsters[base + MONSTER_STATE] = state
+			if new_fight:
+				self.next_move(monster, kind, rng)
+		if new_fight:
+			self.turn = 1
+
+	def monster_turn(self, monster, rng):
+		monsters = self.monsters
+		player = self.player
+		base = monster * MONSTER_WIDTH
+		monsters[base + MONSTER_BLOCK] = 0
+		ritual = monsters[base + MONSTER_RITUAL]
+		kind = monster_kind(self.names[monster])
+		move = monsters[base + MONSTER_MOVE]
+		if move == -1 or kind is None:
+			# Only the intent's damage is known
+			for _ in range(monsters[base + MONSTER_HITS]):
+				hit(player, PLAYER_HP, PLAYER_BLOCK, monsters[base + MONSTER_DAMAGE])
+		else:
+			for effect, value in kind.moves[move]:
+				if effect == "Damage":
+					hit(player, PLAYER_HP, PLAYER_BLOCK, self.monster_damage(base, value))
+				elif effect == "Block":
+					monsters[base + MONSTER_BLOCK] += value
+				elif effect == "Strength":
+					monsters[base + MONSTER_STRENGTH] += value
+				elif effect == "Ritual":
+					monsters[base + MONSTER_RITUAL] += value
+				elif effect == "Weak":
+					player[PLAYER_WEAK] += value
+				elif effect == "Vulnerable":
+					player[PLAYER_VULNERABLE] += value
+				elif effect == "Frail":
+					player[PLAYER_FRAIL] += value
+		# Ritual only starts adding Strength the turn after it was gained
+		monsters[base + MONSTER_STRENGTH] += ritual
+		for debuff in (MONSTER_VULNERABLE, MONSTER_WEAK):
+			if monsters[base + debuff] > 0:
+				monsters[base + debuff] -= 1
+		if kind is not None:
+			if monsters[base + MONSTER_STATE] == -1:
+				monsters[base + MONSTER_STATE] = 0
+			self.next_move(monster, kind, rng)
+
+	def next_move(self, monster, kind, rng):
+		monsters = self.monsters
+		base = monster * MONSTER_WIDTH
+		move, state = kind.roll(monsters[base + MONSTER_STATE], rng)
+		damages = [value for effect, value in kind.moves[move] if effect == "Damage"]
+		monsters[base + MONSTER_MOVE] = move
+		monsters[base + MONSTER_STATE] = state
+		monsters[base + MONSTER_DAMAGE] = self.monster_damage(base, damages[0]) if damages else 0
+		monsters[base + MONSTER_HITS] = len(damages)
+
+	def monster_damage(self, base, value):
+		damage = value + self.monsters[base + MONSTER_STRENGTH]
+		if self.monsters[base + MONSTER_WEAK] > 0:
+			damage = int(damage * 0.75)
+		if self.player[PLAYER_VULNERABLE] > 0:
+			damage = int(damage * 1.5)
+		return max(damage, 0)
+
+
+def hit(values, hp_index, block_index, damage):
+	blocked = min(values[block_index], damage)
+	values[block_index] -= blocked
+	values[hp_index] = max(values[hp_index] - (damage - blocked), 0)
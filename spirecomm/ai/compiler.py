@@ -0,0 +1,208 @@
+import json
+
+import spirecomm.ai.behaviours
+from spirecomm.ai.behaviours import *
+
+# Compiles a behaviour tree built from the classes in behaviours.py into plain Python closures.
+#
+# The py_trees tree stays the authoring format; the compiled function makes the same decisions
+# without py_trees' generator-based ticking or the leaves' trace logging. None of our leaves
+# ever return RUNNING, so every node compiles to a function returning True for SUCCESS and
+# False for FAILURE, with selectors and sequences short-circuiting like py_trees does.
+
+
+def compile_tree(root):
+	"""Compile a behaviour tree into a function which ticks it once
+
+	:param root: the root of the tree
+	:type root: py_trees.behaviour.Behaviour
+	:return: a function taking no arguments, returning True if the tree succeeded
+	:rtype: function
+	"""
+	return compile_node(root)
+
+
+def compile_tree_file(filename, agent):
+	"""Compile a tree saved with SimpleAgent.tree_to_json
+
+	The tree is loaded exactly as SimpleAgent.json_to_tree would load it, so the compiled
+	function behaves like the loaded tree.
+
+	:param filename: the tree's json file
+	:type filename: str
+	:param agent: the agent the tree's behaviours act on
+	:type agent: SimpleAgent
+	:return: a function taking no arguments, returning True if the tree succeeded
+	:rtype: function
+	"""
+	with open(filename, "r") as f:
+		json_tree = json.load(f)
+	return compile_tree(classMap[json_tree["class"]].fromDict(json_tree, agent))
+
+
+def compile_node(behaviour):
+	# Order matters: CompareToConstBehaviour is an EqualityCheckBehaviour is a BoolCheckBehaviour
+	if isinstance(behaviour, SelectorBehaviour):
+		return compile_selector(behaviour)
+	elif isinstance(behaviour, SequenceBehaviour):
+		return compile_sequence(behaviour)
+	elif isinstance(behaviour, CompareToConstBehaviour):
+		return compile_compare_to_const(behaviour)
+	elif isinstance(behaviour, EqualityCheckBehaviour):
+		return compile_equality_check(behaviour)
+	elif isinstance(behaviour, BoolCheckBehaviour):
+		return compile_bool_check(behaviour)
+	elif isinstance(behaviour, ActionBehaviour):
+		return compile_action(behaviour)
+	elif isinstance(behaviour, CustomBehaviour):
+		return compile_custom(behaviour)
+	elif isinstance(behaviour, TestBehaviour):
+		return compile_test(behaviour)
+	raise TypeError("Can't compile behaviour {} of type {}".format(behaviour.name, type(behaviour).__name__))
+
+
+def children_of(composite):
+	return [child for child in composite.iterate(direct_descendants=True) if child != composite]
+
+
+def compile_selector(selector):
+	children = children_of(selector)
+	dispatch = compile_dispatch(children)
+	if dispatch is not None:
+		return dispatch
+	functions = tuple(compile_node(child) for child in children)
+
+	def tick_selector():
+		for function in functions:
+			if function():
+				return True
+		return False
+	return tick_selector
+
+
+def compile_sequence(sequence):
+	functions = tuple(compile_node(child) for child in children_of(sequence))
+
+	def tick_sequence():
+		for function in functions:
+			if not function():
+				return False
+		return True
+	return tick_sequence
+
+
+def compile_dispatch(children):
+	"""Compile a selector over sequences which each start by comparing the same attribute to a constant
+
+	That is how the tree dispatches on screen_type. The attribute is read once and the sequences
+	whose constant matches are found with a dict lookup, then tried in their original order.
+
+	:return: the compiled selector, or None if the children don't all fit the pattern
+	"""
+	if len(children) < 2:
+		return None
+	attr = None
+	branches = []
+	for child in children:
+		if not isinstance(child, SequenceBehaviour):
+			return None
+		sequence = children_of(child)
+		if len(sequence) == 0:
+			return None
+		check = sequence[0]
+		if type(check) is not CompareToConstBehaviour or not check.success:
+			return None
+		if attr is None:
+			attr = check.attr
+			agent = check.agent
+		elif check.attr != attr or check.agent is not agent:
+			return None
+		try:
+			hash(check.static)
+		except TypeError:
+			return None
+		branches.append((check.static, tuple(compile_node(behaviour) for behaviour in sequence[1:])))
+
+	table = {}
+	for static, functions in branches:
+		table.setdefault(static, []).append(functions)
+	table = {static: tuple(candidates) for static, candidates in table.items()}
+	blackboard = agent.blackboard
+
+	def tick_dispatch():
+		try:
+			candidates = table.get(getattr(blackboard.game, attr), ())
+		except TypeError:
+			# unhashable value, which can't equal any of the constants
+			return False
+		for functions in candidates:
+			for function in functions:
+				if not function():
+					break
+			else:
+				return True
+		return False
+	return tick_dispatch
+
+
+def compile_bool_check(behaviour):
+	blackboard = behaviour.agent.blackboard
+	boolean = behaviour.boolean
+	if behaviour.success:
+		def tick_bool_check():
+			return bool(getattr(blackboard.game, boolean))
+	else:
+		def tick_bool_check():
+			return not getattr(blackboard.game, boolean)
+	return tick_bool_check
+
+
+def compile_equality_check(behaviour):
+	# Both sides are fixed when the tree is built, so the result is too
+	result = (behaviour.first == behaviour.second) == bool(behaviour.success)
+	return lambda: result
+
+
+def compile_compare_to_const(behaviour):
+	blackboard = behaviour.agent.blackboard
+	attr = behaviour.attr
+	static = behaviour.static
+	if behaviour.success:
+		def tick_compare():
+			return getattr(blackboard.game, attr) == static
+	else:
+		def tick_compare():
+			return not getattr(blackboard.game, attr) == static
+	return tick_compare
+
+
+def compile_action(behaviour):
+	agent = behaviour.agent
+	action_name = behaviour.action
+	params = behaviour.params
+	# ActionBehaviour looks its action up in the behaviours module when ticked
+	action_classes = vars(spirecomm.ai.behaviours)
+
+	def tick_action():
+		agent.cmd_queue.append(action_classes[action_name](*params))
+		return True
+	return tick_action
+
+
+def compile_custom(behaviour):
+	agent = behaviour.agent
+	function_name = behaviour.function
+
+	def tick_custom():
+		agent.cmd_queue.append(getattr(agent, function_name)())
+		return True
+	return tick_custom
+
+
+def compile_test(behaviour):
+	agent = behaviour.agent
+
+	def tick_test():
+		agent.cmd_queue.append(agent.default_logic(agent.blackboard.game))
+		return True
+	return tick_test
@@ -0,0 +1,263 @@
+import array
+import heapq
+
+# Route statistics for an act's map, computed once per act so each map screen only looks them up.
+#
+# Nodes are numbered row by row, bottom row first, and the graph is held in arrays: the x, y and
+# symbol of each node, and its children as a slice of child_nodes from child_start[node] to
+# child_start[node + 1]. Everything is computed from each node to the top of the map, so the
+# statistics of a node cover every route still open to a player standing on it.
+
+SYMBOLS = ("R", "E", "$", "?", "M", "T")
+OTHER_SYMBOL = len(SYMBOLS)
+
+
+class MapAnalysis:
+	"""Path counts, symbol counts and the k best routes from every node of a map
+
+	A route's score is the sum of node_rewards over its rooms, as in the priorities'
+	MAP_NODE_PRIORITIES tables. Queries take a map Node, or None for the start of the act,
+	before any room of the bottom row is chosen.
+	"""
+
+	def __init__(self, dungeon_map, node_rewards, k=5):
+		"""
+		:param dungeon_map: the act's map
+		:type dungeon_map: Map
+		:param node_rewards: how much each symbol is worth on a route
+		:type node_rewards: dict
+		:param k: how many of the best routes to keep from each node
+		:type k: int
+		"""
+		self.k = k
+		self.nodes = [dungeon_map.nodes[y][x] for y in sorted(dungeon_map.nodes) for x in sorted(dungeon_map.nodes[y])]
+		self.numbers = {(node.x, node.y): number for number, node in enumerate(self.nodes)}
+		count = len(self.nodes)
+		self.node_x = array.array("h", [node.x for node in self.nodes])
+		self.node_y = array.array("h", [node.y for node in self.nodes])
+		self.node_symbol = array.array("b", [SYMBOLS.index(node.symbol) if node.symbol in SYMBOLS else OTHER_SYMBOL
+											 for node in self.nodes])
+		self.child_start = array.array("h", [0])
+		self.child_nodes = array.array("h")
+		for node in self.nodes:
+			self.child_nodes.extend(self.numbers[(child.x, child.y)] for child in node.children)
+			self.child_start.append(len(self.child_nodes))
+		rewards = [node_rewards.get(symbol, 0) for symbol in SYMBOLS] + [0]
+		self.rewards = array.array("i", [rewards[symbol] for symbol in self.node_symbol])
+		self.start_nodes = [number for number in range(count) if self.node_y[number] == self.node_y[0]] if count else []
+
+		width = len(SYMBOLS)
+		self.path_counts = array.array("q", [0] * count)
+		self.min_symbols = array.array("h", [0] * (count * width))
+		self.max_symbols = array.array("h", [0] * (count * width))
+		self.best_routes = [None] * count
+		# Children are always in a higher row, so they come later in the numbering
+		for number in range(count - 1, -1, -1):
+			self.analyse_node(number)
+		self.start_routes = heapq.nlargest(k, (route for number in self.start_nodes for route in self.best_routes[number]),
+										   key=lambda route: route[0])
+
+	def analyse_node(self, number):
+		width = len(SYMBOLS)
+		children = self.child_nodes[self.child_start[number]:self.child_start[number + 1]]
+		base = number * width
+		symbol = self.node_symbol[number]
+		reward = self.rewards[number]
+		if len(children) == 0:
+			self.path_counts[number] = 1
+			self.best_routes[number] = [(reward, (number,))]
+		else:
+			first = children[0] * width
+			self.min_symbols[base:base + width] = self.min_symbols[first:first + width]
+			self.max_symbols[base:base + width] = self.max_symbols[first:first + width]
+			path_count = self.path_counts[children[0]]
+			routes = list(self.best_routes[children[0]])
+			for child in children[1:]:
+				path_count += self.path_counts[child]
+				for s in range(width):
+					self.min_symbols[base + s] = min(self.min_symbols[base + s], self.min_symbols[child * width + s])
+					self.max_symbols[base + s] = max(self.max_symbols[base + s], self.max_symbols[child * width + s])
+				routes.extend(self.best_routes[child])
+			self.path_counts[number] = path_count
+			if len(children) > 1:
+				routes = heapq.nlargest(self.k, routes, key=lambda route: route[0])
+			self.best_routes[number] = [(reward + score, (number,) + route) for score, route in routes]
+		if symbol != OTHER_SYMBOL:
+			self.min_symbols[base + symbol] += 1
+			self.max_symbols[base + symbol] += 1
+
+	def node_number(self, node):
+		return self.numbers[(node.x, node.y)]
+
+	def path_count(self, node=None):
+		"""The number of routes from a node to the top of the map"""
+		if node is None:
+			return sum(self.path_counts[number] for number in self.start_nodes)
+		return self.path_counts[self.node_number(node)]
+
+	def symbol_range(self, node, symbol):
+		"""The fewest and most rooms of a symbol on any route from a node, counting the node
+
+		:param symbol: one of SYMBOLS
+		:type symbol: str
+		:return: (min, max)
+		:rtype: tuple
+		"""
+		index = self.node_number(node) * len(SYMBOLS) + SYMBOLS.index(symbol)
+		return self.min_symbols[index], self.max_symbols[index]
+
+	def best_score(self, node=None):
+		"""The score of the best route from a node, counting the node"""
+		routes = self.start_routes if node is None else self.best_routes[self.node_number(node)]
+		return routes[0][0]
+
+	def top_routes(self, node=None):
+		"""The k best routes from a node, best first
+
+		:return: (score, the route's Nodes, starting with node) for each route
+		:rtype: list
+		"""
+		routes = self.start_routes if node is None else self.best_routes[self.node_number(node)]
+		return [(score, [self.nodes[number] for number in route]) for score, route in routes]
+
+	def best_route(self, node=None):
+		"""The Nodes of the best route from a node, starting with it"""
+		return self.top_routes(node)[0][1]
+
+
+# The risk model of RouteRisk. HP is counted in buckets of 1/HP_BUCKETS of max HP, with bucket 0
+# meaning dead, and gold in buckets of GOLD_STEP up to GOLD_BUCKETS - 1.
+HP_BUCKETS = 20
+GOLD_STEP = 25
+GOLD_BUCKETS = 13
+
+# The outcomes of entering each kind of room: (probability, HP change as a fraction of max HP,
+# gold change, value). Values are what the room's rewards are worth, in the same units as
+# BOSS_VALUE; they are only collected by surviving the room.
+ROOM_OUTCOMES = {
+	"M": ((0.3, -0.05, 15, 10), (0.5, -0.12, 15, 10), (0.2, -0.25, 15, 10)),
+	"E": ((0.3, -0.15, 30, 40), (0.4, -0.3, 30, 40), (0.3, -0.5, 30, 40)),
+	"?": ((0.5, 0, 0, 5), (0.25, -0.1, 15, 10), (0.15, 0, 50, 0), (0.1, -0.08, 0, 5)),
+	"T": ((1.0, 0, 40, 30),),
+}
+# The act's boss, fought after the top row
+BOSS_OUTCOMES = ((0.3, -0.3), (0.4, -0.45), (0.3, -0.65))
+BOSS_VALUE = 100
+GOLD_VALUE = 1 # per GOLD_STEP carried into the next act
+# A shop is worth SHOP_VALUE if SHOP_COST can be spent in it, else SHOP_MISS
+SHOP_COST = 150
+SHOP_VALUE = 35
+SHOP_MISS = 2
+# Rest sites heal below half HP and upgrade a card otherwise, as choose_rest_option does
+REST_HEAL = 0.3
+UPGRADE_VALUE = 12
+
+
+def hp_bucket(hp, max_hp):
+	if hp <= 0 or max_hp <= 0:
+		return 0
+	return min(HP_BUCKETS, max(1, -(-hp * HP_BUCKETS // max_hp)))
+
+
+def hp_index(change):
+	"""Where each HP bucket ends up after an HP change, with the dead staying dead"""
+	shift = int(round(change * HP_BUCKETS))
+	return [0] + [min(max(h + shift, 0), HP_BUCKETS) for h in range(1, HP_BUCKETS + 1)]
+
+
+def gold_index(change):
+	shift = change // GOLD_STEP
+	return [min(max(g + shift, 0), GOLD_BUCKETS - 1) for g in range(GOLD_BUCKETS)]
+
+
+class RouteRisk:
+	"""Expected value of a route over (node, HP bucket, gold bucket), taking deaths into account
+
+	For every node the value of entering it is kept for every HP and gold bucket at once, as a
+	row of HP values per gold bucket, so a choice at a map screen is a lookup with the current
+	HP and gold. Nodes are only valued when first asked about, from the rows of their children,
+	so as current_node advances the values already computed are reused and nothing is
+	recomputed.
+	"""
+
+	def __init__(self, analysis, damage_scale=1.0):
+		"""
+		:param analysis: the analysis of the act's map, whose node numbering and arrays are used
+		:type analysis: MapAnalysis
+		:param damage_scale: multiplies all the HP lost in rooms and to the boss, for weaker or stronger decks
+		:type damage_scale: float
+		"""
+		self.analysis = analysis
+		self.damage_scale = damage_scale
+		self.values = [None] * len(analysis.nodes)
+		self.outcomes = {symbol: [(probability, hp_index(self.scaled(change)), gold_index(gold), value)
+								  for probability, change, gold, value in outcomes]
+						 for symbol, outcomes in ROOM_OUTCOMES.items()}
+		self.heal_index = hp_index(REST_HEAL)
+		self.shop_gold_index = gold_index(-SHOP_COST)
+		boss = [0.0] * (HP_BUCKETS + 1)
+		for probability, change in BOSS_OUTCOMES:
+			index = hp_index(self.scaled(change))
+			boss = [total + probability * BOSS_VALUE * (index[h] > 0) for h, total in enumerate(boss)]
+		self.boss = [[total + GOLD_VALUE * g if h else 0.0 for h, total in enumerate(boss)] for g in range(GOLD_BUCKETS)]
+
+	def scaled(self, change):
+		return change * self.damage_scale if change < 0 else change
+
+	def node_values(self, number):
+		"""The value of entering a node, by gold bucket then HP bucket"""
+		values = self.values[number]
+		if values is None:
+			analysis = self.analysis
+			children = analysis.child_nodes[analysis.child_start[number]:analysis.child_start[number + 1]]
+			if len(children) == 0:
+				after = self.boss
+			else:
+				after = self.node_values(children[0])
+				for child in children[1:]:
+					after = [[max(a, b) for a, b in zip(row, other)] for row, other in zip(after, self.node_values(child))]
+			symbol = analysis.node_symbol[number]
+			values = self.room_values(SYMBOLS[symbol] if symbol != OTHER_SYMBOL else None, after)
+			self.values[number] = values
+		return values
+
+	def room_values(self, symbol, after):
+		"""The value of entering a room before the values after it, by gold bucket then HP bucket"""
+		if symbol == "R":
+			half = HP_BUCKETS // 2
+			return [[0.0 if h == 0 else row[self.heal_index[h]] if h < half else row[h] + UPGRADE_VALUE
+					 for h in range(HP_BUCKETS + 1)] for row in after]
+		if symbol == "$":
+			shop = SHOP_COST // GOLD_STEP
+			return [[value + SHOP_VALUE if h else 0.0 for h, value in enumerate(after[self.shop_gold_index[g]])] if g >= shop
+					else [value + SHOP_MISS if h else 0.0 for h, value in enumerate(after[g])] for g in range(GOLD_BUCKETS)]
+		outcomes = self.outcomes.get(symbol)
+		if outcomes is None:
+			return after
+		values = []
+		for g in range(GOLD_BUCKETS):
+			row = [0.0] * (HP_BUCKETS + 1)
+			for probability, index, gold, value in outcomes:
+				next_row = after[gold[g]]
+				row = [total + probability * (next_row[j] + value) if j else total for total, j in zip(row, index)]
+			values.append(row)
+		return values
+
+	def value(self, node, hp, max_hp, gold):
+		"""The expected value of entering a node with some HP and gold
+
+		:param node: a node of the map
+		:type node: Node
+		:rtype: float
+		"""
+		row = self.node_values(self.analysis.node_number(node))[min(max(gold // GOLD_STEP, 0), GOLD_BUCKETS - 1)]
+		return row[hp_bucket(hp, max_hp)]
+
+	def choose(self, choices, hp, max_hp, gold):
+		"""The choice with the highest expected value, breaking ties by the analysis' route score
+
+		:param choices: the map's next nodes
+		:type choices: list
+		:rtype: Node
+		"""
+		return max(choices, key=lambda node: (self.value(node, hp, max_hp, gold), self.analysis.best_score(node)))
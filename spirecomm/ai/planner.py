@@ -0,0 +1,452 @@
+import time
+
+from spirecomm.spire.card import CARD_DEFINITIONS
+from spirecomm.communication.action import PlayCardAction, EndTurnAction
+
+# Plans a whole turn of card plays at once, instead of picking one card per message.
+#
+# The planner models the hand, energy, block, strength and each monster's HP, block, Vulnerable
+# and Weak, and searches every order of plays for the one which leaves the best end of turn:
+# damage dealt and monsters killed, against the HP the monsters' intents will take. Plays which
+# lead to the same state are searched once through a transposition table, and identical cards
+# (five Strikes, say) are one symbol with a count, so playing "a" Strike is one branch, not five.
+#
+# The plan is kept and replayed over the following messages, as long as each message shows the
+# state the model predicted. When it doesn't (a card drew, or did something the model doesn't
+# know about) the rest of the turn is planned again from what actually happened.
+
+# The cards the planner can model, by card id. Effects are applied in order:
+#   Damage n: n attack damage to the target
+#   DamageAll n: n attack damage to every monster
+#   Block n: n block, with Dexterity and Frail
+#   Vulnerable n, Weak n: applied to the target, or to every monster for cards without a target
+#   Strength n, Energy n, LoseHP n: to the player
+#   Draw n: draws cards the planner can't know, so a plan stops after it
+# Damage, Block and Draw values in cards/[name].json take precedence, as in the simulator.
+CARD_EFFECTS = {
+	# Ironclad
+	"Strike_R": (("Damage", 6),),
+	"Defend_R": (("Block", 5),),
+	"Bash": (("Damage", 8), ("Vulnerable", 2)),
+	"Anger": (("Damage", 6),),
+	"Body Slam": (("DamageBlock", 0),), # damage equal to the player's block
+	"Clothesline": (("Damage", 12), ("Weak", 2)),
+	"Cleave": (("DamageAll", 8),),
+	"Heavy Blade": (("DamageStrength", 14),),
+	"Iron Wave": (("Damage", 5), ("Block", 5)),
+	"Pommel Strike": (("Damage", 9), ("Draw", 1)),
+	"Shrug It Off": (("Block", 8), ("Draw", 1)),
+	"Thunderclap": (("DamageAll", 4), ("Vulnerable", 1)),
+	"Twin Strike": (("Damage", 5), ("Damage", 5)),
+	"Wild Strike": (("Damage", 12),),
+	"Bloodletting": (("LoseHP", 3), ("Energy", 2)),
+	"Carnage": (("Damage", 20),),
+	"Flame Barrier": (("Block", 12),),
+	"Ghostly Armor": (("Block", 10),),
+	"Hemokinesis": (("LoseHP", 2), ("Damage", 15)),
+	"Inflame": (("Strength", 2),),
+	"Seeing Red": (("Energy", 2),),
+	"Uppercut": (("Damage", 13), ("Weak", 1), ("Vulnerable", 1)),
+	"Offering": (("LoseHP", 6), ("Energy", 2), ("Draw", 3)),
+	"Impervious": (("Block", 30),),
+	# Silent
+	"Strike_G": (("Damage", 6),),
+	"Defend_G": (("Block", 5),),
+	"Neutralize": (("Damage", 3), ("Weak", 1)),
+	"Survivor": (("Block", 8),),
+	"Dagger Spray": (("DamageAll", 4), ("DamageAll", 4)),
+	"Deflect": (("Block", 4),),
+	"Quick Slash": (("Damage", 8), ("Draw", 1)),
+	"Slice": (("Damage", 6),),
+	"Sucker Punch": (("Damage", 7), ("Weak", 1)),
+	"Backflip": (("Block", 5), ("Draw", 2)),
+	"Dash": (("Damage", 10), ("Block", 10)),
+	"Leg Sweep": (("Weak", 2), ("Block", 11)),
+	"Predator": (("Damage", 15),),
+	# Defect
+	"Strike_B": (("Damage", 6),),
+	"Defend_B": (("Block", 5),),
+	"Beam Cell": (("Damage", 3), ("Vulnerable", 1)),
+	"Claw": (("Damage", 3),),
+	"Cold Snap": (("Damage", 6),),
+	"Ball Lightning": (("Damage", 7),),
+	"Compile Driver": (("Damage", 7),),
+	"Go for the Eyes": (("Damage", 3),),
+	"Sweeping Beam": (("DamageAll", 6), ("Draw", 1)),
+	"Charge Battery": (("Block", 7),),
+	"Leap": (("Block", 9),),
+	"Steam Barrier": (("Block", 6),),
+	# Colorless
+	"Flash of Steel": (("Damage", 3), ("Draw", 1)),
+	"Swift Strike": (("Damage", 7),),
+	"Dramatic Entrance": (("DamageAll", 8),),
+}
+
+# Upgrades are modelled as this much more on each Damage and Block effect, which is right for
+# the basic cards and close for most others
+UPGRADE_BONUS = 3
+
+WEAK_POWERS = ("Weakened", "Weak")
+
+
+def power_amount(character, power_ids):
+	amount = 0
+	for power in character.powers:
+		if power.power_id in power_ids:
+			amount += power.amount
+	return amount
+
+
+def card_effects(card):
+	"""The effects of a card, as the planner models them
+
+	:param card: the card
+	:type card: Card
+	:return: the card's (effect, value) pairs, or None if the planner can't model it
+	:rtype: tuple
+	"""
+	effects = CARD_EFFECTS.get(card.card_id)
+	if effects is None:
+		return None
+	definition = CARD_DEFINITIONS.get(card.name)
+	overrides = {"Damage": definition["damage"], "Block": definition["mitigation"], "Draw": definition["draw"]}
+	modelled = []
+	for effect, value in effects:
+		if overrides.get(effect) is not None:
+			value = overrides[effect]
+		if effect in ("Damage", "DamageAll", "DamageStrength", "Block"):
+			value += UPGRADE_BONUS * card.upgrades
+		modelled.append((effect, value))
+	return tuple(modelled)
+
+
+class CardSymbol:
+	"""Every card in hand with the same id, upgrades and cost, which play identically"""
+
+	__slots__ = ("key", "card_id", "cost", "has_target", "effects", "draws")
+
+	def __init__(self, card, effects):
+		self.key = (card.card_id, card.upgrades, card.cost)
+		self.card_id = card.card_id
+		self.cost = card.cost
+		self.has_target = card.has_target
+		self.effects = effects
+		self.draws = any(effect == "Draw" for effect, value in effects)
+
+
+class Plan:
+	"""The plays chosen for the rest of a turn, with the state predicted after each one
+
+	steps is a list of (symbol, target index, predicted observation after the play). If ends_turn
+	is True, the turn ends once every step has been played.
+	"""
+
+	def __init__(self, steps, ends_turn, start, value, nodes, seconds, complete):
+		self.steps = steps
+		self.ends_turn = ends_turn
+		self.start = start
+		self.value = value
+		self.nodes = nodes
+		self.seconds = seconds
+		self.complete = complete # False if the time budget ran out before every order was searched
+		self.next_step = 0
+
+
+class TurnPlanner:
+	"""Searches the orders of card plays for the rest of a turn, and replays the best one
+
+	A search state is a tuple:
+		(energy, block, strength, counts, monsters, hp_lost, cards_drawn)
+	where counts has the number of cards left in hand of each symbol, and monsters is a tuple of
+	(hp, block, vulnerable, weak) for each monster in the game's order, with hp 0 for monsters
+	which can't be targeted.
+	"""
+
+	# Weights of the end of turn evaluation
+	KILL_VALUE = 30.0
+	WIN_VALUE = 1000.0
+	DAMAGE_VALUE = 1.0
+	HP_LOSS_VALUE = 1.5
+	EXCESS_BLOCK_VALUE = 0.05
+	VULNERABLE_VALUE = 2.0 # per turn of Vulnerable added to a monster which is still alive, up to 3
+	WEAK_VALUE = 1.5 # per turn of Weak added to a monster which is still alive, up to 3
+	STRENGTH_VALUE = 3.0
+	DRAW_VALUE = 2.0
+
+	def __init__(self, budget=0.05, unknown_damage_per_act=5):
+		"""
+		:param budget: the most seconds to spend searching for a plan
+		:type budget: float
+		:param unknown_damage_per_act: damage to expect from a monster whose intent isn't known, times the act
+		:type unknown_damage_per_act: int
+		"""
+		self.budget = budget
+		self.unknown_damage_per_act = unknown_damage_per_act
+		self.plan = None
+		self.plans_made = 0
+		self.plans_reused = 0
+
+	def get_action(self, game):
+		"""Get the next action of the best plan for the rest of the turn
+
+		:param game: the current state, in combat with a card playable
+		:type game: Game
+		:return: the action, or None if the hand has cards the planner can't model or the plan's
+				 next card can't be played, in which case the plan is dropped
+		:rtype: Action
+		"""
+		plan = self.plan
+		if plan is not None and (self.observe(game) != self.expected_observation(plan)
+								 or (plan.next_step >= len(plan.steps) and not plan.ends_turn)):
+			plan = None
+		if plan is None:
+			plan = self.make_plan(game)
+			self.plan = plan
+			if plan is None:
+				return None
+		else:
+			self.plans_reused += 1
+		if plan.next_step >= len(plan.steps):
+			self.plan = None
+			return EndTurnAction()
+		symbol, target_index, predicted = plan.steps[plan.next_step]
+		action = self.play_action(game, symbol, target_index)
+		if action is None:
+			# The planned card isn't in hand or can't be played, so the plan no longer applies
+			self.clear()
+			return None
+		plan.next_step += 1
+		return action
+
+	def expected_observation(self, plan):
+		if plan.next_step == 0:
+			return plan.start
+		return plan.steps[plan.next_step - 1][2]
+
+	def clear(self):
+		self.plan = None
+
+	def observe(self, game):
+		"""What is compared with a plan's predictions: the turn, energy, block, the hand and the monsters' HP and block"""
+		hand = tuple(sorted((card.card_id, card.upgrades, card.cost) for card in game.hand))
+		monsters = tuple((monster.current_hp, monster.block) if self.is_target(monster) else (0, 0) for monster in game.monsters)
+		return game.turn, game.player.energy, game.player.block, hand, monsters
+
+	def is_target(self, monster):
+		return monster.current_hp > 0 and not monster.half_dead and not monster.is_gone
+
+	def play_action(self, game, symbol, target_index):
+		for card in game.hand:
+			if (card.card_id, card.upgrades, card.cost) == symbol.key and card.is_playable:
+				if target_index is None:
+					return PlayCardAction(card=card)
+				return PlayCardAction(card=card, target_monster=game.monsters[target_index])
+		return None
+
+	def make_plan(self, game):
+		"""Search every order of plays for the rest of the turn
+
+		:param game: the current state
+		:type game: Game
+		:return: the best plan found within the time budget, or None if the hand has cards the planner can't model
+		:rtype: Plan
+		"""
+		start_time = time.perf_counter()
+		symbols = {}
+		counts = {}
+		for card in game.hand:
+			if not card.is_playable:
+				continue
+			key = (card.card_id, card.upgrades, card.cost)
+			if key not in symbols:
+				if card.cost < 0:
+					return None
+				effects = card_effects(card)
+				if effects is None:
+					return None
+				symbols[key] = CardSymbol(card, effects)
+				counts[key] = 0
+			counts[key] += 1
+		keys = sorted(symbols)
+		self.symbols = [symbols[key] for key in keys]
+		player = game.player
+		self.dexterity = power_amount(player, ("Dexterity",))
+		self.frail = power_amount(player, ("Frail",)) > 0
+		self.player_weak = power_amount(player, WEAK_POWERS) > 0
+		self.start_hp = []
+		self.start_vulnerable = []
+		self.start_weak = []
+		self.intents = []
+		monsters = []
+		for monster in game.monsters:
+			if self.is_target(monster):
+				vulnerable = power_amount(monster, ("Vulnerable",))
+				weak = power_amount(monster, WEAK_POWERS)
+				monsters.append((monster.current_hp, monster.block, vulnerable, weak))
+				self.start_hp.append(monster.current_hp)
+				self.start_vulnerable.append(vulnerable)
+				self.start_weak.append(weak)
+				self.intents.append(self.intent_damage(game, monster))
+			else:
+				monsters.append((0, 0, 0, 0))
+				self.start_hp.append(0)
+				self.start_vulnerable.append(0)
+				self.start_weak.append(0)
+				self.intents.append((0, 0))
+		self.start_strength = power_amount(player, ("Strength",))
+		state = (player.energy, player.block, self.start_strength, tuple(counts[key] for key in keys), tuple(monsters), 0, 0)
+
+		self.table = {}
+		self.nodes = 0
+		self.deadline = start_time + self.budget
+		self.complete = True
+		value, move = self.search(state)
+
+		steps = []
+		hand = [key for key in keys for i in range(counts[key])]
+		unplayable = [(card.card_id, card.upgrades, card.cost) for card in game.hand if not card.is_playable]
+		ends_turn = True
+		while move is not None:
+			symbol_index, target_index = move
+			symbol = self.symbols[symbol_index]
+			state = self.play(state, symbol_index, target_index)
+			hand.remove(symbol.key)
+			predicted_monsters = tuple((hp, block) for hp, block, vulnerable, weak in state[4])
+			steps.append((symbol, target_index, (game.turn, state[0], state[1], tuple(sorted(hand + unplayable)), predicted_monsters)))
+			if symbol.draws:
+				# The rest of the turn depends on the cards drawn
+				ends_turn = False
+				break
+			value_here, move = self.table[state]
+		self.plans_made += 1
+		return Plan(steps, ends_turn, self.observe(game), value, self.nodes, time.perf_counter() - start_time, self.complete)
+
+	def intent_damage(self, game, monster):
+		"""The damage per hit and hits a monster's intent will deal"""
+		if monster.intent.is_attack() and monster.move_adjusted_damage is not None and monster.move_adjusted_damage >= 0:
+			return monster.move_adjusted_damage, max(monster.move_hits, 1)
+		if monster.intent.is_attack() or monster.intent.name == "NONE":
+			return self.unknown_damage_per_act * game.act, 1
+		return 0, 0
+
+	def search(self, state):
+		"""The best value reachable from a state, and the play which reaches it
+
+		:return: (value, (symbol index, target index)), with None for the play if ending the turn is best
+		:rtype: tuple
+		"""
+		best = self.table.get(state)
+		if best is not None:
+			return best
+		self.nodes += 1
+		best = (self.evaluate(state), None)
+		if self.nodes & 255 == 0 and time.perf_counter() > self.deadline:
+			self.complete = False
+		if self.complete and any(hp > 0 for hp, block, vulnerable, weak in state[4]):
+			energy = state[0]
+			for symbol_index, count in enumerate(state[3]):
+				if count == 0:
+					continue
+				symbol = self.symbols[symbol_index]
+				if symbol.cost > energy:
+					continue
+				if symbol.has_target:
+					targets = [i for i, monster in enumerate(state[4]) if monster[0] > 0]
+				else:
+					targets = [None]
+				for target_index in targets:
+					child = self.play(state, symbol_index, target_index)
+					if symbol.draws:
+						value = self.evaluate(child)
+						self.table.setdefault(child, (value, None))
+					else:
+						value = self.search(child)[0]
+					if value > best[0]:
+						best = (value, (symbol_index, target_index))
+		self.table[state] = best
+		return best
+
+	def attack_damage(self, base, strength, vulnerable):
+		damage = base + strength
+		if self.player_weak:
+			damage = int(damage * 0.75)
+		if vulnerable > 0:
+			damage = int(damage * 1.5)
+		return max(damage, 0)
+
+	def play(self, state, symbol_index, target_index):
+		"""The state after playing a card of a symbol on a target"""
+		energy, block, strength, counts, monsters, hp_lost, drawn = state
+		symbol = self.symbols[symbol_index]
+		energy -= symbol.cost
+		counts = counts[:symbol_index] + (counts[symbol_index] - 1,) + counts[symbol_index + 1:]
+		monsters = list(monsters)
+		for effect, value in symbol.effects:
+			if effect in ("Damage", "DamageStrength", "DamageBlock"):
+				if effect == "DamageStrength":
+					# Heavy Blade: Strength counts three times
+					value += 2 * strength
+				elif effect == "DamageBlock":
+					value = block
+				if target_index is not None and monsters[target_index][0] > 0:
+					monsters[target_index] = self.hit(monsters[target_index], self.attack_damage(value, strength, monsters[target_index][2]))
+			elif effect == "DamageAll":
+				for i, monster in enumerate(monsters):
+					if monster[0] > 0:
+						monsters[i] = self.hit(monster, self.attack_damage(value, strength, monster[2]))
+			elif effect == "Block":
+				gained = value + self.dexterity
+				if self.frail:
+					gained = int(gained * 0.75)
+				block += max(gained, 0)
+			elif effect == "Vulnerable" or effect == "Weak":
+				position = 2 if effect == "Vulnerable" else 3
+				for i in ([target_index] if target_index is not None else range(len(monsters))):
+					monster = monsters[i]
+					if monster[0] > 0:
+						monsters[i] = monster[:position] + (monster[position] + value,) + monster[position + 1:]
+			elif effect == "Strength":
+				strength += value
+			elif effect == "Energy":
+				energy += value
+			elif effect == "LoseHP":
+				hp_lost += value
+			elif effect == "Draw":
+				drawn += value
+		return energy, block, strength, counts, tuple(monsters), hp_lost, drawn
+
+	def hit(self, monster, damage):
+		hp, block, vulnerable, weak = monster
+		blocked = min(block, damage)
+		return max(hp - (damage - blocked), 0), block - blocked, vulnerable, weak
+
+	def evaluate(self, state):
+		"""How good ending the turn in a state is"""
+		energy, block, strength, counts, monsters, hp_lost, drawn = state
+		value = 0.0
+		incoming = 0
+		alive = 0
+		for i, (hp, monster_block, vulnerable, weak) in enumerate(monsters):
+			start_hp = self.start_hp[i]
+			if start_hp == 0:
+				continue
+			value += self.DAMAGE_VALUE * (start_hp - hp)
+			if hp == 0:
+				value += self.KILL_VALUE
+				continue
+			alive += 1
+			damage, hits = self.intents[i]
+			if weak > 0 and self.start_weak[i] == 0:
+				damage = int(damage * 0.75)
+			incoming += damage * hits
+			value += self.VULNERABLE_VALUE * max(min(vulnerable, 3) - self.start_vulnerable[i], 0)
+			value += self.WEAK_VALUE * max(min(weak, 3) - self.start_weak[i], 0)
+		if alive == 0:
+			value += self.WIN_VALUE
+		else:
+			value -= self.HP_LOSS_VALUE * max(incoming - block, 0)
+			value += self.EXCESS_BLOCK_VALUE * max(block - incoming, 0)
+		value -= self.HP_LOSS_VALUE * hp_lost
+		value += self.STRENGTH_VALUE * (strength - self.start_strength)
+		value += self.DRAW_VALUE * drawn
+		return value
@@ -1,5 +1,38 @@
 import math
 
+# Score of cards which aren't in a priority list. Larger than any listed card's score.
+UNLISTED_SCORE = math.inf
+
+
+class PriorityIndex:
+	"""Lookup tables derived from the lists of one Priority class
+
+	Scores are integers: twice the card's position in the list, minus its number of upgrades,
+	which orders cards exactly like position - 0.5 * upgrades. Unlisted cards all score
+	UNLISTED_SCORE regardless of upgrades.
+	"""
+
+	def __init__(self, priority_class):
+		self.card_scores = {card_id: 2 * i for i, card_id in enumerate(priority_class.CARD_PRIORITY_LIST)}
+		self.play_scores = {card_id: 2 * i for i, card_id in enumerate(priority_class.PLAY_PRIORITY_LIST)}
+		self.aoe_cards = frozenset(priority_class.AOE_CARDS)
+		self.defensive_cards = frozenset(priority_class.DEFENSIVE_CARDS)
+
+		card_scores = self.card_scores
+		play_scores = self.play_scores
+
+		def card_score(card):
+			score = card_scores.get(card.card_id)
+			return UNLISTED_SCORE if score is None else score - card.upgrades
+
+		def play_score(card):
+			score = play_scores.get(card.card_id)
+			return UNLISTED_SCORE if score is None else score - card.upgrades
+
+		self.card_score = card_score
+		self.play_score = play_score
+
+
 class Priority:
 
 	CARD_VALUES = []
@@ -40,34 +73,41 @@ class Priority:
 		"GamblingChipAction"
 	]
 
-	def __init__(self):
-		self.CARD_PRIORITIES = {self.CARD_PRIORITY_LIST[i]: i for i in range(len(self.CARD_PRIORITY_LIST))}
-		self.PLAY_PRIORITIES = {self.PLAY_PRIORITY_LIST[i]: i for i in range(len(self.PLAY_PRIORITY_LIST))}
-		self.BOSS_RELIC_PRIORITIES = {self.BOSS_RELIC_PRIORITY_LIST[i]: i for i in range(len(self.BOSS_RELIC_PRIORITY_LIST))}
-		self.MAP_NODE_PRIORITIES = {
-			1: self.MAP_NODE_PRIORITIES_1,
-			2: self.MAP_NODE_PRIORITIES_2,
-			3: self.MAP_NODE_PRIORITIES_3,
-			4: self.MAP_NODE_PRIORITIES_3  # Doesn't really matter anyway
+	def __init_subclass__(cls, **kwargs):
+		super().__init_subclass__(**kwargs)
+		cls.build_tables()
+
+	@classmethod
+	def build_tables(cls):
+		# Derived once per class when it is defined, and shared by all of its instances
+		cls.CARD_PRIORITIES = {cls.CARD_PRIORITY_LIST[i]: i for i in range(len(cls.CARD_PRIORITY_LIST))}
+		cls.PLAY_PRIORITIES = {cls.PLAY_PRIORITY_LIST[i]: i for i in range(len(cls.PLAY_PRIORITY_LIST))}
+		cls.BOSS_RELIC_PRIORITIES = {cls.BOSS_RELIC_PRIORITY_LIST[i]: i for i in range(len(cls.BOSS_RELIC_PRIORITY_LIST))}
+		cls.MAP_NODE_PRIORITIES = {
+			1: cls.MAP_NODE_PRIORITIES_1,
+			2: cls.MAP_NODE_PRIORITIES_2,
+			3: cls.MAP_NODE_PRIORITIES_3,
+			4: cls.MAP_NODE_PRIORITIES_3  # Doesn't really matter anyway
 		}
+		cls.index = PriorityIndex(cls)
 
 	def get_best_card(self, card_list):
-		return min(card_list, key=lambda x: self.CARD_PRIORITIES.get(x.card_id, math.inf) - 0.5 * x.upgrades)
+		return min(card_list, key=self.index.card_score)
 
 	def get_worst_card(self, card_list):
-		return max(card_list, key=lambda x: self.CARD_PRIORITIES.get(x.card_id, math.inf) - 0.5 * x.upgrades)
+		return max(card_list, key=self.index.card_score)
 
 	def get_sorted_cards(self, card_list, reverse=False):
-		return sorted(card_list, key=lambda x: self.CARD_PRIORITIES.get(x.card_id, math.inf) - 0.5 * x.upgrades, reverse=reverse)
+		return sorted(card_list, key=self.index.card_score, reverse=reverse)
 
 	def get_sorted_cards_to_play(self, card_list, reverse=False):
-		return sorted(card_list, key=lambda x: self.PLAY_PRIORITIES.get(x.card_id, math.inf) - 0.5 * x.upgrades, reverse=reverse)
+		return sorted(card_list, key=self.index.play_score, reverse=reverse)
 
 	def get_best_card_to_play(self, card_list):
-		return min(card_list, key=lambda x: self.PLAY_PRIORITIES.get(x.card_id, math.inf) - 0.5 * x.upgrades)
+		return min(card_list, key=self.index.play_score)
 
 	def get_worst_card_to_play(self, card_list):
-		return max(card_list, key=lambda x: self.PLAY_PRIORITIES.get(x.card_id, math.inf) - 0.5 * x.upgrades)
+		return max(card_list, key=self.index.play_score)
 
 	def should_skip(self, card):
 		return self.CARD_PRIORITIES.get(card.card_id, math.inf) > self.CARD_PRIORITIES.get("Skip")
@@ -79,10 +119,10 @@ class Priority:
 		return min(relic_list, key=lambda x: self.BOSS_RELIC_PRIORITIES.get(x.relic_id, 0))
 
 	def is_card_aoe(self, card):
-		return card.card_id in self.AOE_CARDS
+		return card.card_id in self.index.aoe_cards
 
 	def is_card_defensive(self, card):
-		return card.card_id in self.DEFENSIVE_CARDS
+		return card.card_id in self.index.defensive_cards
 
 	def get_cards_for_action(self, action, cards, max_cards):
 		if action in self.GOOD_CARD_ACTIONS:
@@ -93,6 +133,9 @@ class Priority:
 		return sorted_cards[:num_cards]
 
 
+Priority.build_tables()
+
+
 class SilentPriority(Priority):
 
 	CARD_PRIORITY_LIST = [
@@ -0,0 +1,288 @@
+import collections
+import concurrent.futures
+import random
+import time
+
+from spirecomm.ai.combat_state import *
+from spirecomm.spire.encounters import act_encounters
+
+# Monte Carlo combat rollouts: play a fight out many times from a Game, with the monsters
+# following their states/moves tables and the player a quick greedy policy, and report how
+# often it was won and how much HP it cost.
+#
+# Fights are CombatStates, which pickle small enough to send to worker processes. Card effects
+# are the planner's, see planner.CARD_EFFECTS; cards it can't model are never played.
+
+# Potions the rollouts can model, by potion id, in the planner's effect format
+POTION_EFFECTS = {
+	"Fire Potion": (("Damage", 20),),
+	"Explosive Potion": (("DamageAll", 10),),
+	"Block Potion": (("Block", 12),),
+	"Strength Potion": (("Strength", 2),),
+	"Dexterity Potion": (("Dexterity", 2),),
+	"Weak Potion": (("Weak", 3),),
+	"FearPotion": (("Vulnerable", 3),),
+	"Energy Potion": (("Energy", 2),),
+	"Swift Potion": (("Draw", 3),),
+}
+
+RolloutResult = collections.namedtuple("RolloutResult", ["rollouts", "win_probability", "expected_hp_loss", "seconds"])
+
+# How many HP a win is worth when comparing results
+WIN_VALUE = 100
+
+# Seconds past the deadline to wait for batches in worker processes to send their results back
+RESULT_WAIT = 0.02
+
+
+def score(result):
+	"""One number to compare RolloutResults by, higher is better"""
+	return WIN_VALUE * result.win_probability - result.expected_hp_loss
+
+
+def choose_play(state):
+	"""The greedy policy: Powers and debuffs first, block up to the incoming damage, then attacks
+
+	:param state: the fight
+	:type state: CombatState
+	:return: (position in hand, target) of the card to play, or None to end the turn
+	"""
+	alive = state.alive_monsters()
+	if len(alive) == 0:
+		return None
+	target = min(alive, key=lambda monster: state.monster_value(monster, MONSTER_HP))
+	player = state.player
+	energy = player[PLAYER_ENERGY]
+	needs_block = player[PLAYER_BLOCK] < state.incoming_damage()
+	cards = state.cards
+	best = None
+	best_score = 0
+	for position, number in enumerate(state.hand):
+		cost, effects, has_target, is_power, exhausts = cards[number]
+		if cost > energy:
+			continue
+		score = 0
+		for effect, value in effects:
+			if effect in ("Strength", "Dexterity", "Vulnerable", "Weak", "Energy", "Draw"):
+				score += 20
+			elif effect in ("Damage", "DamageStrength", "DamageAll"):
+				score += value * (len(alive) if effect == "DamageAll" else 1)
+			elif effect == "DamageBlock":
+				score += player[PLAYER_BLOCK]
+			elif effect == "Block" and needs_block:
+				score += value * 1.5
+			elif effect == "LoseHP":
+				score -= value
+		score /= max(cost, 0.5)
+		if score > best_score:
+			best, best_score = position, score
+	if best is None:
+		return None
+	return best, target
+
+
+def rollout(start, rng, max_turns=30):
+	"""Play a fight out once
+
+	:param start: the fight, which is left unchanged
+	:type start: CombatState
+	:return: (won, hp lost)
+	:rtype: tuple
+	"""
+	state = start.clone()
+	start_hp = state.player[PLAYER_HP]
+	state.roll_unknown_moves(rng)
+	state.shuffle_draw_pile(rng)
+	if len(state.hand) == 0:
+		state.draw(state.hand_size, rng)
+	if state.pending_draws > 0:
+		state.draw(state.pending_draws, rng)
+		state.pending_draws = 0
+	for turn in range(max_turns):
+		while True:
+			play = choose_play(state)
+			if play is None:
+				break
+			state.apply_play(play[0], play[1], rng)
+			if state.is_lost():
+				return False, start_hp
+		if state.is_won():
+			return True, start_hp - state.player[PLAYER_HP]
+		state.end_turn(rng)
+		if state.is_lost():
+			return False, start_hp
+	return False, start_hp - state.player[PLAYER_HP]
+
+
+def run_rollouts(states, count, seed, max_turns=30, deadline=None):
+	"""Play each fight out up to count times with an RNG of its own, for a worker process
+
+	The fights take turns, so each has been played out the same number of times when the
+	deadline stops the batch early.
+
+	:param states: the fights to play out
+	:type states: list
+	:param deadline: the time.time() to stop at, or None to play every rollout
+	:type deadline: float
+	:return: (rollouts of each fight, [(wins, total hp lost) for each fight])
+	:rtype: tuple
+	"""
+	rng = random.Random(seed)
+	results = [[0, 0] for state in states]
+	played = 0
+	while played < count and (deadline is None or time.time() < deadline):
+		for state, result in zip(states, results):
+			won, lost = rollout(state, rng, max_turns)
+			result[0] += won
+			result[1] += lost
+		played += 1
+	return played, [tuple(result) for result in results]
+
+
+class RolloutEngine:
+	"""Scores fights, potions and card rewards by playing fights out many times
+
+	Rollouts run in batches, in a pool of worker processes if workers > 0, else in this one,
+	until count rollouts have been played or budget seconds have passed. Each batch has its own
+	RNG seeded from seed, the number of the call and the batch, so results are reproducible
+	for a given seed whichever worker runs the batch, as long as the budget isn't reached.
+	Each batch stops itself at the deadline, so none keeps a worker busy into the next call.
+	"""
+
+	def __init__(self, workers=0, budget=0.25, batch_size=25, max_turns=30, seed=0):
+		"""
+		:param workers: the number of worker processes, or 0 to run rollouts in this process
+		:type workers: int
+		:param budget: the most seconds to spend on one evaluation
+		:type budget: float
+		:param batch_size: rollouts of each fight per batch
+		:type batch_size: int
+		:param seed: the seed of every batch's RNG
+		:type seed: int
+		"""
+		self.workers = workers
+		self.budget = budget
+		self.batch_size = batch_size
+		self.max_turns = max_turns
+		self.seed = seed
+		self.calls = 0
+		self.pool = None
+		self.pending = []
+
+	def close(self):
+		if self.pool is not None:
+			# shutdown(cancel_futures=True) needs Python 3.9
+			for future in self.pending:
+				future.cancel()
+			self.pending = []
+			self.pool.shutdown(wait=False)
+			self.pool = None
+
+	def evaluate_states(self, states, count=200):
+		"""Play out each fight up to count times, within the time budget
+
+		:param states: the fights to compare, which are all played out the same number of times
+		:type states: list
+		:return: a RolloutResult for each fight
+		:rtype: list
+		"""
+		start = time.perf_counter()
+		# Wall clock time, since the worker processes check it too
+		deadline = time.time() + self.budget
+		self.calls += 1
+		batches = max(1, -(-count // self.batch_size))
+		seeds = [(self.seed * 1000003 + self.calls) * 1009 + batch for batch in range(batches)]
+		totals = [[0, 0] for state in states]
+		rollouts = 0
+		if self.workers > 0:
+			if self.pool is None:
+				self.pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+			futures = [self.pool.submit(run_rollouts, states, self.batch_size, seed, self.max_turns, deadline) for seed in seeds]
+			done, not_done = concurrent.futures.wait(futures, timeout=max(deadline - time.time(), 0) + RESULT_WAIT)
+			# Batches which haven't started are dropped; running ones stop at the deadline anyway
+			for future in not_done:
+				future.cancel()
+			# Any which were already running are cancelled on close
+			self.pending = [future for future in not_done if not future.cancelled()]
+			batch_results = [future.result() for future in futures if future in done]
+		else:
+			batch_results = []
+			for seed in seeds:
+				if time.time() >= deadline:
+					break
+				batch_results.append(run_rollouts(states, self.batch_size, seed, self.max_turns, deadline))
+		for played, results in batch_results:
+			rollouts += played
+			for total, (wins, hp_lost) in zip(totals, results):
+				total[0] += wins
+				total[1] += hp_lost
+		seconds = time.perf_counter() - start
+		return [RolloutResult(rollouts, wins / rollouts if rollouts else 0.0, hp_lost / rollouts if rollouts else 0.0, seconds)
+				for wins, hp_lost in totals]
+
+	def evaluate(self, game, count=200):
+		"""Play the fight in progress out up to count times
+
+		:param game: a state in combat
+		:type game: Game
+		:rtype: RolloutResult
+		"""
+		return self.evaluate_states([CombatState.from_game(game)], count)[0]
+
+	def score_potions(self, game, count=200):
+		"""Compare using each usable potion now with not using any
+
+		:param game: a state in combat
+		:type game: Game
+		:return: the result without a potion, and (potion, result) for each potion the rollouts can model
+		:rtype: tuple
+		"""
+		state = CombatState.from_game(game)
+		potions = [potion for potion in game.get_real_potions() if potion.can_use and potion.potion_id in POTION_EFFECTS]
+		states = [state]
+		for potion in potions:
+			states.append(self.with_potion(state, potion))
+		results = self.evaluate_states(states, count)
+		return results[0], list(zip(potions, results[1:]))
+
+	def with_potion(self, state, potion):
+		state = state.clone()
+		alive = state.alive_monsters()
+		target = None
+		if alive and potion.requires_target:
+			target = min(alive, key=lambda monster: state.monster_value(monster, MONSTER_HP))
+		# Each rollout draws for itself, as it shuffles the draw pile first
+		state.pending_draws += state.apply_effects(POTION_EFFECTS[potion.potion_id], target)
+		return state
+
+	def score_card_rewards(self, game, cards, count=100, encounters=None):
+		"""Compare adding each card to the deck with skipping, over the fights of the current act
+
+		:param game: the current state, with the deck and HP to fight with
+		:type game: Game
+		:param cards: the cards on offer
+		:type cards: list
+		:param encounters: the fights to average over, by default the act's hallway fights and its boss, see act_encounters
+		:type encounters: list
+		:return: the result of skipping, and (card, result) for each card
+		:rtype: tuple
+		"""
+		if encounters is None:
+			encounters = act_encounters(game.act, game.act_boss)
+		hp = game.current_hp if game.current_hp else game.max_hp
+		decks = [list(game.deck)] + [list(game.deck) + [card] for card in cards]
+		states = []
+		for i, encounter in enumerate(encounters):
+			for deck in decks:
+				# Every deck meets the same monsters
+				rng = random.Random(self.seed * 7919 + i)
+				states.append(CombatState.from_deck(deck, hp, encounter, rng))
+		per_encounter = self.evaluate_states(states, count)
+		results = []
+		for i in range(len(decks)):
+			encounter_results = per_encounter[i::len(decks)]
+			rollouts = min(result.rollouts for result in encounter_results)
+			results.append(RolloutResult(rollouts, sum(result.win_probability for result in encounter_results) / len(encounters),
+										 sum(result.expected_hp_loss for result in encounter_results) / len(encounters),
+										 encounter_results[0].seconds))
+		return results[0], list(zip(cards, results[1:]))
@@ -0,0 +1,215 @@
+import asyncio
+import inspect
+import sys
+import time
+
+from spirecomm.communication.action import StartGameAction
+from spirecomm.communication.coordinator import Coordinator
+from spirecomm.communication.log_writer import LogWriter
+
+
+# CommunicationMod sends each game state as one line, which can be far longer than asyncio's 64 KiB default
+STREAM_LIMIT = 2 ** 24
+
+
+class AsyncCoordinator(Coordinator):
+	"""A Coordinator which talks to Communication Mod over asyncio streams
+
+	Game state handling and the Action interface are the same as Coordinator's: actions still
+	call send_message and read last_game_state. Callbacks may be plain functions or coroutine
+	functions. Because there are no threads, one process can drive many sessions at once.
+	"""
+
+	def __init__(self, reader, writer, logfile=None):
+		"""
+		:param reader: the stream Communication Mod's messages arrive on
+		:type reader: asyncio.StreamReader
+		:param writer: the stream commands are written to
+		:type writer: asyncio.StreamWriter
+		:param logfile: the file to log to, ai_comm.log if not given
+		"""
+		self.reader = reader
+		self.writer = writer
+		self.init_state(logfile if logfile is not None else LogWriter("ai_comm.log"))
+
+	@classmethod
+	async def connect_stdio(cls, logfile=None):
+		"""Create a coordinator on this process's stdin and stdout, as launched by Communication Mod
+
+		:return: the coordinator
+		:rtype: AsyncCoordinator
+		"""
+		# get_event_loop rather than get_running_loop, which needs Python 3.7
+		loop = asyncio.get_event_loop()
+		reader = asyncio.StreamReader(limit=STREAM_LIMIT)
+		await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+		# StreamReaderProtocol provides the flow control drain() needs; its own reader is never read
+		transport, protocol = await loop.connect_write_pipe(lambda: asyncio.StreamReaderProtocol(asyncio.StreamReader()), sys.stdout)
+		writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+		return cls(reader, writer, logfile)
+
+	@classmethod
+	async def connect_tcp(cls, host, port, logfile=None):
+		"""Create a coordinator on a socket, e.g. one bridged to Communication Mod's process
+
+		:return: the coordinator
+		:rtype: AsyncCoordinator
+		"""
+		reader, writer = await asyncio.open_connection(host, port, limit=STREAM_LIMIT)
+		return cls(reader, writer, logfile)
+
+	@classmethod
+	async def connect_subprocess(cls, *args, logfile=None):
+		"""Start a process which speaks the Communication Mod protocol and create a coordinator on its pipes
+
+		:param args: the program and its arguments
+		:return: the coordinator
+		:rtype: AsyncCoordinator
+		"""
+		process = await asyncio.create_subprocess_exec(*args, stdin=asyncio.subprocess.PIPE,
+													   stdout=asyncio.subprocess.PIPE, limit=STREAM_LIMIT)
+		coordinator = cls(process.stdout, process.stdin, logfile)
+		coordinator.process = process
+		return coordinator
+
+	def send_message(self, message):
+		"""Send a command to Communication Mod and start waiting for a response
+
+		The command is buffered in the writer; it is flushed by the next awaited coordinator call.
+
+		:param message: the message to send
+		:type message: str
+		:return: None
+		"""
+		if self.recorder is not None:
+			self.recorder.command(message)
+		self.add_response_latency(time.perf_counter())
+		self.writer.write((message + "\n").encode("utf-8"))
+		self.game_is_ready = False
+
+	async def signal_ready(self):
+		"""Indicate to Communication Mod that setup is complete
+
+		:return: None
+		"""
+		print("Communicator: signal_ready", file=self.logfile, flush=True)
+		self.send_message("ready")
+		await self.writer.drain()
+
+	async def execute_next_action(self):
+		"""Immediately execute the next action in the action queue
+
+		:return: None
+		"""
+		if self.action_delay > 0:
+			await asyncio.sleep(self.action_delay)
+		self.execute_action(self.action_queue.popleft())
+		await self.writer.drain()
+
+	async def execute_next_action_if_ready(self):
+		"""Immediately execute the next action in the action queue, if ready to do so
+
+		:return: None
+		"""
+		if self.action_is_ready():
+			await self.execute_next_action()
+
+	async def get_next_raw_message(self):
+		"""Wait for the next message from Communication Mod
+
+		:return: the message from Communication Mod
+		:rtype: str
+		:raises EOFError: if Communication Mod has closed the stream
+		"""
+		if self.input_closed:
+			raise EOFError("Communication Mod closed the stream")
+		line = await self.reader.readline()
+		if not line:
+			self.input_closed = True
+			print("Communicator: stream closed", file=self.logfile, flush=True)
+			raise EOFError("Communication Mod closed the stream")
+		self.message_arrived_at = time.perf_counter()
+		self.last_msg = line.decode("utf-8").rstrip("\r\n")
+		return self.last_msg
+
+	async def receive_game_state_update(self, perform_callbacks=True, repeat=False):
+		"""Using the next message from Communication Mod, update the stored game state
+
+		:param perform_callbacks: set to True to perform callbacks based on the new game state
+		:type perform_callbacks: bool
+		:return: whether a message was received
+		"""
+		if repeat:
+			message = self.last_msg
+		else:
+			message = await self.get_next_raw_message()
+			if self.recorder is not None:
+				self.recorder.message(message)
+		self.parse_message(message)
+		if perform_callbacks:
+			callback = self.get_callback()
+			if callback is not None:
+				function, args = callback
+				start = time.perf_counter()
+				action = function(*args)
+				if inspect.isawaitable(action):
+					action = await action
+				self.add_latency("callback", time.perf_counter() - start)
+				self.add_action_to_queue(action)
+		return True
+
+	async def unpause_agent(self):
+		"""Log the current game state and wait for the next one, as Coordinator.unpause_agent does
+
+		:return: None
+		"""
+		print("Communicator: game update " + str(time.time()), file=self.logfile, flush=True)
+		print("Communicator's game state:", file=self.logfile, flush=True)
+		print(str(self.last_game_state), file=self.logfile, flush=True)
+		await self.receive_game_state_update()
+
+	async def wait_for_update(self, perform_callbacks=True):
+		"""Wait for a message, unless the next action can already be executed
+
+		:return: whether a message was received
+		:rtype: bool
+		"""
+		if self.action_is_ready():
+			return False
+		return await self.receive_game_state_update(perform_callbacks=perform_callbacks)
+
+	async def run(self):
+		"""Start executing actions forever
+
+		:return: None
+		"""
+		print("Communicator: run", file=self.logfile, flush=True)
+		while True:
+			await self.execute_next_action_if_ready()
+			await self.wait_for_update(perform_callbacks=True)
+
+	async def play_one_game(self, player_class, ascension_level=0, seed=None):
+		"""
+
+		:param player_class: the class to play
+		:type player_class: PlayerClass
+		:param ascension_level: the ascension level to use
+		:type ascension_level: int
+		:param seed: the alphanumeric seed to use
+		:type seed: str
+		:return: True if the game was a victory, else False
+		:rtype: bool
+		"""
+		print("Communicator: play_one_game", file=self.logfile, flush=True)
+		self.clear_actions()
+		while not self.game_is_ready:
+			await self.receive_game_state_update(perform_callbacks=False)
+		self.start_game_report()
+		if not self.in_game:
+			StartGameAction(player_class, ascension_level, seed).execute(self)
+			await self.writer.drain()
+			await self.receive_game_state_update()
+		while self.in_game:
+			await self.execute_next_action_if_ready()
+			await self.wait_for_update()
+		return self.finish_game_report()
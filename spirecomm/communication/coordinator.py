@@ -1,44 +1,103 @@
+import os
+import io
 import sys
 import queue
 import threading
-import json
 import collections
 import time
 
 from spirecomm.spire.game import Game
 from spirecomm.spire.screen import ScreenType
 from spirecomm.communication.action import Action, StartGameAction
+from spirecomm.communication.decoder import Decoder
+from spirecomm.communication.log_writer import LogWriter
+from spirecomm.communication.latency import LatencyStats
+from spirecomm.communication.profiler import SamplingProfiler
 
 
-def read_stdin(input_queue):
-	"""Read lines from stdin and write them to a queue
+class LineReader:
+	"""Read newline-terminated messages from a file descriptor in large chunks
 
-	:param input_queue: A queue, to which lines from stdin will be written
-	:type input_queue: queue.Queue
-	:return: None
+	Iterating yields each line, decoded once and without its line ending, and stops at EOF.
+	Bytes which aren't valid in the encoding are replaced rather than ending the iteration.
 	"""
-	while True:
-		stdin_input = ""
-		#print("Communicator: read_stdin", file=self.logfile, flush=True)
+
+	def __init__(self, fd, chunk_size=65536, encoding="utf-8", errors="replace"):
+		self.fd = fd
+		self.chunk_size = chunk_size
+		self.encoding = encoding
+		self.errors = errors
+
+	def decode(self, pieces):
+		line = b"".join(pieces)
+		if line.endswith(b"\r"):
+			line = line[:-1]
+		return line.decode(self.encoding, self.errors)
+
+	def __iter__(self):
+		pending = []
 		while True:
-			input_char = sys.stdin.read(1)
-			if input_char == '\n':
+			chunk = os.read(self.fd, self.chunk_size)
+			if not chunk:
 				break
-			else:
-				stdin_input += input_char
-		input_queue.put(stdin_input)
+			start = 0
+			while True:
+				index = chunk.find(b"\n", start)
+				if index < 0:
+					if start < len(chunk):
+						pending.append(chunk[start:])
+					break
+				pending.append(chunk[start:index])
+				yield self.decode(pending)
+				pending = []
+				start = index + 1
+		if len(pending) > 0:
+			yield self.decode(pending)
+
+
+def read_stdin(input_queue):
+	"""Read lines from stdin and write them to a queue
 
+	Each line is put on the queue with the time it was read, from time.perf_counter.
+	Puts None on the queue and returns once stdin is closed, or reading it fails.
 
-def write_stdout(output_queue):
+	:param input_queue: A queue, to which (time, line) pairs will be written
+	:type input_queue: queue.Queue
+	:return: None
+	"""
+	try:
+		lines = LineReader(sys.stdin.fileno())
+	except (AttributeError, ValueError, io.UnsupportedOperation):
+		# stdin has been replaced by something without a file descriptor
+		lines = (line.rstrip("\r\n") for line in sys.stdin)
+	try:
+		for line in lines:
+			input_queue.put((time.perf_counter(), line))
+	finally:
+		# Without it the coordinator would wait forever for the next message
+		input_queue.put(None)
+
+
+def write_stdout(output_queue, record=None):
 	"""Read lines from a queue and write them to stdout
 
-	:param output_queue: A queue, from which this function will receive lines of text
+	:param output_queue: A queue, from which this function will receive (time queued, line) pairs
 	:type output_queue: queue.Queue
+	:param record: called with the name and duration of the output_wait and stdout_write spans
+	:type record: function(span: str, seconds: float)
 	:return: None
 	"""
 	while True:
-		output = output_queue.get()
+		queued_at, output = output_queue.get()
+		start = time.perf_counter()
 		print(output, end='\n', flush=True)
+		if record is not None:
+			record("output_wait", start - queued_at)
+			record("stdout_write", time.perf_counter() - start)
+
+
+# Put on the input queue to wake a Coordinator that is blocked waiting for a message
+WAKE = object()
 
 
 class Coordinator:
@@ -47,13 +106,21 @@ class Coordinator:
 	def __init__(self):
 		self.input_queue = queue.Queue()
 		self.output_queue = queue.Queue()
-		self.actions_played_queue = queue.Queue()
 		self.input_thread = threading.Thread(target=read_stdin, args=(self.input_queue,))
-		self.output_thread = threading.Thread(target=write_stdout, args=(self.output_queue,))
+		self.output_thread = threading.Thread(target=write_stdout, args=(self.output_queue, self.add_latency))
 		self.input_thread.daemon = True
 		self.input_thread.start()
 		self.output_thread.daemon = True
 		self.output_thread.start()
+		self.init_state(LogWriter("ai_comm.log"))
+
+	def init_state(self, logfile):
+		"""Set up everything but the transport to Communication Mod
+
+		:param logfile: the file to log to, usually a LogWriter so logging never waits on the disk
+		:return: None
+		"""
+		self.actions_played_queue = queue.Queue()
 		self.action_queue = collections.deque()
 		self.state_change_callback = None
 		self.out_of_game_callback = None
@@ -65,7 +132,21 @@ class Coordinator:
 		self.last_error = None
 		self.last_msg = ""
 		self.last_action = None
-		self.logfile = open("ai_comm.log","w")
+		self.input_closed = False
+		self.waiting = False
+		self.waiting_thread = None
+		self.decoder = Decoder() # set Decoder(skip=[...]) to avoid building parts of the state the agent ignores
+		self.incremental_updates = True # reuse unchanged parts of the previous Game on each update
+		self.action_delay = 0.0 # seconds to wait before each action, so a GUI user can follow along
+		self.game_start_time = None
+		self.actions_this_game = 0
+		self.game_reports = collections.deque(maxlen=100) # (seconds, actions, victory) of recent games
+		self.recorder = None # set to a SessionRecorder to record every message and command
+		self.latency = LatencyStats() # timings of each step of handling a message, or None not to time them
+		self.message_arrived_at = None
+		self.profiler = None # set to a SamplingProfiler, or use start_profiler, to profile each game
+		self.agent_thread_id = None # the thread playing games, which the profiler samples
+		self.logfile = logfile
 		print("Communicator: Init ", file=self.logfile, flush=True)
 
 	def signal_ready(self):
@@ -84,9 +165,51 @@ class Coordinator:
 		:type message: str
 		:return: None
 		"""
-		self.output_queue.put(message)
+		if self.recorder is not None:
+			self.recorder.command(message)
+		now = time.perf_counter()
+		self.add_response_latency(now)
+		self.output_queue.put((now, message))
 		self.game_is_ready = False
 
+	def add_latency(self, span, seconds):
+		"""Add a sample to one of the latency histograms, unless timing is turned off
+
+		:param span: the name of the span, see latency.SPANS
+		:type span: str
+		:param seconds: how long it took
+		:type seconds: float
+		:return: None
+		"""
+		latency = self.latency
+		if latency is not None:
+			latency.add(span, seconds)
+
+	def add_response_latency(self, now):
+		# The first command sent after a message arrives is its response
+		if self.message_arrived_at is not None:
+			self.add_latency("response", now - self.message_arrived_at)
+			self.message_arrived_at = None
+
+	def stats(self):
+		"""Get the latency of each step of handling messages
+
+		:return: for each span, its count, mean, max, and p50, p95 and p99 over recent samples, in seconds
+		:rtype: dict
+		"""
+		if self.latency is None:
+			return {}
+		return self.latency.summary()
+
+	def dump_stats(self, file=None):
+		"""Write a table of the latency stats, in milliseconds
+
+		:param file: where to write it, the coordinator's log by default
+		:return: None
+		"""
+		if self.latency is not None:
+			print(self.latency.report(), file=file if file is not None else self.logfile, flush=True)
+
 	def add_action_to_queue(self, action):
 		"""Queue an action to perform when ready
 
@@ -95,6 +218,18 @@ class Coordinator:
 		:return: None
 		"""
 		self.action_queue.append(action)
+		if self.waiting and threading.current_thread() is not self.waiting_thread:
+			self.wake()
+
+	def wake(self):
+		"""Wake the coordinator if it is blocked waiting for a message from Communication Mod
+
+		Only needed when actions are queued from another thread. The coordinator will then
+		re-check whether its next action can be executed.
+
+		:return: None
+		"""
+		self.input_queue.put(WAKE)
 
 	def clear_actions(self):
 		"""Remove all actions from the action queue
@@ -108,10 +243,23 @@ class Coordinator:
 
 		:return: None
 		"""
-		action = self.action_queue.popleft()
+		if self.action_delay > 0:
+			time.sleep(self.action_delay)
+		self.execute_action(self.action_queue.popleft())
+
+	def execute_action(self, action):
+		"""Execute an action and record it as played
+
+		:param action: the action to execute
+		:type action: Action
+		:return: None
+		"""
 		self.last_action = action
 		self.actions_played_queue.put(action)
+		self.actions_this_game += 1
+		start = time.perf_counter()
 		action.execute(self)
+		self.add_latency("execute", time.perf_counter() - start)
 		
 	def re_execute_last_action(self):
 		self.actions_played_queue.put(self.last_action)
@@ -122,9 +270,35 @@ class Coordinator:
 
 		:return: None
 		"""
-		if len(self.action_queue) > 0 and self.action_queue[0].can_be_executed(self):
+		if self.action_is_ready():
 			self.execute_next_action()
 
+	def action_is_ready(self):
+		"""Check whether the next action in the action queue can be executed now
+
+		:return: True if there is an action which can be executed
+		:rtype: bool
+		"""
+		return len(self.action_queue) > 0 and self.action_queue[0].can_be_executed(self)
+
+	def wait_for_update(self, perform_callbacks=True):
+		"""Wait until a message arrives or the next action can be executed, and handle the message, if any
+
+		Blocks on the input queue instead of polling it, so an idle coordinator uses no CPU.
+
+		:param perform_callbacks: set to True to perform callbacks based on the new game state
+		:type perform_callbacks: bool
+		:return: whether a message was received
+		:rtype: bool
+		"""
+		self.waiting = True
+		self.waiting_thread = threading.current_thread()
+		try:
+			block = not self.action_is_ready()
+			return self.receive_game_state_update(block=block, perform_callbacks=perform_callbacks)
+		finally:
+			self.waiting = False
+
 	def register_state_change_callback(self, new_callback):
 		"""Register a function to be called when a message is received from Communication Mod
 
@@ -169,10 +343,27 @@ class Coordinator:
 		:type block: bool
 		:return: the message from Communication Mod
 		:rtype: str
+		:raises EOFError: if Communication Mod has closed stdin
 		"""
-		if block or not self.input_queue.empty():
-			self.last_msg = self.input_queue.get()
+		if self.input_closed:
+			raise EOFError("Communication Mod closed stdin")
+		while block or not self.input_queue.empty():
+			item = self.input_queue.get()
+			if item is WAKE:
+				# Only wait_for_update wants to be woken up, anyone else keeps waiting for a real message
+				if self.waiting:
+					return None
+				continue
+			if item is None:
+				self.input_closed = True
+				print("Communicator: stdin closed", file=self.logfile, flush=True)
+				raise EOFError("Communication Mod closed stdin")
+			queued_at, message = item
+			self.message_arrived_at = queued_at
+			self.add_latency("queue_wait", time.perf_counter() - queued_at)
+			self.last_msg = message
 			return self.last_msg
+		return None
 			
 
 	def receive_game_state_update(self, block=False, perform_callbacks=True, repeat=False):
@@ -190,34 +381,64 @@ class Coordinator:
 			message = self.last_msg
 		else:
 			message = self.get_next_raw_message(block)
+			if message is not None and self.recorder is not None:
+				self.recorder.message(message)
 		
 		if message is not None:
-			communication_state = json.loads(message)
-			self.last_error = communication_state.get("error", None)
-			self.game_is_ready = communication_state.get("ready_for_command")
-			if self.last_error is None:
-				self.in_game = communication_state.get("in_game")
-				if self.in_game:
-					self.last_game_state = Game.from_json(communication_state.get("game_state"), communication_state.get("available_commands"))
-			else:
-				print("Communicator detected error", file=self.logfile, flush=True)
+			self.parse_message(message)
 			if perform_callbacks:
-				if self.last_error is not None:
-					self.action_queue.clear()
-					new_action = self.error_callback(self.last_error)
-					self.add_action_to_queue(new_action)
-				elif self.in_game:
-					if len(self.action_queue) == 0 and perform_callbacks:
-						#print(str(self.last_game_state), file=self.logfile, flush=True)
-						new_action = self.state_change_callback(self.last_game_state)
-						self.add_action_to_queue(new_action)
-				elif self.stop_after_run:
-					self.clear_actions()
-				else:
-					new_action = self.out_of_game_callback()
-					self.add_action_to_queue(new_action)
+				callback = self.get_callback()
+				if callback is not None:
+					function, args = callback
+					start = time.perf_counter()
+					action = function(*args)
+					self.add_latency("callback", time.perf_counter() - start)
+					self.add_action_to_queue(action)
 			return True
 		return False
+
+	def parse_message(self, message):
+		"""Update the stored game state from a message from Communication Mod
+
+		:param message: the raw message
+		:type message: str
+		:return: None
+		"""
+		start = time.perf_counter()
+		communication_state = self.decoder.loads(message)
+		decoded = time.perf_counter()
+		self.add_latency("decode", decoded - start)
+		self.last_error = communication_state.get("error", None)
+		self.game_is_ready = communication_state.get("ready_for_command")
+		if self.last_error is None:
+			self.in_game = communication_state.get("in_game")
+			if self.in_game:
+				previous_game_state = self.last_game_state if self.incremental_updates else None
+				self.last_game_state = Game.from_json(communication_state.get("game_state"), communication_state.get("available_commands"), previous_game_state)
+				self.add_latency("game_from_json", time.perf_counter() - decoded)
+		else:
+			print("Communicator detected error", file=self.logfile, flush=True)
+
+	def get_callback(self):
+		"""Choose the callback that should produce the next action for the stored game state
+
+		Clears the action queue first if Communication Mod reported an error.
+
+		:return: the callback and its arguments, or None if no callback should be performed
+		:rtype: tuple
+		"""
+		if self.last_error is not None:
+			self.action_queue.clear()
+			return self.error_callback, (self.last_error,)
+		elif self.in_game:
+			if len(self.action_queue) == 0:
+				#print(str(self.last_game_state), file=self.logfile, flush=True)
+				return self.state_change_callback, (self.last_game_state,)
+		elif self.stop_after_run:
+			self.clear_actions()
+		else:
+			return self.out_of_game_callback, ()
+		return None
 		
 	def unpause_agent(self):
 		print("Communicator: game update " + str(time.time()), file=self.logfile, flush=True)
@@ -233,9 +454,10 @@ class Coordinator:
 		:return: None
 		"""
 		print("Communicator: run", file=self.logfile, flush=True)
+		self.start_agent_thread()
 		while True:
 			self.execute_next_action_if_ready()
-			self.receive_game_state_update(perform_callbacks=True)
+			self.wait_for_update(perform_callbacks=True)
 
 	def play_one_game(self, player_class, ascension_level=0, seed=None):
 		"""
@@ -250,17 +472,89 @@ class Coordinator:
 		:rtype: bool
 		"""
 		print("Communicator: play_one_game", file=self.logfile, flush=True)
+		self.start_agent_thread()
 		self.clear_actions()
 		while not self.game_is_ready:
 			self.receive_game_state_update(block=True, perform_callbacks=False)
+		self.start_game_report()
 		if not self.in_game:
 			StartGameAction(player_class, ascension_level, seed).execute(self)
 			self.receive_game_state_update(block=True)
 		while self.in_game:
 			self.execute_next_action_if_ready()
-			self.receive_game_state_update()
-		if self.last_game_state.screen_type == ScreenType.GAME_OVER:
-			return self.last_game_state.screen.victory
+			self.wait_for_update()
+		return self.finish_game_report()
+
+	def start_agent_thread(self):
+		"""Note that the calling thread is the one playing, and profile it if a profiler is set
+
+		:return: None
+		"""
+		self.agent_thread_id = threading.get_ident()
+		profiler = self.profiler
+		if profiler is not None:
+			profiler.start(self.agent_thread_id)
+
+	def start_profiler(self, interval=0.005, directory=".", prefix="profile"):
+		"""Start sampling the thread playing games, writing each game's stacks to a file
+
+		Can be called from any thread. If no game has started yet, sampling starts with the
+		first one.
+
+		:param interval: seconds between samples
+		:type interval: float
+		:param directory: where to write the profiles, as prefix-0001.folded and so on
+		:type directory: str
+		:return: the profiler
+		:rtype: SamplingProfiler
+		"""
+		if self.profiler is None:
+			self.profiler = SamplingProfiler(interval, directory, prefix)
+		if self.agent_thread_id is not None:
+			self.profiler.start(self.agent_thread_id)
+		print("Communicator: profiling every {:.1f} ms".format(1000 * self.profiler.interval), file=self.logfile, flush=True)
+		return self.profiler
+
+	def stop_profiler(self):
+		"""Stop profiling, writing out the stacks of the game so far
+
+		:return: the stacks of the game so far, in the collapsed format
+		:rtype: str
+		"""
+		profiler, self.profiler = self.profiler, None
+		if profiler is None:
+			return ""
+		profiler.stop()
+		print("Communicator: stopped profiling", file=self.logfile, flush=True)
+		return profiler.end_game()
+
+	def start_game_report(self):
+		"""Start timing a game
+
+		:return: None
+		"""
+		self.game_start_time = time.time()
+		self.actions_this_game = 0
+
+	def finish_game_report(self):
+		"""Stop timing a game and log how long it took
+
+		:return: True if the game was a victory, else False
+		:rtype: bool
+		"""
+		if self.last_game_state is not None and self.last_game_state.screen_type == ScreenType.GAME_OVER:
+			victory = self.last_game_state.screen.victory
 		else:
-			return False
+			victory = False
+		seconds = time.time() - self.game_start_time
+		self.game_reports.append((seconds, self.actions_this_game, victory))
+		print("Communicator: game ended in {} after {:.1f} s and {} actions ({:.1f} ms per action)".format(
+			"victory" if victory else "defeat", seconds, self.actions_this_game,
+			1000 * seconds / max(self.actions_this_game, 1)), file=self.logfile, flush=True)
+		profiler = self.profiler
+		if profiler is not None:
+			samples = profiler.samples
+			profiler.end_game()
+			print("Communicator: profiled game {} with {} samples".format(profiler.games, samples), file=self.logfile, flush=True)
+		return victory
 
@@ -0,0 +1,91 @@
+import json
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+try:
+	import ujson
+except ImportError:
+	ujson = None
+
+
+# Parts of game_state which are expensive to build, mapped to the screen types on which they are
+# always kept. Anywhere else they can be skipped with Decoder(skip=...).
+SKIPPABLE_SUBTREES = {
+	"map": {"MAP"},
+	"exhaust_pile": set(),
+}
+
+
+class Decoder:
+	"""Decodes CommunicationMod messages with the fastest available JSON library
+
+	orjson is used if installed, then ujson, then the standard library json module.
+	"""
+
+	def __init__(self, backend=None, skip=()):
+		"""
+		:param backend: the name of the JSON library to use, or None for the fastest installed one
+		:type backend: str
+		:param skip: keys of SKIPPABLE_SUBTREES to drop from game_state when they are not needed
+		:type skip: iterable
+		"""
+		if backend is None:
+			backend = available_backends()[0]
+		if backend not in available_backends():
+			raise ValueError("JSON backend {} is not installed".format(backend))
+		self.backend = backend
+		if backend == "orjson":
+			self.decode = orjson.loads
+		elif backend == "ujson":
+			self.decode = ujson.loads
+		else:
+			self.decode = json.loads
+		for key in skip:
+			if key not in SKIPPABLE_SUBTREES:
+				raise ValueError("{} is not a skippable part of the game state".format(key))
+		self.skip = tuple(skip)
+
+	def loads(self, message):
+		"""Decode a message, dropping the skipped parts of the game state
+
+		:param message: the raw message from Communication Mod
+		:type message: str
+		:return: the decoded message
+		:rtype: dict
+		"""
+		communication_state = self.decode(message)
+		if len(self.skip) > 0:
+			self.prune(communication_state)
+		return communication_state
+
+	def prune(self, communication_state):
+		game_state = communication_state.get("game_state")
+		if game_state is None:
+			return
+		screen_type = game_state.get("screen_type")
+		for key in self.skip:
+			if screen_type in SKIPPABLE_SUBTREES[key]:
+				continue
+			if key in game_state:
+				del game_state[key]
+			else:
+				combat_state = game_state.get("combat_state")
+				if combat_state is not None:
+					combat_state.pop(key, None)
+
+
+def available_backends():
+	"""List the installed JSON libraries, fastest first
+
+	:rtype: list
+	"""
+	backends = []
+	if orjson is not None:
+		backends.append("orjson")
+	if ujson is not None:
+		backends.append("ujson")
+	backends.append("json")
+	return backends
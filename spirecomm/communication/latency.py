@@ -0,0 +1,88 @@
+import collections
+
+# Spans timed by the coordinator, and by SimpleAgent when given the coordinator's stats, in the
+# order they happen for one decision
+SPANS = [
+	"queue_wait", # a message waiting in the input queue
+	"decode", # decoding the message's JSON
+	"game_from_json", # building the Game from it
+	"callback", # the agent's callback, as a whole
+	"compute_smart_state", # within the callback
+	"tick", # within the callback: ticking the behaviour tree
+	"execute", # executing an action, up to putting its command on the output queue
+	"response", # from a message arriving in the input queue to its answer being sent
+	"output_wait", # a command waiting in the output queue
+	"stdout_write", # writing a command to stdout
+]
+
+
+class Histogram:
+	"""The recent samples of one span, with running totals over all of them"""
+
+	def __init__(self, max_samples=10000):
+		self.samples = collections.deque(maxlen=max_samples)
+		self.count = 0
+		self.total = 0.0
+		self.max = 0.0
+
+	def add(self, seconds):
+		self.samples.append(seconds)
+		self.count += 1
+		self.total += seconds
+		if seconds > self.max:
+			self.max = seconds
+
+	def percentile(self, sorted_samples, fraction):
+		return sorted_samples[min(int(fraction * len(sorted_samples)), len(sorted_samples) - 1)]
+
+	def summary(self):
+		"""
+		:return: count, mean and max over all samples, and p50, p95 and p99 of the recent ones, in seconds
+		:rtype: dict
+		"""
+		samples = sorted(self.samples)
+		summary = {"count": self.count, "mean": self.total / self.count if self.count > 0 else 0.0, "max": self.max}
+		for name, fraction in [("p50", 0.5), ("p95", 0.95), ("p99", 0.99)]:
+			summary[name] = self.percentile(samples, fraction) if samples else 0.0
+		return summary
+
+
+class LatencyStats:
+	"""Histograms of how long each span of handling a message takes
+
+	add() is cheap enough to call on every message; percentiles are only computed when asked for.
+	"""
+
+	def __init__(self, max_samples=10000):
+		self.max_samples = max_samples
+		self.spans = {}
+
+	def add(self, span, seconds):
+		histogram = self.spans.get(span)
+		if histogram is None:
+			histogram = Histogram(self.max_samples)
+			self.spans[span] = histogram
+		histogram.add(seconds)
+
+	def clear(self):
+		self.spans = {}
+
+	def summary(self):
+		"""
+		:return: the summary of each span which has samples, see Histogram.summary
+		:rtype: dict
+		"""
+		order = {span: i for i, span in enumerate(SPANS)}
+		spans = sorted(self.spans.items(), key=lambda item: (order.get(item[0], len(order)), item[0]))
+		return collections.OrderedDict((span, histogram.summary()) for span, histogram in spans)
+
+	def report(self):
+		"""
+		:return: the summary as a table, in milliseconds
+		:rtype: str
+		"""
+		lines = ["{:<20} {:>8} {:>9} {:>9} {:>9} {:>9} {:>9}".format("span (ms)", "count", "mean", "p50", "p95", "p99", "max")]
+		for span, summary in self.summary().items():
+			lines.append("{:<20} {:>8} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}".format(span, summary["count"],
+				*(1000 * summary[key] for key in ["mean", "p50", "p95", "p99", "max"])))
+		return "\n".join(lines)
@@ -0,0 +1,134 @@
+import atexit
+import collections
+import os
+import threading
+
+
+class LogWriter:
+	"""A log file which is written to disk by a background thread
+
+	It can be used wherever the coordinator and agent expect a log file, including with
+	print(..., file=log_writer, flush=True). write only appends the text to a bounded buffer, so
+	the caller never waits on the disk; the background thread writes it out in batches, once
+	flush_writes writes are pending or flush_interval seconds have passed, and rotates the file
+	once it grows past max_bytes. If the buffer is full, the text is dropped and counted
+	instead, and a note of how much was lost is written with the next batch.
+	"""
+
+	def __init__(self, filename, max_queue=100000, flush_writes=2000, flush_interval=0.5, max_bytes=0, backup_count=3,
+				 encoding="utf-8"):
+		"""
+		:param filename: the file to log to, which is truncated first
+		:type filename: str
+		:param max_queue: the most writes which can be waiting for the background thread
+		:type max_queue: int
+		:param flush_writes: how many writes to collect before writing them out
+		:type flush_writes: int
+		:param flush_interval: the longest time in seconds text waits before being written out
+		:type flush_interval: float
+		:param max_bytes: the size at which the file is rotated, or 0 to never rotate it
+		:type max_bytes: int
+		:param backup_count: how many rotated files to keep, as filename.1, filename.2, ...
+		:type backup_count: int
+		"""
+		self.filename = filename
+		self.max_queue = max_queue
+		self.flush_writes = flush_writes
+		self.flush_interval = flush_interval
+		self.max_bytes = max_bytes
+		self.backup_count = backup_count
+		self.encoding = encoding
+		# deque appends and pops are atomic, so writers need no lock
+		self.pending = collections.deque()
+		self.wakeup = threading.Event()
+		self.sync_requests = collections.deque()
+		self.dropped = 0
+		self.closed = False
+		self.file = open(filename, "wb")
+		self.file_bytes = 0
+		self.thread = threading.Thread(target=self.run, name="LogWriter " + filename)
+		self.thread.daemon = True
+		self.thread.start()
+		atexit.register(self.close)
+
+	def write(self, text):
+		pending = self.pending
+		if len(pending) >= self.max_queue:
+			self.dropped += 1
+			return
+		pending.append(text)
+		if len(pending) == self.flush_writes:
+			self.wakeup.set()
+
+	def flush(self):
+		# Text is flushed by the background thread; use sync() to wait until it is on disk
+		pass
+
+	def sync(self):
+		"""Wait until everything written so far has been flushed to the file
+
+		:return: None
+		"""
+		if self.closed:
+			return
+		done = threading.Event()
+		self.sync_requests.append(done)
+		self.wakeup.set()
+		done.wait()
+
+	def close(self):
+		"""Write out everything still pending and close the file
+
+		:return: None
+		"""
+		if self.closed:
+			return
+		self.closed = True
+		self.wakeup.set()
+		self.thread.join()
+		atexit.unregister(self.close)
+
+	def run(self):
+		while True:
+			self.wakeup.wait(self.flush_interval)
+			self.wakeup.clear()
+			closing = self.closed
+			requests = []
+			while self.sync_requests:
+				requests.append(self.sync_requests.popleft())
+			batch = []
+			pending = self.pending
+			while pending:
+				batch.append(pending.popleft())
+			self.write_out(batch)
+			if closing:
+				self.file.close()
+			for done in requests:
+				done.set()
+			if closing:
+				return
+
+	def write_out(self, batch):
+		if self.dropped > 0:
+			dropped, self.dropped = self.dropped, 0
+			batch.append("LogWriter: buffer was full, dropped {} writes\n".format(dropped))
+		if len(batch) == 0:
+			return
+		data = "".join(batch).encode(self.encoding)
+		self.file.write(data)
+		self.file.flush()
+		self.file_bytes += len(data)
+		# Only rotate between whole lines
+		if self.max_bytes > 0 and self.file_bytes >= self.max_bytes and data.endswith(b"\n"):
+			self.rotate()
+
+	def rotate(self):
+		self.file.close()
+		for i in range(self.backup_count - 1, 0, -1):
+			source = "{}.{}".format(self.filename, i)
+			if os.path.exists(source):
+				os.replace(source, "{}.{}".format(self.filename, i + 1))
+		if self.backup_count > 0:
+			os.replace(self.filename, self.filename + ".1")
+		self.file = open(self.filename, "wb")
+		self.file_bytes = 0
@@ -0,0 +1,141 @@
+import collections
+import os
+import sys
+import threading
+
+
+class SamplingProfiler:
+	"""Samples one thread's stack at a fixed interval and counts the stacks it sees
+
+	Unlike cProfile nothing is hooked into the profiled thread, so its timings are left alone:
+	a background thread looks at the profiled thread's current frame every interval seconds,
+	which costs the profiled thread only the GIL hand-offs. Stacks are counted until
+	end_game(), which returns them, and writes them to directory if one was given, in the
+	collapsed format read by flamegraph.pl and speedscope: one line per distinct stack,
+	"outer;...;inner count".
+	"""
+
+	def __init__(self, interval=0.005, directory=None, prefix="profile", max_depth=200):
+		"""
+		:param interval: seconds between samples
+		:type interval: float
+		:param directory: where end_game writes each game's stacks, or None to only return them
+		:type directory: str
+		:param prefix: the start of each file's name, which is followed by the game's number
+		:type prefix: str
+		:param max_depth: the most frames kept of a stack, counting from the outermost
+		:type max_depth: int
+		"""
+		self.interval = interval
+		self.directory = directory
+		self.prefix = prefix
+		self.max_depth = max_depth
+		self.stacks = collections.Counter()
+		self.samples = 0
+		self.games = 0
+		self.frame_names = {}
+		self.thread_id = None
+		self.thread = None
+		self.stopping = threading.Event()
+		self.lock = threading.Lock()
+
+	@property
+	def running(self):
+		return self.thread is not None
+
+	def start(self, thread_id=None):
+		"""Start sampling a thread
+
+		:param thread_id: the ident of the thread to sample, by default the calling one
+		:type thread_id: int
+		:return: None
+		"""
+		if self.running:
+			return
+		self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+		self.stopping.clear()
+		self.thread = threading.Thread(target=self.run, name="SamplingProfiler")
+		self.thread.daemon = True
+		self.thread.start()
+
+	def stop(self):
+		"""Stop sampling, keeping the stacks counted so far
+
+		:return: None
+		"""
+		if not self.running:
+			return
+		self.stopping.set()
+		if self.thread is not threading.current_thread():
+			self.thread.join()
+		self.thread = None
+
+	def run(self):
+		while not self.stopping.wait(self.interval):
+			frame = sys._current_frames().get(self.thread_id)
+			if frame is None:
+				# The thread has finished, so stop as if stop() had been called and allow a restart
+				self.thread = None
+				return
+			self.sample(frame)
+
+	def sample(self, frame):
+		names = self.frame_names
+		stack = []
+		while frame is not None:
+			code = frame.f_code
+			name = names.get(code)
+			if name is None:
+				name = self.frame_name(frame)
+				names[code] = name
+			stack.append(name)
+			frame = frame.f_back
+		stack.reverse()
+		stack = ";".join(stack[:self.max_depth])
+		with self.lock:
+			self.stacks[stack] += 1
+			self.samples += 1
+
+	def frame_name(self, frame):
+		code = frame.f_code
+		module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+		# Semicolons separate frames in the collapsed format
+		return "{}.{}:{}".format(module, getattr(code, "co_qualname", code.co_name), code.co_firstlineno).replace(";", ":")
+
+	def collapsed(self):
+		"""
+		:return: the stacks counted so far in the collapsed format, most frequent first
+		:rtype: str
+		"""
+		with self.lock:
+			stacks = self.stacks.most_common()
+		return "".join("{} {}\n".format(stack, count) for stack, count in stacks)
+
+	def end_game(self):
+		"""Finish the current game's profile and start counting the next one's
+
+		:return: the game's stacks in the collapsed format, empty if no samples were taken
+		:rtype: str
+		"""
+		with self.lock:
+			stacks = self.stacks
+			self.stacks = collections.Counter()
+			self.samples = 0
+		profile = "".join("{} {}\n".format(stack, count) for stack, count in stacks.most_common())
+		if profile:
+			self.games += 1
+			if self.directory is not None:
+				self.write(os.path.join(self.directory, "{}-{:04d}.folded".format(self.prefix, self.games)), profile)
+		return profile
+
+	def write(self, filename, profile=None):
+		"""Write stacks in the collapsed format
+
+		:param filename: the file to write
+		:type filename: str
+		:param profile: the stacks to write, by default the ones counted so far
+		:type profile: str
+		:return: None
+		"""
+		with open(filename, "w", encoding="utf-8") as f:
+			f.write(profile if profile is not None else self.collapsed())
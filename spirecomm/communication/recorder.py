@@ -0,0 +1,197 @@
+import gzip
+import io
+import json
+import threading
+import time
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+from spirecomm.communication.coordinator import Coordinator
+
+# Records Communication Mod sessions and replays them through a coordinator and agent.
+#
+# A recording is newline-delimited JSON. The first line is a header; after that each line is
+# either {"t":seconds,"in":message} for a message from Communication Mod, with the message
+# embedded as it arrived, or {"t":seconds,"out":"command"} for a command sent to it. t counts
+# from the start of the recording. Files ending in .gz or .zst are compressed.
+
+FORMAT_VERSION = 1
+
+
+def open_session_file(filename, mode, compression=None):
+	if compression is None:
+		if filename.endswith(".gz"):
+			compression = "gzip"
+		elif filename.endswith(".zst"):
+			compression = "zstd"
+	if compression == "gzip":
+		return gzip.open(filename, mode + "t", encoding="utf-8")
+	elif compression == "zstd":
+		if zstandard is None:
+			raise ValueError("zstd compression needs the zstandard package")
+		raw = open(filename, mode + "b")
+		if mode == "r":
+			stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+		else:
+			stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+		return io.TextIOWrapper(stream, encoding="utf-8")
+	elif compression is not None:
+		raise ValueError("Unknown compression {}".format(compression))
+	return open(filename, mode, encoding="utf-8")
+
+
+class SessionRecorder:
+	"""Appends every message and command of a session to a recording
+
+	Set it as a coordinator's recorder to record that coordinator's traffic. Lines are
+	buffered, not flushed one by one, so call close() when done.
+	"""
+
+	def __init__(self, filename, compression=None):
+		"""
+		:param filename: the file to append to
+		:type filename: str
+		:param compression: "gzip", "zstd" or None, by default chosen from the file's extension
+		:type compression: str
+		"""
+		self.file = open_session_file(filename, "a", compression)
+		self.start = time.perf_counter()
+		self.lock = threading.Lock()
+		self.file.write(json.dumps({"t": 0, "version": FORMAT_VERSION, "started": time.time()}) + "\n")
+
+	def message(self, message):
+		"""Record a message from Communication Mod
+
+		:param message: the raw message, which is stored as it is
+		:type message: str
+		:return: None
+		"""
+		line = '{{"t":{:.6f},"in":{}}}\n'.format(time.perf_counter() - self.start, message)
+		with self.lock:
+			self.file.write(line)
+
+	def command(self, command):
+		"""Record a command sent to Communication Mod
+
+		:param command: the command
+		:type command: str
+		:return: None
+		"""
+		line = '{{"t":{:.6f},"out":{}}}\n'.format(time.perf_counter() - self.start, json.dumps(command))
+		with self.lock:
+			self.file.write(line)
+
+	def close(self):
+		with self.lock:
+			self.file.close()
+
+
+def read_session(filename, compression=None):
+	"""Read a recording, or a plain file of one message per line
+
+	:param filename: the file to read
+	:type filename: str
+	:return: (seconds, direction, text) for each message ("in") and command ("out"). Plain
+			 files give only messages, with seconds None.
+	:rtype: generator
+	"""
+	with open_session_file(filename, "r", compression) as f:
+		for line in f:
+			line = line.rstrip("\r\n")
+			if not line:
+				continue
+			if not line.startswith('{"t":'):
+				yield None, "in", line
+				continue
+			# Messages are embedded as they arrived, so cut them out rather than re-encode them
+			index = line.find(',"in":')
+			if index != -1 and line.find(",", 5) == index:
+				yield float(line[5:index]), "in", line[index + 6:-1]
+				continue
+			record = json.loads(line)
+			if "out" in record:
+				yield record["t"], "out", record["out"]
+			elif "in" in record:
+				yield record["t"], "in", json.dumps(record["in"])
+
+
+class ReplayCoordinator(Coordinator):
+	"""Feeds a recorded session through a coordinator's callbacks as fast as they can go
+
+	Each recorded message is handled as if it had just arrived, and every action the callbacks
+	queue is executed straight away. Commands are collected in sent_commands instead of being
+	sent, so they can be compared with the ones in the recording.
+	"""
+
+	def __init__(self, messages, expected_commands=None, logfile=None):
+		"""
+		:param messages: the messages to replay
+		:type messages: list
+		:param expected_commands: the commands recorded with the messages, if any
+		:type expected_commands: list
+		:param logfile: the file to log to, nothing is logged if not given
+		"""
+		self.messages = messages
+		self.expected_commands = expected_commands if expected_commands is not None else []
+		self.sent_commands = []
+		self.latencies = []
+		self.init_state(logfile if logfile is not None else io.StringIO())
+
+	@classmethod
+	def from_file(cls, filename, logfile=None):
+		"""Create a coordinator to replay a recording
+
+		:return: the coordinator, with the recorded commands in expected_commands
+		:rtype: ReplayCoordinator
+		"""
+		records = list(read_session(filename))
+		return cls([text for t, direction, text in records if direction == "in"],
+				   [text for t, direction, text in records if direction == "out"], logfile)
+
+	def send_message(self, message):
+		self.add_response_latency(time.perf_counter())
+		self.sent_commands.append(message)
+		self.game_is_ready = False
+
+	def wake(self):
+		pass
+
+	def get_next_raw_message(self, block=False):
+		raise EOFError("A replay only has its recorded messages")
+
+	def replay(self):
+		"""Handle every recorded message, timing how long each takes
+
+		:return: the time in seconds spent handling each message, including executing its actions
+		:rtype: list
+		"""
+		for message in self.messages:
+			start = time.perf_counter()
+			self.message_arrived_at = start
+			self.last_msg = message
+			self.receive_game_state_update(repeat=True)
+			while self.action_is_ready():
+				self.execute_next_action()
+			self.latencies.append(time.perf_counter() - start)
+		return self.latencies
+
+	def mismatches(self):
+		"""Compare the commands sent during the replay with the recorded ones
+
+		Commands sent after the last recorded one are not counted, since the recording ended
+		before Communication Mod could answer them.
+
+		:return: (index, recorded command, replayed command) for every difference
+		:rtype: list
+		"""
+		# A replay never signals ready, it starts from the messages
+		expected = [command for command in self.expected_commands if command != "ready"]
+		differences = []
+		for i, recorded in enumerate(expected):
+			replayed = self.sent_commands[i] if i < len(self.sent_commands) else None
+			if recorded != replayed:
+				differences.append((i, recorded, replayed))
+		return differences
@@ -0,0 +1,708 @@
+import argparse
+import collections
+import json
+import random
+import subprocess
+import sys
+import time
+
+from spirecomm.spire.card import CARD_DEFINITIONS
+from spirecomm.spire.encounters import MONSTERS, monster_tables, weighted_choice
+from spirecomm.communication.coordinator import Coordinator
+from spirecomm.communication.log_writer import LogWriter
+from spirecomm.communication.recorder import read_session
+
+# A stand-in for Slay the Spire and Communication Mod, for running the coordinator and agent
+# without the game. A simulator takes each command the AI sends and returns the message
+# Communication Mod would answer with; ReplaySimulator plays back a recorded session and
+# CombatSimulator plays a much simplified game of its own.
+#
+# SimulatorCoordinator connects one to a coordinator in the same process. Otherwise run
+#   python -m spirecomm.communication.simulator [options] -- python main.py
+# to start an AI the way Communication Mod would, or with no command to speak the protocol on
+# this process's own stdin and stdout, e.g. for AsyncCoordinator.connect_subprocess.
+
+
+class Simulator:
+	"""The Communication Mod side of the protocol"""
+
+	def handle(self, command):
+		"""Respond to a command from the AI
+
+		:param command: the command, without its line ending
+		:type command: str
+		Every command gets exactly one message back, as Communication Mod answers each one with
+		a state or an error: a command which is unknown or not available at the time is
+		answered with error(), never an exception, so one bad command cannot stop serve().
+
+		:return: the message to send back, or None if there is nothing more to send
+		:rtype: str
+		"""
+		return self.error("Unsupported command: {}".format(command))
+
+	def error(self, text):
+		return json.dumps({"error": text, "ready_for_command": True})
+
+
+class ReplaySimulator(Simulator):
+	"""Answers each command with the next message of a recorded session
+
+	The commands themselves are not checked, only kept in commands, so an agent which
+	behaves differently from the recorded one simply gets the recorded states regardless.
+	"""
+
+	def __init__(self, messages):
+		"""
+		:param messages: the raw messages Communication Mod sent, in order
+		:type messages: list
+		"""
+		self.messages = messages
+		self.position = 0
+		self.commands = []
+
+	@classmethod
+	def from_file(cls, filename):
+		"""Load a session recorded by SessionRecorder, or as one raw message per line
+
+		:param filename: the file to load
+		:type filename: str
+		:return: the simulator
+		:rtype: ReplaySimulator
+		"""
+		return cls([text for t, direction, text in read_session(filename) if direction == "in"])
+
+	def handle(self, command):
+		self.commands.append(command)
+		if self.position >= len(self.messages):
+			return None
+		message = self.messages[self.position]
+		self.position += 1
+		return message
+
+
+# Cards the combat model knows: id: (name, type, rarity, cost, has_target, effects, exhausts).
+# Damage, Block and Draw are replaced by the damage, mitigation and draw in cards/[name].json if set.
+SIM_CARDS = {
+	"Strike_R": ("Strike", "ATTACK", "BASIC", 1, True, (("Damage", 6),), False),
+	"Defend_R": ("Defend", "SKILL", "BASIC", 1, False, (("Block", 5),), False),
+	"Bash": ("Bash", "ATTACK", "BASIC", 2, True, (("Damage", 8), ("Vulnerable", 2)), False),
+	"Strike_G": ("Strike", "ATTACK", "BASIC", 1, True, (("Damage", 6),), False),
+	"Defend_G": ("Defend", "SKILL", "BASIC", 1, False, (("Block", 5),), False),
+	"Neutralize": ("Neutralize", "ATTACK", "BASIC", 0, True, (("Damage", 3), ("Weak", 1)), False),
+	"Survivor": ("Survivor", "SKILL", "BASIC", 1, False, (("Block", 8),), False),
+	"Strike_B": ("Strike", "ATTACK", "BASIC", 1, True, (("Damage", 6),), False),
+	"Defend_B": ("Defend", "SKILL", "BASIC", 1, False, (("Block", 5),), False),
+	"Zap": ("Zap", "SKILL", "BASIC", 1, False, (("DamageRandom", 3),), False),
+	"Dualcast": ("Dualcast", "SKILL", "BASIC", 1, False, (("DamageRandom", 8),), False),
+	"Pommel Strike": ("Pommel Strike", "ATTACK", "COMMON", 1, True, (("Damage", 9), ("Draw", 1)), False),
+	"Shrug It Off": ("Shrug It Off", "SKILL", "COMMON", 1, False, (("Block", 8), ("Draw", 1)), False),
+	"Cleave": ("Cleave", "ATTACK", "COMMON", 1, False, (("DamageAll", 8),), False),
+	"Anger": ("Anger", "ATTACK", "COMMON", 0, True, (("Damage", 6),), False),
+	"Iron Wave": ("Iron Wave", "ATTACK", "COMMON", 1, True, (("Damage", 5), ("Block", 5)), False),
+	"Uppercut": ("Uppercut", "ATTACK", "UNCOMMON", 2, True, (("Damage", 13), ("Weak", 1), ("Vulnerable", 1)), False),
+	"Inflame": ("Inflame", "POWER", "UNCOMMON", 1, False, (("Strength", 2),), False),
+	"Offering": ("Offering", "SKILL", "RARE", 0, False, (("LoseHP", 6), ("Energy", 2), ("Draw", 3)), True),
+}
+
+REWARD_CARDS = ["Pommel Strike", "Shrug It Off", "Cleave", "Anger", "Iron Wave", "Uppercut", "Inflame", "Offering"]
+
+STARTER_DECKS = {
+	"IRONCLAD": (80, ["Strike_R"] * 5 + ["Defend_R"] * 4 + ["Bash"], "Burning Blood"),
+	"THE_SILENT": (70, ["Strike_G"] * 5 + ["Defend_G"] * 5 + ["Neutralize", "Survivor"], "Ring of the Snake"),
+	"DEFECT": (75, ["Strike_B"] * 4 + ["Defend_B"] * 4 + ["Zap", "Dualcast"], "Cracked Core"),
+}
+
+# Potions the combat model knows: id: (effects, requires_target)
+SIM_POTIONS = {
+	"Fire Potion": ((("Damage", 20),), True),
+	"Block Potion": ((("Block", 12),), False),
+	"Strength Potion": ((("Strength", 2),), False),
+}
+
+# The simulator's act: its hallway fights and its boss, from spirecomm.spire.encounters.MONSTERS
+ENCOUNTERS = [["Jaw Worm"], ["Cultist"], ["Louse", "Louse"]]
+BOSS_ENCOUNTER = ["Slime Boss"]
+
+DEBUFFS = ("Vulnerable", "Weak")
+
+
+def powers_to_json(powers):
+	return [{"id": power, "name": power, "amount": amount} for power, amount in powers.items() if amount != 0]
+
+
+class SimCombatant:
+
+	def __init__(self, max_hp, current_hp):
+		self.max_hp = max_hp
+		self.current_hp = current_hp
+		self.block = 0
+		self.powers = {}
+
+	def add_power(self, power, amount):
+		self.powers[power] = self.powers.get(power, 0) + amount
+
+	def attack_damage(self, base, defender):
+		damage = base + self.powers.get("Strength", 0)
+		if self.powers.get("Weak", 0) > 0:
+			damage = int(damage * 0.75)
+		if defender.powers.get("Vulnerable", 0) > 0:
+			damage = int(damage * 1.5)
+		return max(damage, 0)
+
+	def take_damage(self, damage):
+		blocked = min(self.block, damage)
+		self.block -= blocked
+		self.current_hp = max(self.current_hp - (damage - blocked), 0)
+
+	def tick_debuffs(self):
+		for debuff in DEBUFFS:
+			if self.powers.get(debuff, 0) > 0:
+				self.powers[debuff] -= 1
+
+
+class SimMonster(SimCombatant):
+
+	def __init__(self, name, rng):
+		template = MONSTERS[name]
+		max_hp = rng.randint(*template["hp"])
+		super().__init__(max_hp, max_hp)
+		self.name = name
+		self.monster_id = template["id"]
+		self.states, self.moves = monster_tables(name)
+		self.state = "1"
+		self.move = None
+		self.roll_move(rng)
+
+	@property
+	def is_gone(self):
+		return self.current_hp <= 0
+
+	def roll_move(self, rng):
+		state = self.states[self.state]
+		self.move = weighted_choice(rng, state["moveset"])
+		self.state = weighted_choice(rng, state["transition"])
+
+	def intent(self):
+		effects = set(effect for effect, value in self.moves[self.move])
+		attack = "Damage" in effects
+		defend = "Block" in effects
+		buff = "Strength" in effects or "Ritual" in effects
+		debuff = "Weak" in effects or "Vulnerable" in effects
+		if attack:
+			if defend:
+				return "ATTACK_DEFEND"
+			elif debuff:
+				return "ATTACK_DEBUFF"
+			elif buff:
+				return "ATTACK_BUFF"
+			return "ATTACK"
+		elif defend:
+			return "DEFEND_BUFF" if buff else "DEFEND_DEBUFF" if debuff else "DEFEND"
+		elif buff:
+			return "BUFF"
+		elif debuff:
+			return "DEBUFF"
+		return "UNKNOWN"
+
+	def to_json(self, player):
+		damages = [value for effect, value in self.moves[self.move] if effect == "Damage"]
+		json_object = {
+			"name": self.name,
+			"id": self.monster_id,
+			"max_hp": self.max_hp,
+			"current_hp": self.current_hp,
+			"block": self.block,
+			"intent": self.intent() if not self.is_gone else "NONE",
+			"half_dead": False,
+			"is_gone": self.is_gone,
+			"move_id": list(self.moves).index(self.move),
+			"move_base_damage": damages[0] if damages else -1,
+			"move_adjusted_damage": self.attack_damage(damages[0], player) if damages else -1,
+			"move_hits": len(damages),
+			"powers": powers_to_json(self.powers)
+		}
+		return json_object
+
+	def take_turn(self, player, rng):
+		self.block = 0
+		# Ritual only starts adding Strength the turn after it was gained
+		ritual = self.powers.get("Ritual", 0)
+		for effect, value in self.moves[self.move]:
+			if effect == "Damage":
+				player.take_damage(self.attack_damage(value, player))
+			elif effect == "Block":
+				self.block += value
+			elif effect in DEBUFFS:
+				player.add_power(effect, value)
+			else:
+				self.add_power(effect, value)
+		if ritual > 0:
+			self.add_power("Strength", ritual)
+		self.tick_debuffs()
+		self.roll_move(rng)
+
+
+class CombatSimulator(Simulator):
+	"""A much simplified game: a run of fights, with rewards in between, ending with a boss
+
+	Cards, potions and monsters are limited to SIM_CARDS, SIM_POTIONS and MONSTERS; card
+	damage, block and draw come from cards/ and monster behaviour from monsters/ where those
+	define them. There is no map, no events, shops or rest sites, and no relic effects, so
+	it exercises the combat and reward logic of an agent, and the protocol, not its strategy.
+	"""
+
+	def __init__(self, seed=0, floors=5, hand_size=5, energy=3):
+		"""
+		:param seed: seeds games started without a seed
+		:type seed: int
+		:param floors: the number of fights in a game, the last one being the boss
+		:type floors: int
+		"""
+		self.default_seed = seed
+		self.floors = floors
+		self.hand_size = hand_size
+		self.max_energy = energy
+		self.in_game = False
+		self.screen_type = "NONE"
+		self.games_played = 0
+		self.effects_cache = {}
+
+	def handle(self, command):
+		words = command.strip().split()
+		if len(words) == 0:
+			return self.error("Empty command")
+		name, arguments = words[0].lower(), words[1:]
+		try:
+			if name in ("ready", "state", "wait", "key", "click"):
+				return self.message()
+			elif name == "start" and not self.in_game:
+				self.start_game(arguments)
+			elif name == "play" and self.in_game and self.screen_type == "NONE":
+				self.play_card(arguments)
+			elif name == "end" and self.in_game and self.screen_type == "NONE":
+				self.end_turn()
+			elif name == "potion" and self.in_game and self.screen_type == "NONE":
+				self.use_potion(arguments)
+			elif name == "choose" and self.in_game and self.screen_type in ("COMBAT_REWARD", "CARD_REWARD"):
+				self.choose(" ".join(arguments))
+			elif name in ("proceed", "confirm") and self.in_game and self.screen_type in ("COMBAT_REWARD", "GAME_OVER"):
+				self.proceed()
+			elif name in ("cancel", "skip", "leave", "return") and self.in_game and self.screen_type == "CARD_REWARD":
+				self.screen_type = "COMBAT_REWARD"
+			else:
+				return self.error("Invalid command: {}".format(command))
+		except (ValueError, IndexError):
+			return self.error("Invalid command: {}".format(command))
+		return self.message()
+
+	# Game flow
+
+	def start_game(self, arguments):
+		character = arguments[0].upper()
+		if character not in STARTER_DECKS:
+			raise ValueError(character)
+		self.character = character
+		self.ascension_level = int(arguments[1]) if len(arguments) > 1 else 0
+		if len(arguments) > 2:
+			seed = arguments[2]
+			self.seed = int(seed) if seed.isdigit() else int(seed, 36)
+		else:
+			self.seed = self.default_seed + self.games_played
+		self.rng = random.Random(self.seed)
+		max_hp, deck, relic = STARTER_DECKS[character]
+		self.player = SimCombatant(max_hp, max_hp)
+		self.next_uuid = 0
+		self.deck = [self.new_card(card_id) for card_id in deck]
+		self.relics = [{"id": relic, "name": relic, "counter": -1}]
+		self.potions = [None, None, None]
+		self.gold = 99
+		self.floor = 0
+		self.in_game = True
+		self.victory = False
+		self.games_played += 1
+		self.start_combat()
+
+	def new_card(self, card_id):
+		self.next_uuid += 1
+		return {"card_id": card_id, "uuid": "sim-{:05d}".format(self.next_uuid)}
+
+	def start_combat(self):
+		self.floor += 1
+		encounter = BOSS_ENCOUNTER if self.floor >= self.floors else self.rng.choice(ENCOUNTERS)
+		self.room_type = "MonsterRoomBoss" if self.floor >= self.floors else "MonsterRoom"
+		self.monsters = [SimMonster(name, self.rng) for name in encounter]
+		self.draw_pile = list(self.deck)
+		self.rng.shuffle(self.draw_pile)
+		self.hand = []
+		self.discard_pile = []
+		self.exhaust_pile = []
+		self.player.block = 0
+		self.player.powers = {}
+		self.turn = 0
+		self.screen_type = "NONE"
+		self.start_turn()
+
+	def start_turn(self):
+		self.turn += 1
+		self.player.block = 0
+		self.energy = self.max_energy
+		self.draw(self.hand_size)
+
+	def draw(self, count):
+		for _ in range(count):
+			if len(self.hand) >= 10:
+				return
+			if len(self.draw_pile) == 0:
+				if len(self.discard_pile) == 0:
+					return
+				self.draw_pile = self.discard_pile
+				self.discard_pile = []
+				self.rng.shuffle(self.draw_pile)
+			self.hand.append(self.draw_pile.pop())
+
+	def alive_monsters(self):
+		return [monster for monster in self.monsters if not monster.is_gone]
+
+	def check_combat_over(self):
+		if self.player.current_hp <= 0:
+			self.game_over(False)
+		elif len(self.alive_monsters()) == 0:
+			if self.floor >= self.floors:
+				self.game_over(True)
+			else:
+				self.combat_rewards()
+
+	def combat_rewards(self):
+		self.screen_type = "COMBAT_REWARD"
+		self.rewards = [{"reward_type": "GOLD", "gold": self.rng.randint(10, 20)}]
+		if self.rng.random() < 0.4:
+			self.rewards.append({"reward_type": "POTION", "potion": self.rng.choice(list(SIM_POTIONS))})
+		self.rewards.append({"reward_type": "CARD", "cards": [self.new_card(card_id) for card_id in self.rng.sample(REWARD_CARDS, 3)]})
+
+	def game_over(self, victory):
+		self.victory = victory
+		self.screen_type = "GAME_OVER"
+
+	def proceed(self):
+		if self.screen_type == "GAME_OVER":
+			self.in_game = False
+		else:
+			self.start_combat()
+
+	def choose(self, choice):
+		if self.screen_type == "COMBAT_REWARD":
+			reward = self.rewards[self.choice_index(choice, self.reward_choices())]
+			if reward["reward_type"] == "GOLD":
+				self.gold += reward["gold"]
+				self.rewards.remove(reward)
+			elif reward["reward_type"] == "POTION":
+				if None not in self.potions:
+					raise ValueError("Potion slots are full")
+				self.potions[self.potions.index(None)] = reward["potion"]
+				self.rewards.remove(reward)
+			else:
+				self.card_reward = reward
+				self.screen_type = "CARD_REWARD"
+		else:
+			cards = self.card_reward["cards"]
+			self.deck.append(cards[self.choice_index(choice, [SIM_CARDS[card["card_id"]][0].lower() for card in cards])])
+			self.rewards.remove(self.card_reward)
+			self.screen_type = "COMBAT_REWARD"
+
+	def choice_index(self, choice, choice_list):
+		if choice.isdigit():
+			index = int(choice)
+			if index >= len(choice_list):
+				raise IndexError(index)
+			return index
+		return choice_list.index(choice.lower())
+
+	def reward_choices(self):
+		return [reward["reward_type"].lower() for reward in self.rewards]
+
+	# Combat
+
+	def card_effects(self, card_id):
+		effects = self.effects_cache.get(card_id)
+		if effects is None:
+			definition = CARD_DEFINITIONS.get(SIM_CARDS[card_id][0])
+			overrides = {"Damage": definition["damage"], "Block": definition["mitigation"], "Draw": definition["draw"]}
+			effects = [(effect, value if overrides.get(effect) is None else overrides[effect]) for effect, value in SIM_CARDS[card_id][5]]
+			self.effects_cache[card_id] = effects
+		return effects
+
+	def target(self, arguments, index, required):
+		if not required:
+			return None
+		monster = self.monsters[int(arguments[index])]
+		if monster.is_gone:
+			raise ValueError("Target is gone")
+		return monster
+
+	def play_card(self, arguments):
+		index = int(arguments[0]) - 1
+		if index < 0:
+			raise IndexError(index)
+		card = self.hand[index]
+		name, card_type, rarity, cost, has_target, effects, exhausts = SIM_CARDS[card["card_id"]]
+		if cost > self.energy:
+			raise ValueError("Not enough energy")
+		target = self.target(arguments, 1, has_target)
+		self.energy -= cost
+		self.hand.pop(index)
+		self.apply_effects(self.card_effects(card["card_id"]), target)
+		if exhausts:
+			self.exhaust_pile.append(card)
+		elif card_type != "POWER":
+			self.discard_pile.append(card)
+		self.check_combat_over()
+
+	def use_potion(self, arguments):
+		action, index = arguments[0], int(arguments[1])
+		potion = self.potions[index]
+		if potion is None:
+			raise ValueError("No potion in slot")
+		if action == "use":
+			effects, requires_target = SIM_POTIONS[potion]
+			self.apply_effects(effects, self.target(arguments, 2, requires_target))
+		elif action != "discard":
+			raise ValueError(action)
+		self.potions[index] = None
+		self.check_combat_over()
+
+	def apply_effects(self, effects, target):
+		player = self.player
+		for effect, value in effects:
+			if effect == "Damage":
+				target.take_damage(player.attack_damage(value, target))
+			elif effect == "DamageAll":
+				for monster in self.alive_monsters():
+					monster.take_damage(player.attack_damage(value, monster))
+			elif effect == "DamageRandom":
+				monsters = self.alive_monsters()
+				if len(monsters) > 0:
+					monster = self.rng.choice(monsters)
+					monster.take_damage(player.attack_damage(value, monster))
+			elif effect == "Block":
+				player.block += value
+			elif effect == "Draw":
+				self.draw(value)
+			elif effect == "Energy":
+				self.energy += value
+			elif effect == "LoseHP":
+				player.current_hp = max(player.current_hp - value, 0)
+			elif effect in DEBUFFS:
+				target.add_power(effect, value)
+			else:
+				player.add_power(effect, value)
+
+	def end_turn(self):
+		self.discard_pile.extend(self.hand)
+		self.hand = []
+		self.player.tick_debuffs()
+		for monster in self.alive_monsters():
+			monster.take_turn(self.player, self.rng)
+			if self.player.current_hp <= 0:
+				break
+		self.check_combat_over()
+		if self.screen_type == "NONE":
+			self.start_turn()
+
+	# Messages
+
+	def card_to_json(self, card):
+		name, card_type, rarity, cost, has_target, effects, exhausts = SIM_CARDS[card["card_id"]]
+		return {"id": card["card_id"], "name": name, "type": card_type, "rarity": rarity, "upgrades": 0,
+				"has_target": has_target, "cost": cost, "uuid": card["uuid"], "misc": 0,
+				"is_playable": self.screen_type == "NONE" and cost <= self.energy, "exhausts": exhausts}
+
+	def potion_to_json(self, potion):
+		if potion is None:
+			return {"id": "Potion Slot", "name": "Potion Slot", "can_use": False, "can_discard": False, "requires_target": False}
+		return {"id": potion, "name": potion, "can_use": True, "can_discard": True, "requires_target": SIM_POTIONS[potion][1]}
+
+	def screen_state(self):
+		if self.screen_type == "COMBAT_REWARD":
+			rewards = []
+			for reward in self.rewards:
+				if reward["reward_type"] == "POTION":
+					rewards.append({"reward_type": "POTION", "potion": self.potion_to_json(reward["potion"])})
+				elif reward["reward_type"] == "GOLD":
+					rewards.append({"reward_type": "GOLD", "gold": reward["gold"]})
+				else:
+					rewards.append({"reward_type": "CARD"})
+			return {"rewards": rewards}, self.reward_choices()
+		elif self.screen_type == "CARD_REWARD":
+			cards = [self.card_to_json(card) for card in self.card_reward["cards"]]
+			return {"cards": cards, "bowl_available": False, "skip_available": True}, [card["name"].lower() for card in cards]
+		elif self.screen_type == "GAME_OVER":
+			return {"score": self.floor * 10 + self.gold, "victory": self.victory}, None
+		return {}, None
+
+	def available_commands(self):
+		if not self.in_game:
+			return ["start", "state"]
+		if self.screen_type == "NONE":
+			commands = []
+			if any(SIM_CARDS[card["card_id"]][3] <= self.energy for card in self.hand):
+				commands.append("play")
+			commands.append("end")
+			if any(potion is not None for potion in self.potions):
+				commands.append("potion")
+		elif self.screen_type == "COMBAT_REWARD":
+			commands = ["choose", "proceed"] if len(self.rewards) > 0 else ["proceed"]
+		elif self.screen_type == "CARD_REWARD":
+			commands = ["choose", "skip"]
+		else:
+			commands = ["proceed"]
+		return commands + ["key", "click", "wait", "state"]
+
+	def game_state(self):
+		screen_state, choice_list = self.screen_state()
+		game_state = {
+			"current_hp": self.player.current_hp,
+			"max_hp": self.player.max_hp,
+			"floor": self.floor,
+			"act": 1,
+			"gold": self.gold,
+			"seed": self.seed,
+			"class": self.character,
+			"ascension_level": self.ascension_level,
+			"act_boss": BOSS_ENCOUNTER[0],
+			"relics": self.relics,
+			"deck": [self.card_to_json(card) for card in self.deck],
+			"potions": [self.potion_to_json(potion) for potion in self.potions],
+			"is_screen_up": self.screen_type != "NONE",
+			"screen_type": self.screen_type,
+			"screen_state": screen_state,
+			"room_phase": "COMBAT" if self.screen_type == "NONE" else "COMPLETE",
+			"room_type": self.room_type,
+		}
+		if choice_list is not None and len(choice_list) > 0:
+			game_state["choice_list"] = choice_list
+		if self.screen_type == "NONE":
+			game_state["combat_state"] = {
+				"player": {
+					"max_hp": self.player.max_hp,
+					"current_hp": self.player.current_hp,
+					"block": self.player.block,
+					"energy": self.energy,
+					"powers": powers_to_json(self.player.powers),
+					"orbs": []
+				},
+				"monsters": [monster.to_json(self.player) for monster in self.monsters],
+				"draw_pile": [self.card_to_json(card) for card in self.draw_pile],
+				"discard_pile": [self.card_to_json(card) for card in self.discard_pile],
+				"exhaust_pile": [self.card_to_json(card) for card in self.exhaust_pile],
+				"hand": [self.card_to_json(card) for card in self.hand],
+				"turn": self.turn
+			}
+		return game_state
+
+	def message(self):
+		communication_state = {
+			"available_commands": self.available_commands(),
+			"ready_for_command": True,
+			"in_game": self.in_game
+		}
+		if self.in_game:
+			communication_state["game_state"] = self.game_state()
+		return json.dumps(communication_state)
+
+
+class SimulatorCoordinator(Coordinator):
+	"""A Coordinator connected directly to a Simulator in the same process
+
+	There are no threads or pipes: each command is answered by the simulator as it is sent.
+	When the simulator has nothing more to send, the coordinator sees the input as closed.
+	"""
+
+	def __init__(self, simulator, logfile=None):
+		"""
+		:param simulator: the simulator to play against
+		:type simulator: Simulator
+		:param logfile: the file to log to, ai_comm.log if not given
+		"""
+		self.simulator = simulator
+		self.pending_messages = collections.deque()
+		self.init_state(logfile if logfile is not None else LogWriter("ai_comm.log"))
+
+	def send_message(self, message):
+		"""Send a command to the simulator and queue its response
+
+		:param message: the message to send
+		:type message: str
+		:return: None
+		"""
+		if self.recorder is not None:
+			self.recorder.command(message)
+		self.add_response_latency(time.perf_counter())
+		response = self.simulator.handle(message)
+		if response is not None:
+			self.pending_messages.append(response)
+		self.game_is_ready = False
+
+	def wake(self):
+		pass
+
+	def get_next_raw_message(self, block=False):
+		"""Get the simulator's next message
+
+		:param block: set to True to wait for the next message
+		:type block: bool
+		:return: the message, or None if there is none and block is False
+		:rtype: str
+		:raises EOFError: if the simulator has nothing more to send but a message is needed
+		"""
+		if self.input_closed:
+			raise EOFError("The simulator has nothing more to send")
+		if len(self.pending_messages) > 0:
+			self.message_arrived_at = time.perf_counter()
+			self.last_msg = self.pending_messages.popleft()
+			return self.last_msg
+		if block:
+			self.input_closed = True
+			print("Communicator: simulator finished", file=self.logfile, flush=True)
+			raise EOFError("The simulator has nothing more to send")
+		return None
+
+
+def serve(simulator, input_stream, output_stream):
+	"""Answer commands read from a stream until it closes or the simulator has nothing more to send
+
+	:return: None
+	"""
+	for line in input_stream:
+		response = simulator.handle(line.rstrip("\r\n"))
+		if response is None:
+			return
+		output_stream.write(response + "\n")
+		output_stream.flush()
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Stand in for Slay the Spire and Communication Mod")
+	parser.add_argument("--replay", help="play back a recorded session instead of simulating combat")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--floors", type=int, default=5)
+	parser.add_argument("command", nargs=argparse.REMAINDER, help="the AI to start, after --")
+	args = parser.parse_args()
+
+	if args.replay is not None:
+		simulator = ReplaySimulator.from_file(args.replay)
+	else:
+		simulator = CombatSimulator(seed=args.seed, floors=args.floors)
+	command = args.command[1:] if args.command[:1] == ["--"] else args.command
+	if len(command) == 0:
+		serve(simulator, sys.stdin, sys.stdout)
+		return
+	process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True, bufsize=1)
+	try:
+		serve(simulator, process.stdout, process.stdin)
+	finally:
+		process.stdin.close()
+		process.wait()
+
+
+if __name__ == "__main__":
+	main()
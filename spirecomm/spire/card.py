@@ -1,6 +1,11 @@
 from enum import Enum
 import os
+import sys
 import json
+import collections
+import collections.abc
+
+from spirecomm.spire.character import freeze
 
 
 class CardType(Enum):
@@ -20,36 +25,36 @@ class CardRarity(Enum):
 	CURSE = 6
 
 
-class Card:
-	def __init__(self, card_id, name, card_type, rarity, upgrades=0, has_target=False, cost=0, uuid="", misc=0, price=0, is_playable=False, exhausts=False):
-		self.card_id = card_id
-		self.name = name
-		self.type = card_type
-		self.rarity = rarity
-		self.upgrades = upgrades
-		self.has_target = has_target
-		self.cost = cost
-		self.uuid = uuid
-		self.misc = misc
-		self.price = price
-		self.is_playable = is_playable
-		self.exhausts = exhausts
-		self.value = {}
-		
-		# Static values, load from cards/[name].json
-		self.value["damage"] = None
-		self.value["mitigation"] = None
-		self.value["scaling damage"] = None
-		self.value["scaling mitigation"] = None
-		self.value["aoe"] = None
-		self.value["draw"] = None
-		self.value["utility"] = None
+class CardDefinitions:
+	"""A process-wide store of the static card data in cards/[name].json
+
+	Each file is read at most once. Cards without a file share the default definition,
+	and the reason for the miss is kept in memory instead of being written to err.log.
+	Definitions are frozen as they are loaded, like monster definitions, so one card's
+	values cannot be changed through another card of the same name.
+	"""
+
+	def __init__(self, directory="cards"):
+		self.directory = directory
+		self.definitions = {}
+		self.missing = {}
+
+	@staticmethod
+	def default_definition():
+		value = {}
+		value["damage"] = None
+		value["mitigation"] = None
+		value["scaling damage"] = None
+		value["scaling mitigation"] = None
+		value["aoe"] = None
+		value["draw"] = None
+		value["utility"] = None
 		'''
 		Synergy format:
 		(Synergy type (string), value (float)) tuple
 		e.g. pummel might have (Strength, 4)
 		'''
-		self.value["synergies"] = []
+		value["synergies"] = []
 		
 		'''
 		Effect format:
@@ -59,28 +64,137 @@ class Card:
 		- Defend is (Block, 5)
 		- Headbutt is (DiscardToTop, 1) -- cards which have unique abilities can be tracked uniquely
 		'''
-		self.value["effects"] = []
-		
+		value["effects"] = []
+
+		# Dynamic values, set per card through Card.value
+		value["upgrade value"] = None # How much do we want to upgrade this card?
+		value["purge value"] = None # How much do we want to get rid of this card?
+		value["synergy value"] = None # How well does this work with our deck?
+		return value
+
+	def load(self, name):
+		definition = self.default_definition()
 		try:
-			with open(os.path.join("cards", self.name + ".json"),"r") as f:
-				self.value = json.load(f)
+			with open(os.path.join(self.directory, str(name) + ".json"), "r") as f:
+				definition.update(json.load(f))
 		except Exception as e:
-			with open('err.log', 'a+') as err_file:
-				err_file.write("Card Error: " + str(self.name))
-				err_file.write(e)
-			#raise Exception(e)
-		
-		# Dynamic values
-		self.value["upgrade value"] = None # How much do we want to upgrade this card?
-		self.value["purge value"] = None # How much do we want to get rid of this card?
-		self.value["synergy value"] = None # How well does this work with our deck?
+			self.missing[name] = str(e)
+		return freeze(definition)
+
+	def get(self, name):
+		"""Get the shared static definition of a card, loading it on first use
+
+		:param name: the name of the card
+		:type name: str
+		:return: the card's static values, read-only as they are shared between cards
+		:rtype: types.MappingProxyType
+		"""
+		definition = self.definitions.get(name)
+		if definition is None:
+			definition = self.load(name)
+			self.definitions[name] = definition
+		return definition
+
+	def preload(self):
+		"""Load every definition in the cards directory up front
+
+		:return: None
+		"""
+		try:
+			filenames = os.listdir(self.directory)
+		except OSError:
+			return
+		for filename in filenames:
+			if filename.endswith(".json"):
+				self.get(filename[:-len(".json")])
+
+	def clear(self):
+		self.definitions.clear()
+		self.missing.clear()
+
+
+CARD_DEFINITIONS = CardDefinitions()
+
+
+class CardValues(collections.abc.MutableMapping):
+	"""A card's static values overlaid with its dynamic values, see Card.value
+
+	Reads look in the card's dynamic values first, then its read-only definition, whose lists
+	are tuples. Writes and deletes only touch the dynamic values, which are created on the
+	first write, so a value from the definition is changed by assigning a new one.
+	"""
+
+	__slots__ = ("card",)
+
+	def __init__(self, card):
+		self.card = card
+
+	def __getitem__(self, key):
+		dynamic_values = self.card.dynamic_values
+		if dynamic_values is not None and key in dynamic_values:
+			return dynamic_values[key]
+		return self.card.definition[key]
+
+	def __setitem__(self, key, value):
+		if self.card.dynamic_values is None:
+			self.card.dynamic_values = {}
+		self.card.dynamic_values[key] = value
+
+	def __delitem__(self, key):
+		if self.card.dynamic_values is None:
+			raise KeyError(key)
+		del self.card.dynamic_values[key]
+
+	def __iter__(self):
+		dynamic_values = self.card.dynamic_values or {}
+		yield from dynamic_values
+		for key in self.card.definition:
+			if key not in dynamic_values:
+				yield key
+
+	def __len__(self):
+		return sum(1 for key in self)
+
+
+class Card:
+
+	__slots__ = ("card_id", "name", "type", "rarity", "upgrades", "has_target", "cost", "uuid", "misc", "price",
+				 "is_playable", "exhausts", "definition", "dynamic_values")
+
+	def __init__(self, card_id, name, card_type, rarity, upgrades=0, has_target=False, cost=0, uuid="", misc=0, price=0, is_playable=False, exhausts=False):
+		self.card_id = card_id
+		self.name = name
+		self.type = card_type
+		self.rarity = rarity
+		self.upgrades = upgrades
+		self.has_target = has_target
+		self.cost = cost
+		self.uuid = uuid
+		self.misc = misc
+		self.price = price
+		self.is_playable = is_playable
+		self.exhausts = exhausts
 		
+		# Static values are shared by every card of the same name, see CardDefinitions
+		self.definition = CARD_DEFINITIONS.get(self.name)
+		self.dynamic_values = None
+
+	@property
+	def value(self):
+		"""The card's static values, overlaid with any dynamic values set on this card
+
+		Writes only affect this card. Reading allocates nothing on the card; the overlay dict is
+		created on the first write.
+
+		:rtype: CardValues
+		"""
+		return CardValues(self)
 
 	@classmethod
 	def from_json(cls, json_object):
 		return cls(
-			card_id=json_object["id"],
-			name=json_object["name"],
+			card_id=sys.intern(json_object["id"]),
+			name=sys.intern(json_object["name"]),
 			card_type=CardType[json_object["type"]],
 			rarity=CardRarity[json_object["rarity"]],
 			upgrades=json_object["upgrades"],
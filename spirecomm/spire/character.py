@@ -1,5 +1,8 @@
 from enum import Enum
+import os
+import sys
 import json
+import types
 
 from spirecomm.spire.power import Power
 
@@ -35,6 +38,8 @@ class PlayerClass(Enum):
 
 class Orb:
 
+	__slots__ = ("name", "orb_id", "evoke_amount", "passive_amount")
+
 	def __init__(self, name, orb_id, evoke_amount, passive_amount):
 		self.name = name
 		self.orb_id = orb_id
@@ -53,6 +58,8 @@ class Orb:
 
 class Character:
 
+	__slots__ = ("max_hp", "current_hp", "block", "powers")
+
 	def __init__(self, max_hp, current_hp=None, block=0):
 		self.max_hp = max_hp
 		self.current_hp = current_hp
@@ -64,6 +71,8 @@ class Character:
 
 class Player(Character):
 
+	__slots__ = ("energy", "orbs")
+
 	def __init__(self, max_hp, current_hp=None, block=0, energy=0):
 		super().__init__(max_hp, current_hp, block)
 		self.energy = energy
@@ -77,8 +86,95 @@ class Player(Character):
 		return player
 
 
+def freeze(json_value):
+	"""Recursively convert parsed JSON into read-only, interned structures
+
+	Dicts become mappingproxies, lists become tuples and strings are interned,
+	so identical names across definitions share one object.
+	"""
+	if isinstance(json_value, dict):
+		return types.MappingProxyType({freeze(key): freeze(value) for key, value in json_value.items()})
+	elif isinstance(json_value, list):
+		return tuple(freeze(value) for value in json_value)
+	elif isinstance(json_value, str):
+		return sys.intern(json_value)
+	return json_value
+
+
+class MonsterDefinition:
+	"""The immutable states/moves tables of one kind of monster"""
+
+	__slots__ = ("name", "states", "moves")
+
+	def __init__(self, name, states, moves):
+		self.name = name
+		self.states = states
+		self.moves = moves
+
+
+class MonsterDefinitions:
+	"""A process-wide store of the monster state machines in monsters/[name].json
+
+	Each file is read at most once and every Monster of that name references the same
+	frozen tables. Misses are kept in memory instead of being written to err.log.
+	"""
+
+	EMPTY = MonsterDefinition(None, types.MappingProxyType({}), types.MappingProxyType({}))
+
+	def __init__(self, directory="monsters"):
+		self.directory = directory
+		self.definitions = {}
+		self.missing = {}
+
+	def load(self, name):
+		try:
+			with open(os.path.join(self.directory, str(name) + ".json"), "r") as f:
+				json_dict = json.load(f)
+			return MonsterDefinition(name, freeze(json_dict["states"]), freeze(json_dict["moves"]))
+		except Exception as e:
+			self.missing[name] = str(e)
+			return self.EMPTY
+
+	def get(self, name):
+		"""Get the shared definition of a monster, loading it on first use
+
+		:param name: the name of the monster
+		:type name: str
+		:return: the monster's states and moves
+		:rtype: MonsterDefinition
+		"""
+		definition = self.definitions.get(name)
+		if definition is None:
+			definition = self.load(name)
+			self.definitions[name] = definition
+		return definition
+
+	def preload(self):
+		"""Load every definition in the monsters directory up front
+
+		:return: None
+		"""
+		try:
+			filenames = os.listdir(self.directory)
+		except OSError:
+			return
+		for filename in filenames:
+			if filename.endswith(".json"):
+				self.get(filename[:-len(".json")])
+
+	def clear(self):
+		self.definitions.clear()
+		self.missing.clear()
+
+
+MONSTER_DEFINITIONS = MonsterDefinitions()
+
+
 class Monster(Character):
 
+	__slots__ = ("name", "monster_id", "intent", "half_dead", "is_gone", "move_id", "move_base_damage",
+				 "move_adjusted_damage", "move_hits", "monster_index", "definition")
+
 	def __init__(self, name, monster_id, max_hp, current_hp, block, intent, half_dead, is_gone, move_id=-1, move_base_damage=0, move_adjusted_damage=0, move_hits=0):
 		super().__init__(max_hp, current_hp, block)
 		self.name = name
@@ -92,7 +188,11 @@ class Monster(Character):
 		self.move_hits = move_hits
 		self.monster_index = 0
 		
-		# Load from monsters/[name].json
+		# Shared with every monster of the same name, see MonsterDefinitions
+		self.definition = MONSTER_DEFINITIONS.get(self.name)
+
+	@property
+	def moves(self):
 		'''
 		Move format
 		name : effects (list)
@@ -102,7 +202,10 @@ class Monster(Character):
 		e.g. Damage, 10; Vulnerable, 2
 		
 		'''
-		self.moves = {}
+		return self.definition.moves
+
+	@property
+	def states(self):
 		'''
 		States format
 		state : { transition: [(new state, probability), ...], moveset: [(move, probability), ...]}
@@ -110,18 +213,7 @@ class Monster(Character):
 		states dict lists probability to transition to other states
 		TODO some enemies transition on trigger condition, like half health
 		'''
-		self.states = {}
-		
-		try:
-			with open(os.path.join("monsters", self.name + ".json"),"r") as f:
-				jsonDict = json.load(f)
-				self.states = jsonDict["states"]
-				self.moves = jsonDict["moves"]
-		except Exception as e:
-			with open('err.log', 'a+') as err_file:
-				err_file.write("Monster Error: " + str(self.name))
-				err_file.write(e)
-			#raise Exception(e)
+		return self.definition.states
 
 	@classmethod
 	def from_json(cls, json_object):
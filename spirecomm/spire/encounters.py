@@ -0,0 +1,182 @@
+from spirecomm.spire.character import MONSTER_DEFINITIONS, freeze
+
+# Monster behaviour and the fights of each act, for anything which needs to play fights out
+# without the game: the combat simulator and the AI's rollouts.
+#
+# MONSTERS has the same states/moves format as monsters/[name].json, which takes precedence when
+# it has states. Each monster starts in state "1", picks a move from its state's moveset, then
+# moves to a state from its transition list, both weighted by probability. A move hitting
+# several times has one Damage effect per hit. The numbers are the game's at ascension 0,
+# simplified to the effects the models know: Damage, Block, Strength, Ritual, Weak, Vulnerable
+# and Frail.
+MONSTERS = {
+	# Act 1
+	"Jaw Worm": {
+		"id": "JawWorm", "hp": (40, 44),
+		"states": {"1": {"transition": [["2", 1.0]], "moveset": [["Chomp", 1.0]]},
+				   "2": {"transition": [["2", 1.0]], "moveset": [["Chomp", 0.25], ["Thrash", 0.3], ["Bellow", 0.45]]}},
+		"moves": {"Chomp": [["Damage", 11]], "Thrash": [["Damage", 7], ["Block", 5]], "Bellow": [["Strength", 3], ["Block", 6]]},
+	},
+	"Cultist": {
+		"id": "Cultist", "hp": (48, 54),
+		"states": {"1": {"transition": [["2", 1.0]], "moveset": [["Incantation", 1.0]]},
+				   "2": {"transition": [["2", 1.0]], "moveset": [["Dark Strike", 1.0]]}},
+		"moves": {"Incantation": [["Ritual", 3]], "Dark Strike": [["Damage", 6]]},
+	},
+	"Louse": {
+		"id": "FuzzyLouseNormal", "hp": (10, 15),
+		"states": {"1": {"transition": [["1", 1.0]], "moveset": [["Bite", 0.75], ["Grow", 0.25]]}},
+		"moves": {"Bite": [["Damage", 6]], "Grow": [["Strength", 3]]},
+	},
+	"Blue Slaver": {
+		"id": "SlaverBlue", "hp": (46, 50),
+		"states": {"1": {"transition": [["1", 1.0]], "moveset": [["Stab", 0.6], ["Rake", 0.4]]}},
+		"moves": {"Stab": [["Damage", 12]], "Rake": [["Damage", 7], ["Weak", 1]]},
+	},
+	"Fungi Beast": {
+		"id": "FungiBeast", "hp": (22, 28),
+		"states": {"1": {"transition": [["1", 1.0]], "moveset": [["Bite", 0.6], ["Grow", 0.4]]}},
+		"moves": {"Bite": [["Damage", 6]], "Grow": [["Strength", 3]]},
+	},
+	"Slime Boss": {
+		"id": "SlimeBoss", "hp": (140, 140),
+		"states": {"1": {"transition": [["2", 1.0]], "moveset": [["Goop Spray", 1.0]]},
+				   "2": {"transition": [["3", 1.0]], "moveset": [["Preparing", 1.0]]},
+				   "3": {"transition": [["1", 1.0]], "moveset": [["Slam", 1.0]]}},
+		"moves": {"Goop Spray": [["Weak", 2]], "Preparing": [], "Slam": [["Damage", 35]]},
+	},
+	"The Guardian": {
+		"id": "TheGuardian", "hp": (240, 240),
+		"states": {"1": {"transition": [["2", 1.0]], "moveset": [["Charging Up", 1.0]]},
+				   "2": {"transition": [["3", 1.0]], "moveset": [["Fierce Bash", 1.0]]},
+				   "3": {"transition": [["4", 1.0]], "moveset": [["Vent Steam", 1.0]]},
+				   "4": {"transition": [["1", 1.0]], "moveset": [["Whirlwind", 1.0]]}},
+		"moves": {"Charging Up": [["Block", 9]], "Fierce Bash": [["Damage", 32]], "Vent Steam": [["Weak", 2], ["Vulnerable", 2]],
+				  "Whirlwind": [["Damage", 5], ["Damage", 5], ["Damage", 5], ["Damage", 5]]},
+	},
+	# Act 2
+	"Chosen": {
+		"id": "Chosen", "hp": (95, 99),
+		"states": {"1": {"transition": [["2", 1.0]], "moveset": [["Poke", 1.0]]},
+				   "2": {"transition": [["3", 1.0]], "moveset": [["Hex", 1.0]]},
+				   "3": {"transition": [["3", 1.0]], "moveset": [["Debilitate", 0.3], ["Drain", 0.3], ["Zap", 0.4]]}},
+		"moves": {"Poke": [["Damage", 5], ["Damage", 5]], "Hex": [["Weak", 1]], "Debilitate": [["Damage", 10], ["Vulnerable", 2]],
+				  "Drain": [["Weak", 3], ["Strength", 3]], "Zap": [["Damage", 18]]},
+	},
+	"Byrd": {
+		"id": "Byrd", "hp": (25, 31),
+		"states": {"1": {"transition": [["1", 1.0]], "moveset": [["Peck", 0.5], ["Swoop", 0.2], ["Caw", 0.3]]}},
+		"moves": {"Peck": [["Damage", 1]] * 5, "Swoop": [["Damage", 12]], "Caw": [["Strength", 1]]},
+	},
+	"Shelled Parasite": {
+		"id": "Shelled Parasite", "hp": (68, 72),
+		"states": {"1": {"transition": [["1", 1.0]], "moveset": [["Double Strike", 0.4], ["Suck", 0.4], ["Fell", 0.2]]}},
+		"moves": {"Double Strike": [["Damage", 6], ["Damage", 6]], "Suck": [["Damage", 10]], "Fell": [["Damage", 18], ["Frail", 2]]},
+	},
+	"Snake Plant": {
+		"id": "SnakePlant", "hp": (75, 79),
+		"states": {"1": {"transition": [["1", 1.0]], "moveset": [["Chomp", 0.65], ["Enfeebling Spores", 0.35]]}},
+		"moves": {"Chomp": [["Damage", 7]] * 3, "Enfeebling Spores": [["Weak", 2], ["Frail", 2]]},
+	},
+	"The Champ": {
+		"id": "Champ", "hp": (420, 420),
+		"states": {"1": {"transition": [["1", 1.0]],
+						 "moveset": [["Heavy Slash", 0.3], ["Defensive Stance", 0.15], ["Execute", 0.2], ["Face Slap", 0.2], ["Taunt", 0.15]]}},
+		"moves": {"Heavy Slash": [["Damage", 16]], "Defensive Stance": [["Block", 15], ["Strength", 2]], "Execute": [["Damage", 10], ["Damage", 10]],
+				  "Face Slap": [["Damage", 12], ["Frail", 2]], "Taunt": [["Weak", 2], ["Vulnerable", 2]]},
+	},
+	"Bronze Automaton": {
+		"id": "BronzeAutomaton", "hp": (300, 300),
+		"states": {"1": {"transition": [["2", 1.0]], "moveset": [["Boost", 1.0]]},
+				   "2": {"transition": [["3", 1.0]], "moveset": [["Flail", 1.0]]},
+				   "3": {"transition": [["4", 1.0]], "moveset": [["Boost", 1.0]]},
+				   "4": {"transition": [["5", 1.0]], "moveset": [["Hyper Beam", 1.0]]},
+				   "5": {"transition": [["2", 1.0]], "moveset": [["Stunned", 1.0]]}},
+		"moves": {"Boost": [["Strength", 3], ["Block", 9]], "Flail": [["Damage", 7], ["Damage", 7]], "Hyper Beam": [["Damage", 45]], "Stunned": []},
+	},
+	# Act 3
+	"Darkling": {
+		"id": "Darkling", "hp": (48, 56),
+		"states": {"1": {"transition": [["1", 1.0]], "moveset": [["Nip", 0.4], ["Chomp", 0.3], ["Harden", 0.3]]}},
+		"moves": {"Nip": [["Damage", 8]], "Chomp": [["Damage", 8], ["Damage", 8]], "Harden": [["Block", 12]]},
+	},
+	"Orb Walker": {
+		"id": "Orb Walker", "hp": (90, 96),
+		"states": {"1": {"transition": [["1", 1.0]], "moveset": [["Laser", 0.6], ["Claw", 0.4]]}},
+		"moves": {"Laser": [["Damage", 10], ["Strength", 3]], "Claw": [["Damage", 15], ["Strength", 3]]},
+	},
+	"Spire Growth": {
+		"id": "Serpent", "hp": (170, 170),
+		"states": {"1": {"transition": [["1", 1.0]], "moveset": [["Quick Tackle", 0.4], ["Smash", 0.3], ["Constrict", 0.3]]}},
+		"moves": {"Quick Tackle": [["Damage", 16]], "Smash": [["Damage", 22]], "Constrict": [["Frail", 2], ["Weak", 1]]},
+	},
+	"Time Eater": {
+		"id": "TimeEater", "hp": (456, 456),
+		"states": {"1": {"transition": [["1", 1.0]], "moveset": [["Reverberate", 0.45], ["Head Slam", 0.35], ["Ripple", 0.2]]}},
+		"moves": {"Reverberate": [["Damage", 7]] * 3, "Head Slam": [["Damage", 26], ["Weak", 1]],
+				  "Ripple": [["Block", 20], ["Vulnerable", 1], ["Weak", 1]]},
+	},
+	"Awakened One": {
+		"id": "AwakenedOne", "hp": (300, 300),
+		"states": {"1": {"transition": [["2", 1.0]], "moveset": [["Slash", 1.0]]},
+				   "2": {"transition": [["2", 1.0]], "moveset": [["Slash", 0.75], ["Soul Strike", 0.25]]}},
+		"moves": {"Slash": [["Damage", 20], ["Ritual", 1]], "Soul Strike": [["Damage", 6]] * 4},
+	},
+}
+
+# The fights of each act by act number: the hallway fights and the bosses. Act 4 has no hallway
+# of its own, so later acts use act 3's.
+NORMAL_ENCOUNTERS = {
+	1: [["Jaw Worm"], ["Cultist"], ["Louse", "Louse"], ["Blue Slaver"], ["Fungi Beast", "Fungi Beast"]],
+	2: [["Chosen"], ["Byrd", "Byrd", "Byrd"], ["Shelled Parasite"], ["Snake Plant"]],
+	3: [["Darkling", "Darkling", "Darkling"], ["Orb Walker"], ["Spire Growth"]],
+}
+BOSS_ENCOUNTERS = {
+	1: [["Slime Boss"], ["The Guardian"]],
+	2: [["The Champ"], ["Bronze Automaton"]],
+	3: [["Time Eater"], ["Awakened One"]],
+}
+
+
+def act_encounters(act, act_boss=None):
+	"""The fights to expect in an act: its hallway fights, then its boss
+
+	:param act: the act, from 1
+	:type act: int
+	:param act_boss: the name of the act's boss if known, as in Game.act_boss. Only bosses in
+					 MONSTERS are used, else all of the act's bosses are.
+	:type act_boss: str
+	:return: lists of monster names, each of which is in MONSTERS
+	:rtype: list
+	"""
+	act = min(max(act or 1, 1), max(NORMAL_ENCOUNTERS))
+	if act_boss in MONSTERS:
+		bosses = [[act_boss]]
+	else:
+		bosses = BOSS_ENCOUNTERS[act]
+	return NORMAL_ENCOUNTERS[act] + bosses
+
+
+def weighted_choice(rng, options):
+	"""Pick from a list of [value, probability] pairs"""
+	roll = rng.random() * sum(probability for value, probability in options)
+	for value, probability in options:
+		roll -= probability
+		if roll < 0:
+			return value
+	return options[-1][0]
+
+
+def monster_tables(name):
+	"""The states and moves of a monster, from monsters/[name].json if it has them, else MONSTERS"""
+	definition = MONSTER_DEFINITIONS.get(name)
+	if len(definition.states) > 0:
+		return definition.states, definition.moves
+	tables = MONSTER_TABLES.get(name)
+	if tables is None:
+		tables = (freeze(MONSTERS[name]["states"]), freeze(MONSTERS[name]["moves"]))
+		MONSTER_TABLES[name] = tables
+	return tables
+
+
+MONSTER_TABLES = {}
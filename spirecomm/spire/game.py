@@ -15,8 +15,33 @@ class RoomPhase(Enum):
 	INCOMPLETE = 4
 
 
+class LazyCards:
+	"""A list of Cards on a Game, only built from the message when it is first accessed
+
+	After the first access the list is stored on the instance, which shadows this descriptor,
+	so later reads cost nothing extra. Assigning to the attribute works as for any other list.
+	"""
+
+	def __init__(self, name):
+		self.name = name
+
+	def __get__(self, game, owner=None):
+		if game is None:
+			return self
+		json_cards = game.unparsed_cards.pop(self.name, None)
+		cards = [] if json_cards is None else game.cards_from_json(json_cards)
+		game.__dict__[self.name] = cards
+		return cards
+
+
 class Game:
 
+	deck = LazyCards("deck")
+	draw_pile = LazyCards("draw_pile")
+	discard_pile = LazyCards("discard_pile")
+	exhaust_pile = LazyCards("exhaust_pile")
+	hand = LazyCards("hand")
+
 	def __init__(self):
 
 		# General state
@@ -32,7 +57,6 @@ class Game:
 		self.character = None
 		self.ascension_level = None
 		self.relics = []
-		self.deck = []
 		self.potions = []
 		self.map = []
 
@@ -41,10 +65,8 @@ class Game:
 		self.in_combat = False
 		self.player = None
 		self.monsters = []
-		self.draw_pile = []
-		self.discard_pile = []
-		self.exhaust_pile = []
-		self.hand = []
+		self.turn = 0
+		# deck, draw_pile, discard_pile, exhaust_pile and hand are LazyCards
 
 		# Current Screen
 
@@ -67,6 +89,13 @@ class Game:
 		# Added state info
 		self.visited_shop = False
 		self.previous_floor = 0 # used to recognize floor changes, i.e. when floor != previous_floor
+
+		# Raw message this state was built from, used to reuse unchanged objects on the next update.
+		# It and the card maps are dropped once the next state has been built from this one.
+		self.json_state = None
+		self.unparsed_cards = {} # JSON of the LazyCards lists which haven't been accessed yet
+		self.cards_by_uuid = {}
+		self.previous_cards_by_uuid = {}
 		
 	# for some reason, pausing the game invalidates the state
 	def is_valid(self):
@@ -97,9 +126,53 @@ class Game:
 		return string
 
 
+	@staticmethod
+	def reuse_subtree(previous, key, json_value):
+		"""Check whether the part of the message under key is unchanged since the previous state
+
+		:param previous: the previous game state, or None
+		:type previous: Game
+		:param key: the key of the subtree in the game_state message
+		:type key: str
+		:return: True if the objects built from the previous message can be reused
+		:rtype: bool
+		"""
+		return previous is not None and previous.json_state is not None and previous.json_state.get(key) == json_value
+
+	def card_from_json(self, json_card):
+		"""Build a Card, reusing the previous state's Card with the same uuid if its JSON is unchanged"""
+		uuid = json_card.get("uuid")
+		cached = self.cards_by_uuid.get(uuid)
+		if cached is None:
+			cached = self.previous_cards_by_uuid.get(uuid)
+		if cached is not None and cached[0] == json_card:
+			card = cached[1]
+		else:
+			card = spirecomm.spire.card.Card.from_json(json_card)
+		self.cards_by_uuid[uuid] = (json_card, card)
+		return card
+
+	def cards_from_json(self, json_cards):
+		return [self.card_from_json(json_card) for json_card in json_cards]
+
 	@classmethod
-	def from_json(cls, json_state, available_commands):
+	def from_json(cls, json_state, available_commands, previous=None):
+		"""Build a game state from a CommunicationMod message
+
+		:param json_state: the game_state part of the message
+		:type json_state: dict
+		:param available_commands: the available_commands part of the message
+		:type available_commands: list
+		:param previous: the state built from the previous message. Relics, potions and cards whose
+						 JSON has not changed are reused from it by identity instead of rebuilt.
+						 The map is reused for the whole act regardless, see Map.from_json_cached.
+						 The deck and card piles are only built when first accessed, see LazyCards.
+		:type previous: Game
+		:return: the new game state
+		:rtype: Game
+		"""
 		game = cls()
+		game.json_state = json_state
 		game.current_action = json_state.get("current_action", None)
 		game.current_hp = json_state.get("current_hp")
 		game.max_hp = json_state.get("max_hp")
@@ -109,10 +182,29 @@ class Game:
 		game.seed = json_state.get("seed")
 		game.character = spirecomm.spire.character.PlayerClass[json_state.get("class")]
 		game.ascension_level = json_state.get("ascension_level")
-		game.relics = [spirecomm.spire.relic.Relic.from_json(json_relic) for json_relic in json_state.get("relics")]
-		game.deck = [spirecomm.spire.card.Card.from_json(json_card) for json_card in json_state.get("deck")]
-		game.map = spirecomm.spire.map.Map.from_json(json_state.get("map"))
-		game.potions = [spirecomm.spire.potion.Potion.from_json(potion) for potion in json_state.get("potions")]
+		json_relics = json_state.get("relics")
+		if game.reuse_subtree(previous, "relics", json_relics):
+			game.relics = previous.relics
+		else:
+			game.relics = [spirecomm.spire.relic.Relic.from_json(json_relic) for json_relic in json_relics]
+		if previous is not None:
+			# Only the cards are kept, so a chain of states never keeps older states alive.
+			# If none of the previous state's cards were accessed, its own previous cards still apply.
+			game.previous_cards_by_uuid = previous.cards_by_uuid or previous.previous_cards_by_uuid
+		game.unparsed_cards["deck"] = json_state.get("deck")
+		json_map = json_state.get("map")
+		if json_map is not None:
+			game.map = spirecomm.spire.map.Map.from_json_cached(json_map, game.seed, game.act)
+		elif previous is not None and previous.act == game.act:
+			# The map was left out of the message, but it can't have changed within the act
+			game.map = previous.map
+		else:
+			game.map = spirecomm.spire.map.Map()
+		json_potions = json_state.get("potions")
+		if game.reuse_subtree(previous, "potions", json_potions):
+			game.potions = previous.potions
+		else:
+			game.potions = [spirecomm.spire.potion.Potion.from_json(potion) for potion in json_potions]
 		game.act_boss = json_state.get("act_boss", None)
 
 		# Screen State
@@ -132,13 +224,14 @@ class Game:
 		if game.in_combat:
 			combat_state = json_state.get("combat_state")
 			game.player = spirecomm.spire.character.Player.from_json(combat_state.get("player"))
+			game.turn = combat_state.get("turn", 0)
 			game.monsters = [spirecomm.spire.character.Monster.from_json(json_monster) for json_monster in combat_state.get("monsters")]
 			for i, monster in enumerate(game.monsters):
 				monster.monster_index = i
-			game.draw_pile = [spirecomm.spire.card.Card.from_json(json_card) for json_card in combat_state.get("draw_pile")]
-			game.discard_pile = [spirecomm.spire.card.Card.from_json(json_card) for json_card in combat_state.get("discard_pile")]
-			game.exhaust_pile = [spirecomm.spire.card.Card.from_json(json_card) for json_card in combat_state.get("exhaust_pile")]
-			game.hand = [spirecomm.spire.card.Card.from_json(json_card) for json_card in combat_state.get("hand")]
+			game.unparsed_cards["draw_pile"] = combat_state.get("draw_pile")
+			game.unparsed_cards["discard_pile"] = combat_state.get("discard_pile")
+			game.unparsed_cards["exhaust_pile"] = combat_state.get("exhaust_pile", [])
+			game.unparsed_cards["hand"] = combat_state.get("hand")
 
 		# Available Commands
 
@@ -150,12 +243,28 @@ class Game:
 								or "return" in available_commands or "skip" in available_commands
 
 		# Added state info
+		if previous is not None:
+			game.visited_shop = previous.visited_shop
+			game.previous_floor = previous.previous_floor
 		if game.floor != game.previous_floor:
 			game.on_floor_change()
 			game.previous_floor = game.floor
-		
+
+		if previous is not None:
+			previous.release_json()
+
 		return game
 
+	def release_json(self):
+		"""Drop what was only kept to build the next state from this one
+
+		Called once the next state has been built, so states kept in a history only hold their
+		parsed objects, and the JSON of card piles which were never accessed.
+		"""
+		self.json_state = None
+		self.cards_by_uuid = {}
+		self.previous_cards_by_uuid = {}
+
 	def are_potions_full(self):
 		for potion in self.potions:
 			if potion.potion_id == "Potion Slot":
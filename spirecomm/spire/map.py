@@ -1,3 +1,6 @@
+import collections
+
+
 class Node:
 
 	def __init__(self, x, y, symbol):
@@ -19,8 +22,13 @@ class Node:
 
 class Map:
 
+	# Parsed maps by (seed, act, number of nodes), see from_json_cached
+	CACHE_SIZE = 8
+	cache = collections.OrderedDict()
+
 	def __init__(self):
 		self.nodes = {}
+		self.routes = {} # results of route planning on this map, keyed by whatever the planner needs
 
 	def add_node(self, node):
 		if node.y in self.nodes:
@@ -50,3 +58,32 @@ class Map:
 					parent_node.children.append(child_node)
 
 		return dungeon_map
+
+	@classmethod
+	def from_json_cached(cls, node_list, seed, act):
+		"""Like from_json, but reuse the Map already parsed for this seed and act
+
+		The map of an act never changes while the act is played, so the same Map instance
+		is returned for every message of the act.
+
+		:param node_list: the map part of the game state message
+		:type node_list: list
+		:param seed: the seed of the run
+		:type seed: int
+		:param act: the current act
+		:type act: int
+		:return: the parsed map
+		:rtype: Map
+		"""
+		if seed is None:
+			return cls.from_json(node_list)
+		key = (seed, act, len(node_list))
+		dungeon_map = cls.cache.get(key)
+		if dungeon_map is None:
+			dungeon_map = cls.from_json(node_list)
+			cls.cache[key] = dungeon_map
+			if len(cls.cache) > cls.CACHE_SIZE:
+				cls.cache.popitem(last=False)
+		else:
+			cls.cache.move_to_end(key)
+		return dungeon_map
@@ -1,5 +1,7 @@
 class Potion:
 
+    __slots__ = ("potion_id", "name", "can_use", "can_discard", "requires_target", "price")
+
     def __init__(self, potion_id, name, can_use, can_discard, requires_target, price=0):
         self.potion_id = potion_id
         self.name = name
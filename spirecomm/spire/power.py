@@ -1,5 +1,7 @@
 class Power:
 
+    __slots__ = ("power_id", "power_name", "amount")
+
     def __init__(self, power_id, name, amount):
         self.power_id = power_id
         self.power_name = name
@@ -1,5 +1,7 @@
 class Relic:
 
+    __slots__ = ("relic_id", "name", "counter", "price")
+
     def __init__(self, relic_id, name, counter=0, price=0):
         self.relic_id = relic_id
         self.name = name
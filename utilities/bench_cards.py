@@ -0,0 +1,54 @@
+import argparse
+import json
+import timeit
+
+from spirecomm.spire.card import Card, CARD_DEFINITIONS
+from utilities.sample_states import late_game_state
+
+# Microbenchmark for building every Card in a late-game combat state.
+# "uncached" drops the card definition cache before every card, which costs the same file read
+# per card as loading cards/[name].json in Card.__init__ did. "cached" uses the shared cache.
+# Run from the repository root: python -m utilities.bench_cards
+
+
+def card_lists(state):
+	game_state = state["game_state"]
+	combat_state = game_state["combat_state"]
+	return [game_state["deck"], combat_state["draw_pile"], combat_state["discard_pile"],
+			combat_state["exhaust_pile"], combat_state["hand"]]
+
+
+def parse_cards(lists):
+	return [[Card.from_json(json_card) for json_card in json_cards] for json_cards in lists]
+
+
+def parse_cards_uncached(lists):
+	cards = []
+	for json_cards in lists:
+		pile = []
+		for json_card in json_cards:
+			CARD_DEFINITIONS.clear()
+			pile.append(Card.from_json(json_card))
+		cards.append(pile)
+	return cards
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Time parsing the cards of a late-game state")
+	parser.add_argument("--deck-size", type=int, default=40)
+	parser.add_argument("--number", type=int, default=2000)
+	args = parser.parse_args()
+
+	# Round trip through the encoder so every parse starts from freshly decoded objects
+	lists = json.loads(json.dumps(card_lists(late_game_state(args.deck_size))))
+	num_cards = sum(len(json_cards) for json_cards in lists)
+	print("{} cards per state, {} parses".format(num_cards, args.number))
+	for label, function in [("uncached", parse_cards_uncached), ("cached", parse_cards)]:
+		parse_cards(lists)
+		seconds = timeit.timeit(lambda: function(lists), number=args.number)
+		print("{}: {:.1f} us per state".format(label, seconds / args.number * 1e6))
+	print("missing card definitions: {}".format(len(CARD_DEFINITIONS.missing)))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,58 @@
+import argparse
+import json
+import random
+import timeit
+
+from spirecomm.ai.combat_state import CombatState
+from spirecomm.ai.rollout import choose_play, run_rollouts
+from spirecomm.communication.simulator import CombatSimulator
+from spirecomm.spire.game import Game
+
+# Times the operations a search makes on a CombatState, decoding a Game for comparison, and
+# how many rollouts a second one process plays from the simulator's first fight.
+# Run from the repository root: python -m utilities.bench_combat_state [--seed 3]
+
+
+def first_fight(seed):
+	simulator = CombatSimulator(seed=seed)
+	simulator.handle("ready")
+	return json.loads(simulator.handle("start IRONCLAD 0"))
+
+
+def microseconds(statement, number):
+	return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Time CombatState operations and rollouts")
+	parser.add_argument("--seed", type=int, default=3)
+	parser.add_argument("--rollouts", type=int, default=2000)
+	args = parser.parse_args()
+
+	message = first_fight(args.seed)
+	game = Game.from_json(message["game_state"], message["available_commands"])
+	state = CombatState.from_game(game)
+	rng = random.Random(args.seed)
+	play = choose_play(state)
+
+	def play_card():
+		child = state.clone()
+		child.apply_play(play[0], play[1], rng)
+
+	def end_turn():
+		child = state.clone()
+		child.end_turn(rng)
+
+	print("{} vs {}, hand {}".format(game.character.name, [monster.name for monster in game.monsters],
+									 [card.card_id for card in game.hand]))
+	print("Game.from_json           {:8.2f} us".format(microseconds(lambda: Game.from_json(message["game_state"], message["available_commands"]), 2000)))
+	print("CombatState.from_game    {:8.2f} us".format(microseconds(lambda: CombatState.from_game(game), 2000)))
+	print("clone                    {:8.2f} us".format(microseconds(state.clone, 20000)))
+	print("clone + apply_play       {:8.2f} us".format(microseconds(play_card, 20000)))
+	print("clone + end_turn         {:8.2f} us".format(microseconds(end_turn, 20000)))
+	seconds = min(timeit.repeat(lambda: run_rollouts([state], args.rollouts, args.seed), number=1, repeat=3))
+	print("{} rollouts in {:.3f} s: {:.0f} rollouts/s".format(args.rollouts, seconds, args.rollouts / seconds))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,59 @@
+import argparse
+import time
+
+from spirecomm.communication.decoder import Decoder, available_backends
+from spirecomm.spire.game import Game
+from utilities.sample_states import late_game_message
+
+# Benchmark for decoding CommunicationMod messages with each installed JSON backend.
+# Reports the decode time per message, and the time to also build the Game from it,
+# with and without skipping the map and exhaust pile.
+# Run from the repository root: python -m utilities.bench_decode [--messages recorded.jsonl]
+
+
+def load_messages(path, count):
+	if path is None:
+		return [late_game_message(seed=seed) for seed in range(count)]
+	with open(path, "r", encoding="utf-8") as f:
+		return [line.rstrip("\r\n") for line in f if line.strip()]
+
+
+def time_per_message(function, messages, repeat):
+	start = time.perf_counter()
+	for _ in range(repeat):
+		for message in messages:
+			function(message)
+	return (time.perf_counter() - start) / (repeat * len(messages))
+
+
+def decode_and_build(decoder):
+	def function(message):
+		communication_state = decoder.loads(message)
+		game_state = communication_state.get("game_state")
+		if game_state is not None:
+			Game.from_json(game_state, communication_state.get("available_commands"))
+	return function
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Time decoding CommunicationMod messages")
+	parser.add_argument("--messages", help="a file of recorded messages, one per line")
+	parser.add_argument("--count", type=int, default=100, help="number of synthetic messages if none are given")
+	parser.add_argument("--repeat", type=int, default=5)
+	args = parser.parse_args()
+
+	messages = load_messages(args.messages, args.count)
+	average_size = sum(len(message) for message in messages) / len(messages)
+	print("{} messages, {:.1f} KB on average".format(len(messages), average_size / 1000))
+	for backend in available_backends():
+		for skip in [(), ("map", "exhaust_pile")]:
+			decoder = Decoder(backend, skip=skip)
+			label = backend + (" skipping " + ", ".join(skip) if skip else "")
+			decode_seconds = time_per_message(decoder.loads, messages, args.repeat)
+			build_seconds = time_per_message(decode_and_build(decoder), messages, args.repeat)
+			print("{}: decode {:.1f} us, decode + Game.from_json {:.1f} us per message".format(
+				label, decode_seconds * 1e6, build_seconds * 1e6))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,75 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from spirecomm.ai.agent import SimpleAgent
+from spirecomm.communication.log_writer import LogWriter
+from spirecomm.spire.game import Game
+from utilities.sample_states import late_game_message
+
+# Throughput benchmark for agent logging: replays a game through SimpleAgent at full trace
+# logging, once with a plain file flushed on every line as before, and once with a LogWriter.
+# Reports decisions per second and how long the LogWriter then takes to finish writing.
+# Run from the repository root: python -m utilities.bench_logging [--messages recorded.jsonl]
+
+
+def load_games(path, count):
+	if path is None:
+		messages = [late_game_message(seed=seed) for seed in range(count)]
+	else:
+		with open(path, "r", encoding="utf-8") as f:
+			messages = [line for line in f if line.strip()]
+	games = []
+	for message in messages:
+		communication_state = json.loads(message)
+		if communication_state.get("in_game") and "game_state" in communication_state:
+			games.append(Game.from_json(communication_state["game_state"], communication_state.get("available_commands")))
+	return games
+
+
+def replay(logfile, games, repeat):
+	agent = SimpleAgent(logfile, headless=True)
+	# Tick with py_trees so every leaf logs its trace line too
+	agent.use_compiled_tree = False
+	start = time.perf_counter()
+	for _ in range(repeat):
+		for game in games:
+			agent.get_next_action_in_game(game)
+	return time.perf_counter() - start
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Compare flushing log lines with the background LogWriter")
+	parser.add_argument("--messages", help="a file of recorded messages, one per line")
+	parser.add_argument("--count", type=int, default=100, help="number of synthetic states if no messages are given")
+	parser.add_argument("--repeat", type=int, default=5)
+	args = parser.parse_args()
+
+	games = load_games(args.messages, args.count)
+	decisions = len(games) * args.repeat
+	directory = tempfile.mkdtemp()
+	try:
+		path = os.path.join(directory, "flushed.log")
+		with open(path, "w") as logfile:
+			seconds = replay(logfile, games, args.repeat)
+		print("flush=True: {} decisions in {:.3f} s, {:.0f} decisions/s, {:.1f} MB logged".format(
+			decisions, seconds, decisions / seconds, os.path.getsize(path) / 1e6))
+
+		path = os.path.join(directory, "writer.log")
+		logfile = LogWriter(path)
+		seconds = replay(logfile, games, args.repeat)
+		start = time.perf_counter()
+		logfile.close()
+		drain = time.perf_counter() - start
+		print("LogWriter: {} decisions in {:.3f} s, {:.0f} decisions/s, {:.1f} MB logged, {:.3f} s to drain".format(
+			decisions, seconds, decisions / seconds, os.path.getsize(path) / 1e6, drain))
+	finally:
+		for name in os.listdir(directory):
+			os.remove(os.path.join(directory, name))
+		os.rmdir(directory)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,101 @@
+import argparse
+import random
+import timeit
+
+from spirecomm.ai.map_analysis import MapAnalysis, RouteRisk
+from spirecomm.ai.priorities import Priority
+from spirecomm.spire.map import Map
+from utilities.sample_states import make_map
+
+# Times analysing an act's map and the lookups made at each map screen, against the dict
+# based route DP the agent used to run for its single route, and valuing the map's nodes
+# over HP and gold with RouteRisk.
+# Run from the repository root: python -m utilities.bench_map [--maps 50]
+
+
+def dict_route(dungeon_map, node_rewards):
+	"""The best route's x coordinates by row, as generate_map_route used to find them"""
+	best_rewards = {0: {node.x: node_rewards[node.symbol] for node in dungeon_map.nodes[0].values()}}
+	best_parents = {0: {node.x: 0 for node in dungeon_map.nodes[0].values()}}
+	min_reward = min(node_rewards.values())
+	map_height = max(dungeon_map.nodes.keys())
+	for y in range(0, map_height):
+		best_rewards[y+1] = {node.x: min_reward * 20 for node in dungeon_map.nodes[y+1].values()}
+		best_parents[y+1] = {node.x: -1 for node in dungeon_map.nodes[y+1].values()}
+		for x in best_rewards[y]:
+			node = dungeon_map.get_node(x, y)
+			for child in node.children:
+				test_child_reward = best_rewards[y][x] + node_rewards[child.symbol]
+				if test_child_reward > best_rewards[y+1][child.x]:
+					best_rewards[y+1][child.x] = test_child_reward
+					best_parents[y+1][child.x] = node.x
+	best_path = [0] * (map_height + 1)
+	best_path[map_height] = max(best_rewards[map_height].keys(), key=lambda x: best_rewards[map_height][x])
+	for y in range(map_height, 0, -1):
+		best_path[y - 1] = best_parents[y][best_path[y]]
+	return best_path, best_rewards[map_height][best_path[map_height]]
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Time map analysis")
+	parser.add_argument("--maps", type=int, default=50)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("-k", type=int, default=5)
+	args = parser.parse_args()
+
+	rng = random.Random(args.seed)
+	maps = [Map.from_json(make_map(rng)) for _ in range(args.maps)]
+	node_rewards = Priority.MAP_NODE_PRIORITIES_1
+	analyses = [MapAnalysis(dungeon_map, node_rewards, args.k) for dungeon_map in maps]
+	for dungeon_map, analysis in zip(maps, analyses):
+		if dict_route(dungeon_map, node_rewards)[1] != analysis.best_score():
+			print("Different best route score on a map")
+
+	def analyse():
+		for dungeon_map in maps:
+			MapAnalysis(dungeon_map, node_rewards, args.k)
+
+	def old_routes():
+		for dungeon_map in maps:
+			dict_route(dungeon_map, node_rewards)
+
+	# One screen per row of the map, each choosing between the nodes of the next row
+	screens = [(analysis, list(dungeon_map.nodes[y].values())) for dungeon_map, analysis in zip(maps, analyses) for y in dungeon_map.nodes]
+
+	def choose():
+		for analysis, choices in screens:
+			max(choices, key=analysis.best_score)
+
+	def value_routes():
+		for analysis in analyses:
+			route_risk = RouteRisk(analysis)
+			for number in analysis.start_nodes:
+				route_risk.node_values(number)
+
+	route_risks = [RouteRisk(analysis) for analysis in analyses]
+	risk_screens = [(route_risk, choices) for route_risk in route_risks for analysis, choices in screens if analysis is route_risk.analysis]
+
+	def choose_by_risk():
+		for route_risk, choices in risk_screens:
+			route_risk.choose(choices, 40, 80, 99)
+
+	def statistics():
+		for analysis, choices in screens:
+			for node in choices:
+				analysis.path_count(node)
+				analysis.symbol_range(node, "E")
+				analysis.top_routes(node)
+
+	print("{} maps, {} routes on average, k = {}".format(args.maps, sum(analysis.path_count() for analysis in analyses) // args.maps, args.k))
+	print("MapAnalysis per act      {:8.1f} us".format(min(timeit.repeat(analyse, number=5, repeat=3)) / 5 / args.maps * 1e6))
+	print("dict DP per act          {:8.1f} us".format(min(timeit.repeat(old_routes, number=5, repeat=3)) / 5 / args.maps * 1e6))
+	print("choice per map screen    {:8.2f} us".format(min(timeit.repeat(choose, number=20, repeat=3)) / 20 / len(screens) * 1e6))
+	print("RouteRisk per act        {:8.1f} us".format(min(timeit.repeat(value_routes, number=1, repeat=3)) / args.maps * 1e6))
+	choose_by_risk()
+	print("risk choice per screen   {:8.2f} us".format(min(timeit.repeat(choose_by_risk, number=20, repeat=3)) / 20 / len(risk_screens) * 1e6))
+	print("node statistics lookup   {:8.2f} us".format(
+		min(timeit.repeat(statistics, number=20, repeat=3)) / 20 / sum(len(choices) for analysis, choices in screens) * 1e6))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,50 @@
+import argparse
+import json
+import tracemalloc
+
+from spirecomm.spire.game import Game
+from utilities.sample_states import late_game_state
+
+# Memory benchmark: bytes retained per parsed late-game state, as when keeping a history
+# of Game objects for replay analysis. Every state is fully materialized, including the lazy
+# card piles, and each is built from the previous one exactly as Coordinator builds them, so
+# everything a state keeps alive is counted, along with whatever it shares with the previous one.
+# Run from the repository root: python -m utilities.bench_memory
+
+
+def materialize(game):
+	for cards in [game.deck, game.draw_pile, game.discard_pile, game.exhaust_pile, game.hand]:
+		len(cards)
+	return game
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Measure memory per parsed game state")
+	parser.add_argument("--deck-size", type=int, default=40)
+	parser.add_argument("--count", type=int, default=200)
+	args = parser.parse_args()
+
+	messages = [json.dumps(late_game_state(args.deck_size, seed=seed)) for seed in range(args.count)]
+	# Warm the definition caches so they aren't counted against the first state
+	materialize(Game.from_json(json.loads(messages[0])["game_state"], []))
+
+	tracemalloc.start()
+	before = tracemalloc.take_snapshot()
+	history = []
+	for message in messages:
+		communication_state = json.loads(message)
+		previous = history[-1] if history else None
+		game = Game.from_json(communication_state["game_state"], communication_state["available_commands"], previous)
+		communication_state = None
+		history.append(materialize(game))
+	after = tracemalloc.take_snapshot()
+	tracemalloc.stop()
+
+	total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+	print("{} states, {:.1f} KB per state".format(len(history), total / len(history) / 1000))
+	for stat in after.compare_to(before, "lineno")[:8]:
+		print("  {}".format(stat))
+
+
+if __name__ == "__main__":
+	main()
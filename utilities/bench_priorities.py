@@ -0,0 +1,83 @@
+import argparse
+import io
+import math
+import random
+import timeit
+
+from spirecomm.ai.agent import SimpleAgent
+from spirecomm.ai.priorities import SilentPriority, IroncladPriority, DefectPowerPriority
+from spirecomm.spire.card import Card, CardType, CardRarity
+from spirecomm.spire.character import PlayerClass
+from spirecomm.spire.game import Game
+from utilities.sample_states import late_game_state
+
+# Microbenchmark for SimpleAgent.get_play_card_action over random hands, plus the Priority
+# ranking it relies on, compared against the per-call lambda the ranking used before.
+# Run from the repository root: python -m utilities.bench_priorities
+
+CLASSES = [
+	(PlayerClass.IRONCLAD, IroncladPriority),
+	(PlayerClass.THE_SILENT, SilentPriority),
+	(PlayerClass.DEFECT, DefectPowerPriority),
+]
+
+
+def random_hand(rng, priority, size):
+	card_ids = priority.PLAY_PRIORITY_LIST + ["Unlisted Card"]
+	hand = []
+	for i in range(size):
+		card_type = rng.choice([CardType.ATTACK, CardType.SKILL, CardType.POWER])
+		card = Card(rng.choice(card_ids), "Card", card_type, CardRarity.COMMON, upgrades=rng.randint(0, 1),
+					has_target=card_type == CardType.ATTACK, cost=rng.randint(0, 2), uuid=str(i), is_playable=True)
+		hand.append(card)
+	return hand
+
+
+def legacy_best_card_to_play(priority, card_list):
+	return min(card_list, key=lambda x: priority.PLAY_PRIORITIES.get(x.card_id, math.inf) - 0.5 * x.upgrades)
+
+
+def legacy_sorted_cards(priority, card_list):
+	return sorted(card_list, key=lambda x: priority.CARD_PRIORITIES.get(x.card_id, math.inf) - 0.5 * x.upgrades)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Time card play decisions over random hands")
+	parser.add_argument("--hands", type=int, default=1000)
+	parser.add_argument("--hand-size", type=int, default=7)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	rng = random.Random(args.seed)
+	agent = SimpleAgent(io.StringIO(), headless=True)
+	agent.debug_level = -1
+	state = late_game_state()
+	for player_class, priority_class in CLASSES:
+		agent.change_class(player_class)
+		priority = agent.priorities
+		hands = [random_hand(rng, priority_class, args.hand_size) for _ in range(args.hands)]
+
+		for hand in hands:
+			assert priority.get_best_card_to_play(hand) is legacy_best_card_to_play(priority, hand)
+			assert priority.get_sorted_cards(hand) == legacy_sorted_cards(priority, hand)
+
+		games = []
+		for hand in hands:
+			game = Game.from_json(state["game_state"], state["available_commands"])
+			game.hand = hand
+			games.append(game)
+
+		def decide_all():
+			for game in games:
+				agent.blackboard.game = game
+				agent.get_play_card_action()
+
+		seconds = timeit.timeit(decide_all, number=1)
+		indexed = timeit.timeit(lambda: [priority.get_best_card_to_play(hand) for hand in hands], number=1)
+		legacy = timeit.timeit(lambda: [legacy_best_card_to_play(priority, hand) for hand in hands], number=1)
+		print("{}: get_play_card_action {:.1f} us per hand, get_best_card_to_play {:.2f} us (was {:.2f} us)".format(
+			player_class.name, seconds / args.hands * 1e6, indexed / args.hands * 1e6, legacy / args.hands * 1e6))
+
+
+if __name__ == "__main__":
+	main()
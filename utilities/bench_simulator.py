@@ -0,0 +1,72 @@
+import argparse
+import io
+import itertools
+import json
+import time
+
+from spirecomm.ai.agent import SimpleAgent
+from spirecomm.ai.rollout import RolloutEngine
+from spirecomm.communication.simulator import CombatSimulator, SimulatorCoordinator
+from spirecomm.spire.character import PlayerClass
+
+# End-to-end benchmark of the decision loop: SimpleAgent plays games against the combat
+# simulator through a SimulatorCoordinator, so every step goes through message decoding,
+# Game.from_json, the behaviour tree and the actions, but no game or pipes.
+# Run from the repository root: python -m utilities.bench_simulator [--games 30]
+
+
+def check_commands_before_start(seed):
+	"""Print any in-game command which the simulator does not answer with an error before a game starts"""
+	simulator = CombatSimulator(seed=seed)
+	for command in ("play 1", "play 1 0", "end", "potion use 0", "choose 0", "proceed", "cancel"):
+		if "error" not in json.loads(simulator.handle(command)):
+			print("No error for {} before start".format(command))
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Time SimpleAgent playing against the combat simulator")
+	parser.add_argument("--games", type=int, default=30)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--floors", type=int, default=5)
+	parser.add_argument("--py-trees", action="store_true", help="tick the behaviour tree with py_trees instead of compiling it")
+	parser.add_argument("--greedy", action="store_true", help="pick cards one at a time with the greedy rules instead of planning the turn")
+	parser.add_argument("--rollouts", type=int, metavar="WORKERS", help="choose potions and card rewards by rollouts, in this many worker processes (0 for none)")
+	parser.add_argument("--profile", metavar="DIR", help="sample the agent's stack and write each game's stacks to DIR")
+	parser.add_argument("--latency", action="store_true", help="also print how long each step of handling a message took")
+	args = parser.parse_args()
+
+	check_commands_before_start(args.seed)
+	agent = SimpleAgent(io.StringIO(), headless=True)
+	agent.debug_level = -1
+	agent.use_compiled_tree = not args.py_trees
+	agent.use_planner = not args.greedy
+	if args.rollouts is not None:
+		agent.rollouts = RolloutEngine(workers=args.rollouts, seed=args.seed)
+	coordinator = SimulatorCoordinator(CombatSimulator(seed=args.seed, floors=args.floors), logfile=io.StringIO())
+	if args.latency:
+		agent.latency = coordinator.latency
+	if args.profile:
+		coordinator.start_profiler(interval=0.001, directory=args.profile)
+	coordinator.signal_ready()
+	coordinator.register_command_error_callback(agent.handle_error)
+	coordinator.register_state_change_callback(agent.get_next_action_in_game)
+	coordinator.register_out_of_game_callback(agent.get_next_action_out_of_game)
+
+	actions = 0
+	victories = 0
+	start = time.perf_counter()
+	for chosen_class in itertools.islice(itertools.cycle(PlayerClass), args.games):
+		agent.change_class(chosen_class)
+		victories += coordinator.play_one_game(chosen_class)
+		actions += coordinator.game_reports[-1][1]
+	seconds = time.perf_counter() - start
+	print("{} games ({} won), {} actions in {:.2f} s: {:.0f} actions/s".format(
+		args.games, victories, actions, seconds, actions / seconds))
+	if agent.use_planner:
+		print("{} turn plans made, {} plays replayed from a plan".format(agent.planner.plans_made, agent.planner.plans_reused))
+	if args.latency:
+		print(coordinator.latency.report())
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,80 @@
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from spirecomm.communication.coordinator import LineReader
+from utilities.sample_states import late_game_message
+
+# Throughput benchmark for the Coordinator's stdin reader.
+# Feeds a file of newline-separated messages through LineReader and through the old
+# one-character-at-a-time loop, and reports MB/s for each.
+# Run from the repository root: python -m utilities.bench_stdin [--messages recorded.jsonl]
+
+
+def read_char_by_char(stream):
+	"""The reader Coordinator used before LineReader, kept here for comparison"""
+	lines = []
+	while True:
+		stdin_input = ""
+		while True:
+			input_char = stream.read(1)
+			if input_char == '\n' or input_char == '':
+				break
+			else:
+				stdin_input += input_char
+		if input_char == '':
+			return lines
+		lines.append(stdin_input)
+
+
+def time_line_reader(path):
+	fd = os.open(path, os.O_RDONLY)
+	try:
+		start = time.perf_counter()
+		count = sum(1 for line in LineReader(fd))
+		return count, time.perf_counter() - start
+	finally:
+		os.close(fd)
+
+
+def time_char_by_char(path):
+	with io.open(path, "r", encoding="utf-8") as stream:
+		start = time.perf_counter()
+		count = len(read_char_by_char(stream))
+		return count, time.perf_counter() - start
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Measure stdin reader throughput")
+	parser.add_argument("--messages", help="a file of recorded messages, one per line")
+	parser.add_argument("--count", type=int, default=500, help="number of synthetic messages if none are given")
+	parser.add_argument("--skip-old", action="store_true", help="don't time the old character-by-character reader")
+	args = parser.parse_args()
+
+	if args.messages is not None:
+		path = args.messages
+		cleanup = False
+	else:
+		handle, path = tempfile.mkstemp(suffix=".jsonl")
+		with os.fdopen(handle, "w", encoding="utf-8") as f:
+			for seed in range(args.count):
+				f.write(late_game_message(seed=seed) + "\n")
+		cleanup = True
+
+	try:
+		megabytes = os.path.getsize(path) / 1e6
+		readers = [("LineReader", time_line_reader)]
+		if not args.skip_old:
+			readers.append(("read(1)", time_char_by_char))
+		for label, function in readers:
+			count, seconds = function(path)
+			print("{}: {} messages, {:.1f} MB in {:.3f} s, {:.1f} MB/s".format(label, count, megabytes, seconds, megabytes / seconds))
+	finally:
+		if cleanup:
+			os.remove(path)
+
+
+if __name__ == "__main__":
+	main()
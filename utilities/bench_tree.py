@@ -0,0 +1,92 @@
+import argparse
+import io
+import itertools
+import os
+import timeit
+
+from spirecomm.ai.agent import SimpleAgent
+from spirecomm.ai.compiler import compile_tree, compile_tree_file
+from spirecomm.spire.game import Game
+from spirecomm.spire.screen import ScreenType
+
+# Checks that the compiled behaviour tree makes the same decisions as py_trees ticking
+# SimpleAgent's tree, then compares how many ticks per second each manages.
+# Run from the repository root: python -m utilities.bench_tree [--tree tree.json]
+
+CUSTOM_FUNCTIONS = ["choose_rest_option", "choose_card_reward", "handle_rewards", "make_map_choice",
+					"handle_boss_reward", "handle_shop_screen", "handle_grid", "handle_hand_select"]
+FLAGS = ["choice_available", "proceed_available", "play_available", "end_available", "cancel_available"]
+
+
+def make_agent():
+	agent = SimpleAgent(io.StringIO(), headless=True)
+	agent.debug_level = -1
+	# Stand in for the decision functions, so only the tree's own logic is compared and timed
+	for name in CUSTOM_FUNCTIONS:
+		setattr(agent, name, lambda name=name: name)
+	agent.default_logic = lambda game: "default_logic"
+	return agent
+
+
+def sample_games():
+	games = []
+	for screen_type in ScreenType:
+		for flags in itertools.product([False, True], repeat=len(FLAGS)):
+			game = Game()
+			game.screen_type = screen_type
+			for flag, value in zip(FLAGS, flags):
+				setattr(game, flag, value)
+			games.append(game)
+	return games
+
+
+def decision(agent, game, tick):
+	agent.blackboard.game = game
+	agent.cmd_queue = []
+	tick()
+	return [command if isinstance(command, str) else (type(command).__name__, vars(command))
+			for command in agent.cmd_queue]
+
+
+def check_equivalent(agent, games, tick, compiled):
+	for game in games:
+		expected = decision(agent, game, tick)
+		actual = decision(agent, game, compiled)
+		assert expected == actual, "{} with {}: {} != {}".format(game.screen_type, [getattr(game, flag) for flag in FLAGS], expected, actual)
+
+
+def ticks_per_second(agent, games, tick, number):
+	def run():
+		for game in games:
+			agent.blackboard.game = game
+			agent.cmd_queue.clear()
+			tick()
+	seconds = min(timeit.repeat(run, number=number, repeat=3))
+	return number * len(games) / seconds
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Compare the compiled behaviour tree with py_trees")
+	parser.add_argument("--tree", help="also check a tree saved with SimpleAgent.tree_to_json")
+	parser.add_argument("--number", type=int, default=20, help="passes over the sample games per timing")
+	args = parser.parse_args()
+
+	agent = make_agent()
+	games = sample_games()
+	compiled = compile_tree(agent.root)
+	check_equivalent(agent, games, agent.behaviour_tree.tick, compiled)
+	print("compiled tree matches py_trees on {} game states".format(len(games)))
+
+	if args.tree is not None or os.path.exists("tree.json"):
+		filename = args.tree if args.tree is not None else "tree.json"
+		loaded = make_agent()
+		loaded.json_to_tree(filename)
+		check_equivalent(loaded, games, loaded.behaviour_tree.tick, compile_tree_file(filename, loaded))
+		print("compiled {} matches py_trees".format(filename))
+
+	for label, tick in [("py_trees", agent.behaviour_tree.tick), ("compiled", compiled)]:
+		print("{}: {:.0f} ticks/s".format(label, ticks_per_second(agent, games, tick, args.number)))
+
+
+if __name__ == "__main__":
+	main()
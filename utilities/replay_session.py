@@ -0,0 +1,73 @@
+import argparse
+import io
+import itertools
+
+from spirecomm.ai.agent import SimpleAgent
+from spirecomm.communication.recorder import SessionRecorder, ReplayCoordinator
+from spirecomm.communication.simulator import CombatSimulator, SimulatorCoordinator
+from spirecomm.spire.character import PlayerClass
+
+# Replays a recorded session through SimpleAgent as fast as it will go, reporting how long the
+# agent took per message and any commands which differ from the recorded ones.
+# Run from the repository root: python -m utilities.replay_session session.jsonl.gz
+# With --record, first records a session of the agent playing the combat simulator.
+
+
+def make_agent(player_class):
+	agent = SimpleAgent(io.StringIO(), chosen_class=player_class, headless=True)
+	agent.debug_level = -1
+	return agent
+
+
+def register(coordinator, agent):
+	coordinator.register_command_error_callback(agent.handle_error)
+	coordinator.register_state_change_callback(agent.get_next_action_in_game)
+	coordinator.register_out_of_game_callback(agent.get_next_action_out_of_game)
+
+
+def record(filename, player_class, games, seed):
+	agent = make_agent(player_class)
+	coordinator = SimulatorCoordinator(CombatSimulator(seed=seed), logfile=io.StringIO())
+	coordinator.recorder = SessionRecorder(filename)
+	register(coordinator, agent)
+	coordinator.signal_ready()
+	for _ in range(games):
+		coordinator.play_one_game(player_class)
+	coordinator.recorder.close()
+
+
+def percentile(values, fraction):
+	return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Replay a recorded session through SimpleAgent")
+	parser.add_argument("session", help="a recording from SessionRecorder, or a file of one message per line")
+	parser.add_argument("--class", dest="player_class", default="IRONCLAD", choices=[c.name for c in PlayerClass])
+	parser.add_argument("--record", action="store_true", help="first record the agent playing the combat simulator to the file")
+	parser.add_argument("--games", type=int, default=3, help="games to record")
+	parser.add_argument("--seed", type=int, default=0, help="seed for recording")
+	args = parser.parse_args()
+	player_class = PlayerClass[args.player_class]
+
+	if args.record:
+		record(args.session, player_class, args.games, args.seed)
+
+	coordinator = ReplayCoordinator.from_file(args.session)
+	agent = make_agent(player_class)
+	agent.latency = coordinator.latency
+	register(coordinator, agent)
+	latencies = sorted(coordinator.replay())
+	total = sum(latencies)
+	print("{} messages in {:.3f} s, {:.0f} messages/s".format(len(latencies), total, len(latencies) / total))
+	print("per message: p50 {:.3f} ms, p95 {:.3f} ms, p99 {:.3f} ms, max {:.3f} ms".format(
+		*(1000 * percentile(latencies, fraction) for fraction in [0.5, 0.95, 0.99, 1.0])))
+	print(coordinator.latency.report())
+	mismatches = coordinator.mismatches()
+	print("{} of {} commands differ from the recording".format(len(mismatches), len(coordinator.sent_commands)))
+	for index, recorded, replayed in itertools.islice(mismatches, 10):
+		print("  #{}: recorded {!r}, replayed {!r}".format(index, recorded, replayed))
+
+
+if __name__ == "__main__":
+	main()
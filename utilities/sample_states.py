@@ -0,0 +1,173 @@
+import json
+import random
+
+# Builds synthetic CommunicationMod messages for the benchmarks in this folder.
+# The shape follows what CommunicationMod sends; the values are made up but deterministic.
+
+CARD_POOL = [
+	("Strike_R", "Strike", "ATTACK", "BASIC", 1, True),
+	("Defend_R", "Defend", "SKILL", "BASIC", 1, False),
+	("Bash", "Bash", "ATTACK", "BASIC", 2, True),
+	("Pommel Strike", "Pommel Strike", "ATTACK", "COMMON", 1, True),
+	("Shrug It Off", "Shrug It Off", "SKILL", "COMMON", 1, False),
+	("Cleave", "Cleave", "ATTACK", "COMMON", 1, False),
+	("Inflame", "Inflame", "POWER", "UNCOMMON", 1, False),
+	("Offering", "Offering", "SKILL", "RARE", 0, False),
+	("Whirlwind", "Whirlwind", "ATTACK", "UNCOMMON", -1, False),
+	("Shockwave", "Shockwave", "SKILL", "UNCOMMON", 2, False),
+	("Uppercut", "Uppercut", "ATTACK", "UNCOMMON", 2, True),
+	("Flame Barrier", "Flame Barrier", "SKILL", "UNCOMMON", 2, False),
+	("Demon Form", "Demon Form", "POWER", "RARE", 3, False),
+	("Impervious", "Impervious", "SKILL", "RARE", 2, False),
+	("Feed", "Feed", "ATTACK", "RARE", 1, True),
+	("Anger", "Anger", "ATTACK", "COMMON", 0, True),
+]
+
+RELIC_POOL = ["Burning Blood", "Vajra", "Anchor", "Bag of Preparation", "Lantern", "Orichalcum",
+			  "Pen Nib", "Kunai", "Shuriken", "Bronze Scales", "Runic Pyramid", "Snecko Eye"]
+
+MONSTER_POOL = [
+	("Gremlin Nob", "GremlinNob", 110),
+	("Jaw Worm", "JawWorm", 44),
+	("Cultist", "Cultist", 50),
+	("Sentry", "Sentry", 39),
+]
+
+MAP_SYMBOLS = ["M", "M", "M", "?", "?", "$", "E", "R"]
+
+
+def make_card(rng, index):
+	card_id, name, card_type, rarity, cost, has_target = rng.choice(CARD_POOL)
+	return {
+		"id": card_id,
+		"name": name,
+		"type": card_type,
+		"rarity": rarity,
+		"upgrades": rng.randint(0, 1),
+		"has_target": has_target,
+		"cost": cost,
+		"uuid": "card-{:04d}".format(index),
+		"misc": 0,
+		"is_playable": True,
+		"exhausts": card_id == "Offering"
+	}
+
+
+def make_map(rng, height=15, width=7):
+	nodes = {}
+	for y in range(height):
+		columns = sorted(rng.sample(range(width), rng.randint(3, 5)))
+		for x in columns:
+			if y == 0:
+				symbol = "M"
+			elif y == height - 1:
+				symbol = "R"
+			elif y == 8:
+				symbol = "T"
+			else:
+				symbol = rng.choice(MAP_SYMBOLS)
+			nodes[(x, y)] = {"x": x, "y": y, "symbol": symbol, "children": [], "parents": []}
+	for y in range(height - 1):
+		row = [node for (x, node_y), node in sorted(nodes.items()) if node_y == y]
+		next_row = [node for (x, node_y), node in sorted(nodes.items()) if node_y == y + 1]
+		for node in row:
+			closest = sorted(next_row, key=lambda child: abs(child["x"] - node["x"]))[:rng.randint(1, 2)]
+			node["children"] = [{"x": child["x"], "y": child["y"]} for child in closest]
+		for child in next_row:
+			if not any(c["x"] == child["x"] for node in row for c in node["children"]):
+				parent = min(row, key=lambda node: abs(child["x"] - node["x"]))
+				parent["children"].append({"x": child["x"], "y": child["y"]})
+	return list(nodes.values())
+
+
+def make_monster(rng, index):
+	name, monster_id, max_hp = rng.choice(MONSTER_POOL)
+	return {
+		"name": name,
+		"id": monster_id,
+		"max_hp": max_hp,
+		"current_hp": rng.randint(1, max_hp),
+		"block": rng.randint(0, 10),
+		"intent": rng.choice(["ATTACK", "ATTACK_BUFF", "BUFF", "DEFEND"]),
+		"half_dead": False,
+		"is_gone": False,
+		"move_id": rng.randint(1, 3),
+		"move_base_damage": 10,
+		"move_adjusted_damage": 12,
+		"move_hits": 1,
+		"powers": [{"id": "Strength", "name": "Strength", "amount": index + 1}]
+	}
+
+
+def late_game_state(deck_size=40, seed=0, hand_size=7, num_monsters=3, act=3):
+	"""Build a decoded late-game combat message with a deck of deck_size cards
+
+	:param deck_size: the number of cards in the master deck
+	:type deck_size: int
+	:param seed: seeds the random choice of cards, monsters and map
+	:type seed: int
+	:return: a dict shaped like a decoded CommunicationMod message
+	:rtype: dict
+	"""
+	rng = random.Random(seed)
+	deck = [make_card(rng, i) for i in range(deck_size)]
+	combat_cards = [dict(card) for card in deck]
+	rng.shuffle(combat_cards)
+	hand = combat_cards[:hand_size]
+	discard_pile = combat_cards[hand_size:hand_size + deck_size // 4]
+	exhaust_pile = combat_cards[hand_size + deck_size // 4:hand_size + deck_size // 4 + 2]
+	draw_pile = combat_cards[hand_size + deck_size // 4 + 2:]
+	game_state = {
+		"current_hp": 61,
+		"max_hp": 88,
+		"floor": 17 * (act - 1) + 5,
+		"act": act,
+		"gold": 312,
+		"seed": 1234567890 + seed,
+		"class": "IRONCLAD",
+		"ascension_level": 0,
+		"act_boss": "Awakened One",
+		"relics": [{"id": relic, "name": relic, "counter": -1} for relic in RELIC_POOL],
+		"deck": deck,
+		"map": make_map(rng),
+		"potions": [
+			{"id": "Fire Potion", "name": "Fire Potion", "can_use": True, "can_discard": True, "requires_target": True},
+			{"id": "Potion Slot", "name": "Potion Slot", "can_use": False, "can_discard": False, "requires_target": False},
+			{"id": "Potion Slot", "name": "Potion Slot", "can_use": False, "can_discard": False, "requires_target": False}
+		],
+		"is_screen_up": False,
+		"screen_type": "NONE",
+		"screen_state": {},
+		"room_phase": "COMBAT",
+		"room_type": "MonsterRoomElite",
+		"combat_state": {
+			"player": {
+				"max_hp": 88,
+				"current_hp": 61,
+				"block": 5,
+				"energy": 3,
+				"powers": [{"id": "Strength", "name": "Strength", "amount": 2}],
+				"orbs": []
+			},
+			"monsters": [make_monster(rng, i) for i in range(num_monsters)],
+			"draw_pile": draw_pile,
+			"discard_pile": discard_pile,
+			"exhaust_pile": exhaust_pile,
+			"hand": hand,
+			"turn": 3
+		}
+	}
+	return {
+		"available_commands": ["play", "end", "potion", "key", "click", "wait", "state"],
+		"ready_for_command": True,
+		"in_game": True,
+		"game_state": game_state
+	}
+
+
+def late_game_message(deck_size=40, seed=0, **kwargs):
+	"""Like late_game_state, but encoded as the raw line CommunicationMod would send
+
+	:rtype: str
+	"""
+	return json.dumps(late_game_state(deck_size, seed, **kwargs))
@@ -13,6 +13,7 @@ import threading
 import spirecomm.spire.card
 
 import spirecomm.communication.coordinator as coord
+from spirecomm.communication.log_writer import LogWriter
 from spirecomm.ai.agent import SimpleAgent
 from spirecomm.spire.character import PlayerClass
 
@@ -163,6 +164,36 @@ class Base(BoxLayout):
 			self.agent.print_tree()
 			return True
 
+		if msg == "stats":
+			report = self.coordinator.latency.report()
+			print(report, file=self.log, flush=True)
+			self.in_history.append(report)
+			return True
+
+		if msg == "profile" or msg.startswith("profile "):
+			# Toggle the sampling profiler, optionally giving the interval in ms: "profile 2"
+			if self.coordinator.profiler is None or msg != "profile":
+				try:
+					interval = float(msg[8:]) / 1000 if msg != "profile" else 0.005
+					if interval <= 0:
+						raise ValueError("the interval must be more than 0 ms")
+				except ValueError as e:
+					print(e, file=self.log, flush=True)
+					self.in_history.append("Usage: profile [interval in ms]")
+					return True
+				self.coordinator.stop_profiler()
+				self.coordinator.start_profiler(interval)
+				self.in_history.append("Profiling every {:.1f} ms, written to profile-NNNN.folded after each game".format(1000 * interval))
+			else:
+				self.coordinator.stop_profiler()
+				self.in_history.append("Profiling stopped, the game so far was written out")
+			return True
+
+		if msg == "stats clear":
+			self.coordinator.latency.clear()
+			self.in_history.append("Latency stats cleared")
+			return True
+
 		if msg == "load":
 			msg = "load tree"
 			
@@ -178,8 +209,8 @@ class Base(BoxLayout):
 			
 		if msg.startswith("delay "):
 			try:
-				self.agent.action_delay = float(msg[6:])
-				self.in_history.append("DELAY SET TO " + str(self.agent.action_delay))
+				self.coordinator.action_delay = float(msg[6:])
+				self.in_history.append("DELAY SET TO " + str(self.coordinator.action_delay))
 				return True
 			except Exception as e:
 				print(e, file=self.log, flush=True)
@@ -217,22 +248,11 @@ class CommunicationApp(App):
 		
 def run_agent(f, communication_coordinator):
 	# TEST
-	print("Agent: preparing profiler test", file=f, flush=True)
+	# To profile games, type "profile" in the GUI: the coordinator samples this thread's stack
+	# and writes each game's stacks out for flamegraph.pl or speedscope
 	try:
-		# import io, cProfile, pstats
-		# pr = cProfile.Profile()
-		# pr.enable()
-		# s = io.StringIO()
-		# print("Agent: init profiler test", file=f, flush=True)
-
 		result = communication_coordinator.play_one_game(PlayerClass.IRONCLAD)
 		print("Agent: first game ended in {}" "victory" if result else "defeat", file=f, flush=True)
-		# print("Agent: finishing profiler test", file=f, flush=True)
-		# pr.disable()
-		# sortby = 'cumulative'
-		# ps = pstats.Stats(pr, stream=s).sort_stats(sortby)
-		# ps.print_stats()
-		# print(s.getvalue(), file=f, flush=True)
 	
 	except Exception as e:
 		print("Agent thread encountered error:", file=f, flush=True)
@@ -249,14 +269,18 @@ def run_agent(f, communication_coordinator):
 		#result = coordinator.play_one_game(chosen_class)
 
 def launch_gui():
-	f=open("ai.log","w")
+	f=LogWriter("ai.log")
 	print("GUI: Init " + str(time.time()), file=f, flush=True)
 	agent = SimpleAgent(f)
 	print("GUI: Register agent", file=f, flush=True)
 	communication_coordinator = coord.Coordinator()
+	communication_coordinator.action_delay = 2.0 # seconds delay per action, useful for actually seeing what's going on.
+	# high delay will steal mouse focus??
+	agent.think("Delay timer set to " + str(communication_coordinator.action_delay))
 	print("GUI: Register coordinator", file=f, flush=True)
 	communication_coordinator.signal_ready()
 	print("GUI: Ready", file=f, flush=True)
+	agent.latency = communication_coordinator.latency
 	communication_coordinator.register_command_error_callback(agent.handle_error)
 	communication_coordinator.register_state_change_callback(agent.get_next_action_in_game)
 	communication_coordinator.register_out_of_game_callback(agent.get_next_action_out_of_game)